@@ -1,5 +1,8 @@
 # Copyright Epic Games, Inc. All Rights Reserved.
 import unreal
+import json
+import os
+import time
 from datetime import datetime
 
 # This example is an implementation of an "executor" which is responsible for
@@ -44,6 +47,83 @@ from datetime import datetime
 #   UnrealEditor-Cmd.exe "E:\SubwaySequencer\SubwaySequencer.uproject" subwaySequencer_P -game -MoviePipelineLocalExecutorClass=/Script/MovieRenderPipelineCore.MoviePipelinePythonHostExecutor -ExecutorPythonClass=/Engine/PythonTypes.MoviePipelineExampleRuntimeExecutor -LevelSequence="/Game/Sequencer/SubwaySequencerMASTER.SubwaySequencerMASTER" -windowed -resx=1280 -resy=720 -log
 #
 # If you are looking for how to render in-editor using Python, see the MoviePipelineEditorExample.py script instead.
+
+# Output setting class per output format, looked up by name because the
+# ProRes/DNx outputs only exist when their plugins are enabled.
+OUTPUT_CLASS_NAMES = {
+    'png': 'MoviePipelineImageSequenceOutput_PNG',
+    'bmp': 'MoviePipelineImageSequenceOutput_BMP',
+    'exr': 'MoviePipelineImageSequenceOutput_EXR',
+    'prores': 'MoviePipelineAppleProResOutput',
+    'dnx': 'MoviePipelineAvidDNxOutput',
+    'cmdline': 'MoviePipelineImageSequenceOutput_BMP',
+}
+
+# Quality profile used when the job names none or the profile file can't be
+# read: the settings every daily was rendered with before there were profiles.
+# The profile file (-QualityProfileFile=, render_profiles.json next to
+# render_jobs.json) holds named profiles of the same shape:
+#   {"preview": {"config": "/Game/Cinema/Render_Setting/MW_Early_4K_422HQ",
+#                "settings": {"MoviePipelineAntiAliasingSetting": {"spatial_sample_count": 1},
+#                             "MoviePipelineGameOverrideSetting": {"use_lod_zero": false, ...}}}}
+# Values written as "EnumName.VALUE" are unreal enum values.
+FINAL_PROFILE = {
+    'config': "/Game/Cinema/Render_Setting/MW_Early_4K_422HQ",
+    'settings': {
+        'MoviePipelineGameOverrideSetting': {
+            'cinematic_quality_settings': True,
+            'texture_streaming': "MoviePipelineTextureStreamingMethod.DISABLED",
+            'disable_hlo_ds': True,
+            'use_lod_zero': True,
+            'use_high_quality_shadows': True,
+            'shadow_distance_scale': 10,
+            'shadow_radius_threshold': 0.001,
+            'override_view_distance_scale': True,
+            'view_distance_scale': 50,
+        },
+    },
+}
+
+def profile_value(value):
+    if isinstance(value, str) and value.count('.') == 1:
+        typeName, member = value.split('.')
+        enumType = getattr(unreal, typeName, None)
+        if enumType is not None and hasattr(enumType, member):
+            return getattr(enumType, member)
+    return value
+
+# Working set of this process in MB, or None if we can't tell on this platform.
+def process_memory_mb():
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return round(counters.WorkingSetSize / (1024 * 1024), 1)
+        return None
+    # Current resident set, not ru_maxrss: that is the peak and never goes down.
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except Exception:
+        return None
+
 @unreal.uclass()
 class CinemaMPRExecutor(unreal.MoviePipelinePythonHostExecutor):
     
@@ -51,14 +131,55 @@ class CinemaMPRExecutor(unreal.MoviePipelinePythonHostExecutor):
     # Python types (int, str, bool) as well as unreal properties.
     # You can use Arrays and Maps (Dictionaries) as well
     activeMoviePipeline = unreal.uproperty(unreal.MoviePipeline)
+    pipelineQueue = unreal.uproperty(unreal.MoviePipelineQueue)
     exampleArray = unreal.Array(str) # An array of strings
     exampleDict = unreal.Map(str, bool) # A dictionary of strings to bools.
+
+    # Jobs to render in this editor session, one JSON encoded dict per entry
+    # (see parse_job_specs). We keep them as strings because every member has
+    # to be a UProperty.
+    jobSpecs = unreal.Array(str)
+    currentJobIndex = unreal.uproperty(int)
+    failedJobCount = unreal.uproperty(int)
+
+    # Progress records sent to DailyRender_v2 over the host executor's socket
+    # (see send_progress). Connected when -ProgressPort is given.
+    progressConnected = unreal.uproperty(bool)
+    progressInterval = unreal.uproperty(float)
+    lastProgressTime = unreal.uproperty(float)
+    lastFrameIndex = unreal.uproperty(int)
+    lastFrameTime = unreal.uproperty(float)
+    lastFrameMs = unreal.uproperty(float)
+    lastSegmentState = unreal.uproperty(str)
+
+    # Render server mode (see start_render_server): the editor stays up and
+    # renders the batches of jobs it is sent over the socket.
+    serverMode = unreal.uproperty(bool)
+    serverBatch = unreal.uproperty(str)
+    serverIdleTimeout = unreal.uproperty(float)
+    lastCommandTime = unreal.uproperty(float)
+    quitRequested = unreal.uproperty(bool)
     
     # Constructor that gets called when created either via C++ or Python
     # Note that this is different than the standard __init__ function of Python
     def _post_init(self):
         # Assign default values to properties in the constructor
         self.activeMoviePipeline = None
+        self.pipelineQueue = None
+        self.currentJobIndex = -1
+        self.failedJobCount = 0
+        self.progressConnected = False
+        self.progressInterval = 1.0
+        self.lastProgressTime = 0.0
+        self.lastFrameIndex = -1
+        self.lastFrameTime = 0.0
+        self.lastFrameMs = 0.0
+        self.lastSegmentState = ""
+        self.serverMode = False
+        self.serverBatch = ""
+        self.serverIdleTimeout = 3600.0
+        self.lastCommandTime = 0.0
+        self.quitRequested = False
         
         self.exampleArray.append("Example String")
         self.exampleDict["ExampleKey"] = True
@@ -104,61 +225,304 @@ class CinemaMPRExecutor(unreal.MoviePipelinePythonHostExecutor):
         
         # Here's how we can scan the command line for any additional args such as the path to a level sequence.
         (cmdTokens, cmdSwitches, cmdParameters) = unreal.SystemLibrary.parse_command_line(unreal.SystemLibrary.get_command_line())
-        levelSequencePath = None
-        try:
-            levelSequencePath = cmdParameters['LevelSequence']
-        except:
-            unreal.log_error("Missing '-LevelSequence=/Game/Foo/MySequence.MySequence' argument")
+
+        if 'RenderServerPort' in cmdParameters:
+            self.start_render_server(cmdParameters)
+            return
+
+        self.connect_progress(cmdParameters)
+
+        specs = self.split_frame_ranges(self.parse_job_specs(cmdParameters))
+        self.resolve_quality_profiles(specs, cmdParameters)
+        if not specs:
             self.on_executor_errored()
             return
-            
+
+        for spec in specs:
+            self.jobSpecs.append(json.dumps(spec))
+
         # A movie pipeline needs to be initialized with a job, and a job
-        # should be owned by a Queue so we will construct a queue, make one job
-        # and then configure the settings on the job. If you want inPipelineQueue to be
+        # should be owned by a Queue so we will construct a queue and add
+        # one job per spec as we get to it. If you want inPipelineQueue to be
         # valid, then you must pass a path to a queue asset via -MoviePipelineConfig. Here
-        # we just make one from scratch with the one level sequence as we didn't implement
-        # multi-job handling.
+        # we just make one from scratch.
         self.pipelineQueue = unreal.new_object(unreal.MoviePipelineQueue, outer=self);
-        unreal.log("Building Queue...")
-        
-        render_resx = 1920
-        render_resy = 1080
+        unreal.log("Building Queue... %d job(s)" % len(specs))
+
+        self.currentJobIndex = -1
+        self.start_next_job()
+
+    # -RenderServerPort=<port> [-RenderServerHost=127.0.0.1] [-RenderServerIdle=<seconds>]
+    # keeps this editor running as a warm render worker (render_server.py on
+    # the other end). Commands arrive over the socket as size-prefixed JSON
+    # (see on_socket_message); progress and job_finished records go back the
+    # same way, then one batch_finished record per batch. Without a command
+    # for RenderServerIdle seconds the editor exits on its own.
+    def start_render_server(self, cmdParameters):
+        try:
+            self.serverIdleTimeout = float(cmdParameters.get('RenderServerIdle', self.serverIdleTimeout))
+        except ValueError:
+            unreal.log_warning("Invalid '-RenderServerIdle', using %f" % self.serverIdleTimeout)
         try:
-            render_resx = int(cmdParameters['RenderResX'])
-            render_resy = int(cmdParameters['RenderResY'])
+            self.progressInterval = float(cmdParameters.get('ProgressInterval', 1.0))
+        except ValueError:
+            unreal.log_warning("Invalid '-ProgressInterval', using %f" % self.progressInterval)
+        serverHost = cmdParameters.get('RenderServerHost', "127.0.0.1")
+        self.serverMode = self.connect_socket(serverHost, int(cmdParameters['RenderServerPort']))
+        if not self.serverMode:
+            unreal.log_error("Could not connect to the render server at %s:%s" % (serverHost, cmdParameters['RenderServerPort']))
+            self.on_executor_errored()
+            return
+        self.progressConnected = True
+        self.pipelineQueue = unreal.new_object(unreal.MoviePipelineQueue, outer=self)
+        self.currentJobIndex = -1
+        self.lastCommandTime = time.time()
+        unreal.log("Render server mode, idle timeout %ds" % self.serverIdleTimeout)
+        self.send_progress({"type": "worker_ready"})
+
+    def is_serving_batch(self):
+        return self.activeMoviePipeline is not None or 0 <= self.currentJobIndex < len(self.jobSpecs)
+
+    # A batch is the same list of jobs as a -JobManifest; it replaces the
+    # previous batch once that is finished.
+    def start_batch(self, command):
+        if self.is_serving_batch():
+            unreal.log_warning("Render command for batch %s while batch %s is running, ignored" % (command.get('batch'), self.serverBatch))
+            self.send_progress({"type": "batch_rejected", "batch": command.get('batch'), "reason": "busy"})
+            return
+        profileParameters = {}
+        if command.get('quality_profile_file'):
+            profileParameters['QualityProfileFile'] = command['quality_profile_file']
+        specs = self.split_frame_ranges([spec for spec in command.get('jobs', []) if self.check_job_spec(spec)])
+        self.resolve_quality_profiles(specs, profileParameters)
+        while len(self.jobSpecs):
+            self.jobSpecs.pop()
+        for spec in specs:
+            self.jobSpecs.append(json.dumps(spec))
+        # The jobs of the previous batch are done with.
+        self.pipelineQueue.delete_all_jobs()
+        self.serverBatch = str(command.get('batch', ''))
+        self.failedJobCount = 0
+        unreal.log("Render server batch %s: %d job(s)" % (self.serverBatch, len(specs)))
+        self.currentJobIndex = -1
+        self.start_next_job()
+
+    # Reads the jobs for this session. With -JobManifest=<path to json> several
+    # sequences are rendered one after another in this process:
+    #   {"jobs": [{"sequence": "/Game/Seq/Foo", "output_name": "Foo_20240101",
+    #              "output_directory": "E:/DAILYRENDER/Foo/20240101",
+    #              "res_x": 3840, "res_y": 2160, "map": "/Game/Maps/Foo_P",
+    #              "start_frame": 0, "end_frame": 500}, ...]}
+    # Without a manifest the single job comes from -LevelSequence, -OutputName,
+    # -OutputDirectory, -RenderResX/-RenderResY and -StartFrame/-EndFrame.
+    # start_frame/end_frame are optional; see apply_frame_range. Instead of one
+    # range a job can list several, "frame_ranges": [[0, 120], [2800, 3000]] or
+    # -FrameRanges=0-120,2800-3000; see split_frame_ranges. "quality_profile"
+    # or -QualityProfile= picks the render settings; see resolve_quality_profiles.
+    def parse_job_specs(self, cmdParameters):
+        if 'JobManifest' in cmdParameters:
+            manifestPath = cmdParameters['JobManifest'].strip('"')
+            try:
+                with open(manifestPath, "r", encoding="utf-8") as f:
+                    specs = json.load(f)["jobs"]
+            except Exception as e:
+                unreal.log_error("Could not read job manifest '%s': %s" % (manifestPath, e))
+                return []
+            return [spec for spec in specs if self.check_job_spec(spec)]
+
+        spec = {}
+        try:
+            spec['sequence'] = cmdParameters['LevelSequence']
+        except:
+            unreal.log_error("Missing '-LevelSequence=/Game/Foo/MySequence.MySequence' argument")
+            return []
+
+        try:
+            spec['res_x'] = int(cmdParameters['RenderResX'])
+            spec['res_y'] = int(cmdParameters['RenderResY'])
         except:
             unreal.log_error("Missing '-RenderResX, RenderResY' argument")
 
+        try:
+            spec['output_name'] = cmdParameters['OutputName']
+        except:
+            unreal.log_error("Missing '-OutputName' argument")
+
+        try:
+            spec['output_directory'] = cmdParameters['OutputDirectory']
+        except:
+            unreal.log_error("Missing '-OutputDirectory' argument")
+
+        if 'StartFrame' in cmdParameters or 'EndFrame' in cmdParameters:
+            try:
+                spec['start_frame'] = int(cmdParameters['StartFrame'])
+                spec['end_frame'] = int(cmdParameters['EndFrame'])
+            except:
+                unreal.log_error("'-StartFrame' and '-EndFrame' must be given together as integers")
+                return []
+
+        if 'FrameRanges' in cmdParameters:
+            try:
+                spec['frame_ranges'] = [[int(frame) for frame in part.split('-')] for part in cmdParameters['FrameRanges'].split(',')]
+            except:
+                unreal.log_error("'-FrameRanges' must look like 0-120,2800-3000")
+                return []
+
+        if 'OutputFormat' in cmdParameters:
+            spec['output_format'] = cmdParameters['OutputFormat'].lower()
+        if 'ExrCompression' in cmdParameters:
+            spec['exr_compression'] = cmdParameters['ExrCompression']
+
+        if 'QualityProfile' in cmdParameters:
+            spec['quality_profile'] = cmdParameters['QualityProfile']
+
+        if 'MovieWarmUpFrames' in cmdParameters:
+            try:
+                spec['warm_up_frames'] = int(cmdParameters['MovieWarmUpFrames'])
+            except:
+                unreal.log_warning("Invalid '-MovieWarmUpFrames', using the render setting's warm-up")
+
+        return [spec]
+
+    def check_job_spec(self, spec):
+        if not spec.get('sequence'):
+            unreal.log_error("Skipping manifest job without 'sequence': %s" % spec)
+            return False
+        for key in ('output_name', 'output_directory'):
+            if not spec.get(key):
+                unreal.log_error("Manifest job %s is missing '%s'" % (spec['sequence'], key))
+        return True
+
+    # Puts the settings of each job's quality profile ('quality_profile' in the
+    # manifest or -QualityProfile=, "final" when not given) into its spec, so
+    # build_job doesn't have to read the profile file again. A profile that
+    # isn't in the file renders at final quality rather than failing the job.
+    def resolve_quality_profiles(self, specs, cmdParameters):
+        profiles = {}
+        if 'QualityProfileFile' in cmdParameters:
+            profilePath = cmdParameters['QualityProfileFile'].strip('"')
+            try:
+                with open(profilePath, "r", encoding="utf-8") as f:
+                    profiles = json.load(f)
+            except Exception as e:
+                unreal.log_error("Could not read quality profiles '%s': %s" % (profilePath, e))
+        for spec in specs:
+            name = spec.get('quality_profile') or 'final'
+            if name not in profiles:
+                if name != 'final':
+                    unreal.log_warning("Unknown quality profile '%s' for %s, rendering at final quality" % (name, spec['sequence']))
+                name = 'final'
+            spec['quality_profile'] = name
+            spec['quality_settings'] = profiles.get(name, FINAL_PROFILE)
+
+    # A job with several frame ranges (a resumed render that only needs the
+    # frames missing from an earlier attempt) becomes one job per range. They
+    # share the output name, and apply_frame_range keeps the file numbers of a
+    # full render, so the frames fill the gaps of the existing sequence.
+    def split_frame_ranges(self, specs):
+        result = []
+        for spec in specs:
+            ranges = spec.pop('frame_ranges', None)
+            if not ranges:
+                result.append(spec)
+                continue
+            for frameRange in ranges:
+                if len(frameRange) != 2 or int(frameRange[0]) >= int(frameRange[1]):
+                    unreal.log_error("Skipping invalid frame range %s of %s" % (frameRange, spec['sequence']))
+                    continue
+                part = dict(spec)
+                part['start_frame'] = int(frameRange[0])
+                part['end_frame'] = int(frameRange[1])
+                result.append(part)
+        return result
+
+    # Moves on to the next job of the session, or finishes the executor when
+    # every job has been rendered. If the job needs another map we load it
+    # first and continue from on_map_load.
+    def start_next_job(self):
+        self.currentJobIndex += 1
+        if self.currentJobIndex >= len(self.jobSpecs):
+            if self.failedJobCount:
+                unreal.log_warning("%d job(s) failed in this session" % self.failedJobCount)
+            if self.serverMode:
+                self.send_progress({"type": "batch_finished", "batch": self.serverBatch, "failed": self.failedJobCount, "jobs": len(self.jobSpecs)})
+                self.lastCommandTime = time.time()
+                if self.quitRequested:
+                    self.on_executor_finished_impl()
+                return
+            self.send_progress({"type": "session_finished", "failed": self.failedJobCount})
+            self.on_executor_finished_impl()
+            return
+
+        spec = json.loads(self.jobSpecs[self.currentJobIndex])
+        mapPath = spec.get('map')
+        if mapPath and not self.is_current_map(mapPath):
+            unreal.log("Loading map %s for %s" % (mapPath, spec['sequence']))
+            unreal.GameplayStatics.open_level(self.get_last_loaded_world(), mapPath, True, "game=/Script/MovieRenderPipelineCore.MoviePipelineGameMode")
+            return
+
+        self.start_current_job()
+
+    def is_current_map(self, mapPath):
+        currentName = unreal.GameplayStatics.get_current_level_name(self.get_last_loaded_world(), True)
+        # "/Game/Maps/Foo_P.Foo_P", "/Game/Maps/Foo_P" and "Foo_P" all name the same map.
+        wantedName = mapPath.replace("\\", "/").split("/")[-1].split(".")[0]
+        return currentName.lower() == wantedName.lower()
+
+    def start_current_job(self):
+        spec = json.loads(self.jobSpecs[self.currentJobIndex])
+        unreal.log("Starting job %d/%d: %s -> %s" % (self.currentJobIndex + 1, len(self.jobSpecs), spec['sequence'], spec.get('output_name') or spec['sequence']))
+
+        newJob = self.build_job(spec)
+
+        # Now that we've set up the minimum requirements on the job we can created
+        # a movie render pipeline to run our job. Construct the new object
+        self.activeMoviePipeline = unreal.new_object(self.target_pipeline_class, outer=self.get_last_loaded_world(), base_type=unreal.MoviePipeline);
+        
+        # Register to any callbacks we want
+        self.activeMoviePipeline.on_movie_pipeline_work_finished_delegate.add_function_unique(self, "on_movie_pipeline_finished")
+        
+        # And finally tell it to start working. It will continue working
+        # and then call the on_movie_pipeline_finished_delegate function at the end.
+        self.lastFrameIndex = -1
+        self.lastFrameTime = time.time()
+        self.lastFrameMs = 0.0
+        self.lastProgressTime = 0.0
+        self.lastSegmentState = ""
+        self.activeMoviePipeline.initialize(newJob)
+
+    def build_job(self, spec):
         # Allocate a job. Jobs hold which sequence to render and what settings to render with.
         newJob = self.pipelineQueue.allocate_new_job(unreal.MoviePipelineExecutorJob)
-        newJob.sequence = unreal.SoftObjectPath(levelSequencePath)
+        newJob.sequence = unreal.SoftObjectPath(spec['sequence'])
+        if spec.get('map'):
+            newJob.map = unreal.SoftObjectPath(spec['map'])
 
         newJob.author = 'Cinema Daily'
         newJob.job_name = datetime.today().strftime('%Y-%m-%d')
         
-        newConfig = unreal.load_asset("/Game/Cinema/Render_Setting/MW_Early_4K_422HQ")
+        profile = spec.get('quality_settings') or FINAL_PROFILE
+        newConfig = unreal.load_asset(profile.get('config') or FINAL_PROFILE['config'])
         newJob.set_configuration(newConfig)
         # Now we can configure the job. Calling find_or_add_setting_by_class is how you add new settings.
         outputSetting = newJob.get_configuration().find_or_add_setting_by_class(unreal.MoviePipelineOutputSetting)
-        # outputSetting.output_resolution = unreal.IntPoint(1280, 720)
+        if spec.get('res_x') and spec.get('res_y'):
+            outputSetting.output_resolution = unreal.IntPoint(int(spec['res_x']), int(spec['res_y']))
         outputSetting.file_name_format = "{sequence_name}.{frame_number}"
         
-        try:
-            outputName = cmdParameters['OutputName']
-            outputSetting.file_name_format = "%s.{frame_number_rel}" % outputName
-        except:
-            unreal.log_error("Missing '-OutputName' argument")
+        if spec.get('output_name'):
+            outputSetting.file_name_format = "%s.{frame_number_rel}" % spec['output_name']
 
-        try:
-            outputDirectoryPath = cmdParameters['OutputDirectory']
-            outputSetting.output_directory = unreal.DirectoryPath(outputDirectoryPath)
-        except:
-            unreal.log_error("Missing '-OutputDirectory' argument")
+        if spec.get('output_directory'):
+            outputSetting.output_directory = unreal.DirectoryPath(spec['output_directory'])
+
+        if spec.get('start_frame') is not None and spec.get('end_frame') is not None:
+            self.apply_frame_range(spec, outputSetting)
 
         # Ensure there is something to render
         newJob.get_configuration().find_or_add_setting_by_class(unreal.MoviePipelineDeferredPassBase)
         # Ensure there's a file output.
-        newJob.get_configuration().find_or_add_setting_by_class(unreal.MoviePipelineImageSequenceOutput_PNG)
+        self.add_output(newJob.get_configuration(), spec, outputSetting)
         
         # This is important. There are several settings that need to be
         # initialized (just so their default values kick in) and instead
@@ -171,28 +535,81 @@ class CinemaMPRExecutor(unreal.MoviePipelinePythonHostExecutor):
         burninSetting.burn_in_class = unreal.SoftClassPath("/MovieRenderPipeline/Blueprints/DefaultBurnIn.DefaultBurnIn_C")
         burninSetting.composite_onto_final_image = True
 
-        gameModeSetting = newJob.get_configuration().find_or_add_setting_by_class(unreal.MoviePipelineGameOverrideSetting)
         # gameModeSetting.game_mode_override = unreal.MoviePipelineGameMode.static_class()
-        gameModeSetting.cinematic_quality_settings = True
-        gameModeSetting.texture_streaming = unreal.MoviePipelineTextureStreamingMethod.DISABLED
-        gameModeSetting.disable_hlo_ds = True
-        gameModeSetting.use_lod_zero = True
-        gameModeSetting.use_high_quality_shadows = True
-        gameModeSetting.shadow_distance_scale = 10
-        gameModeSetting.shadow_radius_threshold = 0.001
-        gameModeSetting.override_view_distance_scale = True
-        gameModeSetting.view_distance_scale = 50
+        self.apply_quality_profile(newJob.get_configuration(), spec, profile)
 
-        # Now that we've set up the minimum requirements on the job we can created
-        # a movie render pipeline to run our job. Construct the new object
-        self.activeMoviePipeline = unreal.new_object(self.target_pipeline_class, outer=self.get_last_loaded_world(), base_type=unreal.MoviePipeline);
-        
-        # Register to any callbacks we want
-        self.activeMoviePipeline.on_movie_pipeline_work_finished_delegate.add_function_unique(self, "on_movie_pipeline_finished")
-        
-        # And finally tell it to start working. It will continue working
-        # and then call the on_movie_pipeline_finished_delegate function at the end.
-        self.activeMoviePipeline.initialize(newJob)
+        # Warm-up chosen per job by the orchestrator (see warmup.py), after the
+        # profile so it wins over a warm-up count in the profile.
+        if spec.get('warm_up_frames') is not None:
+            aaSetting = newJob.get_configuration().find_or_add_setting_by_class(unreal.MoviePipelineAntiAliasingSetting)
+            aaSetting.engine_warm_up_count = int(spec['warm_up_frames'])
+            unreal.log("Warm-up frames for %s: %d" % (spec['sequence'], aaSetting.engine_warm_up_count))
+        return newJob
+
+    def apply_quality_profile(self, config, spec, profile):
+        for className, values in profile.get('settings', {}).items():
+            settingClass = getattr(unreal, className, None)
+            if settingClass is None:
+                unreal.log_warning("Quality profile '%s': unknown setting %s" % (spec.get('quality_profile'), className))
+                continue
+            setting = config.find_or_add_setting_by_class(settingClass)
+            for name, value in values.items():
+                try:
+                    setattr(setting, name, profile_value(value))
+                except Exception as e:
+                    unreal.log_warning("Quality profile '%s': can't set %s.%s: %s" % (spec.get('quality_profile'), className, name, e))
+        unreal.log("Quality profile for %s: %s" % (spec['sequence'], spec.get('quality_profile', 'final')))
+
+    # Adds the output for the job's format ('output_format' in the manifest or
+    # -OutputFormat=). png/bmp/exr write a frame sequence that the orchestrator
+    # encodes, prores/dnx write one movie per job through Movie Render Queue's
+    # own encoders, and cmdline writes BMPs that the command line encoder
+    # (Project Settings > Movie Pipeline CommandLine Encoder) turns into a movie
+    # and deletes. For anything but png the other outputs of the config are
+    # removed so we don't write the frames twice.
+    def add_output(self, config, spec, outputSetting):
+        outputFormat = spec.get('output_format') or 'png'
+        outputClass = getattr(unreal, OUTPUT_CLASS_NAMES.get(outputFormat, ''), None)
+        if outputClass is None:
+            unreal.log_error("Output format '%s' for %s is unknown or its plugin is not enabled, writing PNG" % (outputFormat, spec['sequence']))
+            outputFormat = 'png'
+            outputClass = unreal.MoviePipelineImageSequenceOutput_PNG
+
+        if outputFormat != 'png':
+            for otherName in set(OUTPUT_CLASS_NAMES.values()):
+                otherClass = getattr(unreal, otherName, None)
+                if otherClass is not None and otherClass is not outputClass:
+                    otherSetting = config.find_setting_by_class(otherClass)
+                    if otherSetting:
+                        config.remove_setting(otherSetting)
+
+        output = config.find_or_add_setting_by_class(outputClass)
+        if outputFormat == 'exr':
+            output.compression = getattr(unreal.EXRCompressionFormat, spec.get('exr_compression', 'PIZ').upper())
+        elif outputFormat in ('prores', 'dnx'):
+            # One movie per job, so no frame number in the name.
+            outputSetting.file_name_format = spec.get('output_name') or "{sequence_name}"
+        elif outputFormat == 'cmdline':
+            encoder = config.find_or_add_setting_by_class(unreal.MoviePipelineCommandLineEncoder)
+            encoder.file_name_format_override = spec.get('output_name') or "{sequence_name}"
+            encoder.delete_source_files = True
+        unreal.log("Output format for %s: %s" % (spec['sequence'], outputFormat))
+
+    # Renders only [start_frame, end_frame) of the sequence, counted from its
+    # playback start (end exclusive). {frame_number_rel} restarts at the first
+    # rendered frame, so we shift it with frame_number_offset; that way a shard
+    # writes exactly the file names a full render would have written.
+    def apply_frame_range(self, spec, outputSetting):
+        startFrame = int(spec['start_frame'])
+        endFrame = int(spec['end_frame'])
+        sequence = unreal.load_asset(spec['sequence'])
+        playbackStart = sequence.get_playback_start() if sequence else 0
+
+        outputSetting.use_custom_playback_range = True
+        outputSetting.custom_start_frame = playbackStart + startFrame
+        outputSetting.custom_end_frame = playbackStart + endFrame
+        outputSetting.frame_number_offset = outputSetting.frame_number_offset + startFrame
+        unreal.log("Rendering frames %d-%d of %s" % (startFrame, endFrame, spec['sequence']))
    
     # This function is called every frame and can be used to do simple countdowns, checks
     # for more work, etc. Can be entirely omitted if you don't need it.
@@ -202,22 +619,84 @@ class CinemaMPRExecutor(unreal.MoviePipelinePythonHostExecutor):
         super(CinemaMPRExecutor, self).on_begin_frame()        
         
         if self.activeMoviePipeline:
-            unreal.log("Progress: %f" % unreal.MoviePipelineLibrary.get_completion_percentage(self.activeMoviePipeline))
+            self.update_progress()
+        elif self.serverMode and not self.is_serving_batch() and time.time() - self.lastCommandTime > self.serverIdleTimeout:
+            unreal.log("Render server idle for %ds, exiting" % self.serverIdleTimeout)
+            self.serverMode = False
+            self.on_executor_finished_impl()
+
+    # -ProgressPort=<port> [-ProgressHost=127.0.0.1] [-ProgressInterval=<seconds>]
+    def connect_progress(self, cmdParameters):
+        try:
+            self.progressInterval = float(cmdParameters.get('ProgressInterval', 1.0))
+        except ValueError:
+            unreal.log_warning("Invalid '-ProgressInterval', using %f" % self.progressInterval)
+        if 'ProgressPort' not in cmdParameters:
+            return
+        progressHost = cmdParameters.get('ProgressHost', "127.0.0.1")
+        self.progressConnected = self.connect_socket(progressHost, int(cmdParameters['ProgressPort']))
+        if not self.progressConnected:
+            unreal.log_warning("Could not connect progress socket to %s:%s" % (progressHost, cmdParameters['ProgressPort']))
+
+    # Called every tick. Keeps track of how long each output frame took and
+    # reports at most once per progressInterval, over the socket when it is
+    # connected and to the log otherwise. A change of the shot state (warming
+    # up, rendering, ...) is always reported right away so the orchestrator
+    # can time the warm-up.
+    def update_progress(self):
+        now = time.time()
+        (currentFrame, totalFrames) = unreal.MoviePipelineLibrary.get_overall_output_frames(self.activeMoviePipeline)
+        if currentFrame != self.lastFrameIndex:
+            if self.lastFrameIndex >= 0:
+                self.lastFrameMs = (now - self.lastFrameTime) * 1000.0 / max(1, currentFrame - self.lastFrameIndex)
+                # One short line per output frame for the orchestrator's log analyzer (ue_log.py).
+                unreal.log("CinemaMPR frame %d/%d %.1f ms" % (currentFrame, totalFrames, self.lastFrameMs))
+            self.lastFrameIndex = currentFrame
+            self.lastFrameTime = now
+
+        segmentState = unreal.MoviePipelineLibrary.get_current_segment_state(self.activeMoviePipeline)
+        segmentState = getattr(segmentState, "name", str(segmentState)).split(".")[-1]
+        stateChanged = segmentState != self.lastSegmentState
+        self.lastSegmentState = segmentState
+
+        if not stateChanged and now - self.lastProgressTime < self.progressInterval:
+            return
+        self.lastProgressTime = now
+
+        completion = unreal.MoviePipelineLibrary.get_completion_percentage(self.activeMoviePipeline)
+        record = {
+            "type": "progress",
+            "frame": currentFrame,
+            "total": totalFrames,
+            "completion": completion,
+            "frame_ms": round(self.lastFrameMs, 2),
+            "memory_mb": process_memory_mb(),
+            "state": segmentState,
+        }
+        if not self.send_progress(record):
+            unreal.log("Progress: %f" % completion)
+
+    def send_progress(self, record):
+        if not self.progressConnected:
+            return False
+        if 0 <= self.currentJobIndex < len(self.jobSpecs):
+            spec = json.loads(self.jobSpecs[self.currentJobIndex])
+            record.setdefault("job", spec.get('output_name') or spec['sequence'])
+            record.setdefault("job_index", self.currentJobIndex)
+        record["time"] = time.time()
+        # The host executor adds the uint32 size prefix for us.
+        return self.send_socket_message(json.dumps(record))
            
    
     # This is NOT called for the very first map load (as that is done before Execute is called).
     # This means you can assume this is the resulting callback for the last open_level call.
     @unreal.ufunction(override=True)
     def on_map_load(self, inWorld):
-        # We don't do anything here, but if you were processing a queue and needed to load a map
-        # to render a job, you could call:
-        # 
-        # unreal.GameplayStatics.open_level(self.get_last_loaded_world(), mapPackagePath, True, gameOverrideClassPath)
-        # 
-        # And then know you can continue execution once this function is called. The Executor
-        # lives outside of a map so it can persist state across map loads.
+        # start_next_job calls open_level when the next job in the manifest is
+        # on another map, so this is where that job continues.
         # Don't call open_level from this function as it will lead to an infinite loop.
-        pass
+        if self.activeMoviePipeline is None and 0 <= self.currentJobIndex < len(self.jobSpecs):
+            self.start_current_job()
         
         
     # This needs to be overriden. Doens't have any meaning in runtime executors, only
@@ -231,14 +710,14 @@ class CinemaMPRExecutor(unreal.MoviePipelinePythonHostExecutor):
     # callbacks for delegates need to be marked as UFunctions.
     @unreal.ufunction(ret=None, params=[unreal.MoviePipelineOutputData])
     def on_movie_pipeline_finished(self, results):
-        # We're not processing a whole queue, only a single job so we can
-        # just assume we've reached the end. If your queue had more than 
-        # one job, now would be the time to increment the index of which
-        # job you are working on, and start the next one (instead of calling
-        # on_executor_finished_impl which should be the end of the whole queue)
+        # One job of the session is done; start the next one (or finish the
+        # executor if this was the last).
         unreal.log("Finished rendering movie! Success: " + str(results.success))
+        if not results.success:
+            self.failedJobCount += 1
+        self.send_progress({"type": "job_finished", "success": bool(results.success)})
         self.activeMoviePipeline = None
-        self.on_executor_finished_impl()
+        self.start_next_job()
         
     @unreal.ufunction(ret=None, params=[str])
     def on_socket_message(self, message):
@@ -251,7 +730,30 @@ class CinemaMPRExecutor(unreal.MoviePipelinePythonHostExecutor):
         # uint8 - 'e' 
         # etc.
         # Socket messages sent from the Executor will also be prefixed with a size.
-        pass
+        #
+        # In render server mode these are the commands:
+        #   {"type": "render", "batch": "3", "jobs": [<manifest job>, ...], "quality_profile_file": "..."}
+        #   {"type": "ping"}  answered with {"type": "pong"}
+        #   {"type": "quit"}  exits once the current batch is done
+        if not self.serverMode:
+            return
+        try:
+            command = json.loads(message)
+        except ValueError:
+            unreal.log_warning("Ignoring malformed render server message: %s" % message[:200])
+            return
+        self.lastCommandTime = time.time()
+        commandType = command.get('type')
+        if commandType == 'render':
+            self.start_batch(command)
+        elif commandType == 'ping':
+            self.send_progress({"type": "pong", "busy": self.is_serving_batch()})
+        elif commandType == 'quit':
+            self.quitRequested = True
+            if not self.is_serving_batch():
+                self.on_executor_finished_impl()
+        else:
+            unreal.log_warning("Unknown render server command: %s" % commandType)
         
     @unreal.ufunction(ret=None, params=[int, int, str])
     def on_http_response_recieved(self, inRequestIndex, inResponseCode, inMessage):
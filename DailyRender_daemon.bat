@@ -0,0 +1,5 @@
+@rem Daily render as a long-running service (run at logon instead of the nightly DailyRender_v2.bat task).
+@rem It runs the nightly itself at daemon_settings["nightly_at"] and takes re-render requests during the day:
+@rem   python D:\dailyrender\DailyRender_v2.py rerender <render_name> [--force]
+
+"C:\Users\cine-render\AppData\Local\Programs\Python\Python311\python.exe" -u D:\dailyrender\DailyRender_v2.py daemon >> "D:\dailyrender\render_daemon.log" 2>&1
@@ -6,8 +6,8 @@
 
 mkdir Z:\9_Daily\%DAYSTRING%
 mkdir "C:\Users\cine-render\OneDrive - Madngine\Daily\%DAYSTRING%"
-xcopy Z:\9_Daily\_PERSISTENT\*.* Z:\9_Daily\%DAYSTRING% /y >> "D:\dailyrender\persistent_%DAYSTRING%.log"
-xcopy "C:\Users\cine-render\OneDrive - Madngine\Daily\_PERSISTENT\*.*" "C:\Users\cine-render\OneDrive - Madngine\Daily\%DAYSTRING%" /y >> "D:\dailyrender\persistent_%DAYSTRING%.log"
+@rem _PERSISTENT mirroring (was xcopy) now runs inside DailyRender_v2.py, in the background of the first render.
+@rem When DailyRender_daemon.bat is running on this host it does the nightly itself and this run exits at once.
 
 "C:\Users\cine-render\AppData\Local\Programs\Python\Python311\python.exe" D:\dailyrender\DailyRender_v2.py >> "D:\dailyrender\render_%DAYSTRING%.log"
 
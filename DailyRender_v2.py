@@ -1,158 +1,1440 @@
-from P4 import P4, P4Exception
-# import urllib.request
-import json
-import subprocess
-import os
-import shutil
-import datetime
-import time
-# from pathlib import Path
-
-
-from tendo import singleton
-me = singleton.SingleInstance()
-
-def newest(path):
-    files = os.listdir(path)
-    paths = [os.path.join(path, basename) for basename in files]
-    return max(paths, key=os.path.getctime)
-
-
-render_engines = {
-    'UE_5.0': r"C:\Program Files\Epic Games\UE_5.0\Engine\Binaries\Win64\UnrealEditor.exe",
-    'UE_5.1': r"C:\Program Files\Epic Games\UE_5.1\Engine\Binaries\Win64\UnrealEditor.exe",
-    # 'UE_5.5': r"C:\Program Files\Epic Games\UE_5.5\Engine\Binaries\Win64\UnrealEditor.exe",
-    'UE_5.5': r"D:\Epic Games\UE_5.5\Engine\Binaries\Win64\UnrealEditor.exe",
-    'UE_5.6': r"D:\Epic Games\UE_5.6\Engine\Binaries\Win64\UnrealEditor.exe",
-    # 'TL_4.25': r"C:\UE4\UnrealEngine4_25\Engine\Binaries\Win64\UE4Editor.exe"
-}
-
-render_job_file = r"Z:\9_Daily\data\render_jobs.json"
-#ffmpeg = r"C:\Program Files\ImageMagick-7.0.11-Q16-HDRI\ffmpeg.exe"
-ffmpeg = r"Z:\4_Lib\apps\FFMPEG\bin\ffmpeg.exe"
-
-# server_address = "http://vaalt/daily/"
-# data_string = urllib.request.urlopen(server_address).read()
-# jobs = json.loads(data_string)
-
-jobs = json.load(open(render_job_file, "r"))
-# p4.connect()
-
-today = datetime.date.today().strftime("%Y%m%d")
-
-onedrive_path = r"C:\Users\cine-render\OneDrive - Madngine\Daily"
-
-def force_drive_d(path):
-    # 절대 경로로 변환
-    abs_path = os.path.abspath(path)
-    
-    # 드라이브가 D:가 아니라면, 드라이브 문자만 D:로 바꿈
-    drive, rest = os.path.splitdrive(abs_path)
-    if drive.upper() != "D:":
-        return os.path.join("D:", rest.lstrip("\\/"))
-    else:
-        return abs_path
-    
-for job in jobs["daily_render"]:
-    is_activated = job['activate']
-    host = job['host']
-    if not is_activated or host != 1:
-        continue
-    try:
-        p4 = P4()
-        p4.port = "CinemaPerforce:1666"
-        p4.user = "cine-render"
-        p4.password = "Timeismoney$1$"
-        p4.exception_level = 1
-        p4.connect()
-        
-        render_engine = render_engines[job['engine_version']]
-        uproject_res = p4.run("where", job['ue_project'])
-        uproject_path = uproject_res[0]['path']
-        uproject_path = force_drive_d(uproject_path)
-        uproject_local_path = os.path.dirname(uproject_res[0]['depotFile'])
-        p4.run("sync", uproject_local_path + "/...")
-
-        umap_path = job['ue_umap']
-        seq_path = job['ue_sequence']
-        project_name = job['project_name']
-        render_name = job['render_name'] + f"_{today}"
-        custom_start = job.get('custom_start', 1)
-        daily_path = job['output_directory']
-        # daily_path = job['output_directory'] + "_TEST"
-
-        if "\\\\publicfile\\Cinema\\9_Daily" in daily_path:
-            daily_path = f"\\\\publicfile\\Cinema\\9_Daily\\{today}".replace("\\\\publicfile\\Cinema", "Z:")
-        else:
-            daily_path = f"{daily_path}\\{today}".replace("\\\\publicfile\\Cinema", "Z:")
-        
-        if not os.path.exists(daily_path):
-            os.makedirs(daily_path)
-
-        print(f"Daily Path : {daily_path}")
-
-        onedrive_daily_path = f"{onedrive_path}\\{today}"
-        
-        if not os.path.exists(onedrive_daily_path):
-            os.makedirs(onedrive_daily_path)
-
-        movie_path = f"E:/DAILYRENDER/{today}"
-        render_path = f"E:/DAILYRENDER/{project_name}/{today}"
-
-        if not os.path.exists(movie_path):
-            os.makedirs(movie_path)
-
-        if not os.path.exists(render_path):
-            os.makedirs(render_path)
-
-        resx = job['res_x']
-        resy = job['res_y']
-
-        # render_warmup = job['render_warmup']
-
-        render_command = f'"{render_engine}" "{uproject_path}" {umap_path} -game -unattended -MoviePipelineLocalExecutorClass=/Script/MovieRenderPipelineCore.MoviePipelinePythonHostExecutor'
-        render_command += ' -ExecutorPythonClass=/Engine/PythonTypes.CinemaMPRExecutor '
-        render_command += f'-LevelSequence="{seq_path}" -OutputDirectory="{render_path}" -OutputName="{render_name}" -ResX=1920 -ResY=1080 -RenderResX={resx} -RenderResY={resy} -MovieWarmUpFrames=100 -MovieDelayBeforeWarmUp=1 -log -notexturestreaming -windowed'
-        
-        # 언리얼 4버전에서 다이렉트엑스11 사용.
-        # if render_engine.startswith("4"):
-        #     render_command += ' -dx11'
-        # render_command += ' -dx11'
-
-        render_command = render_command.replace("\\", "\\\\")
-        subprocess.call(render_command)
-
-        print(render_command)
-
-        logPath = os.path.dirname(uproject_path) + "\\Saved\\Logs"
-        logFile = newest(logPath)
-
-        if os.path.isfile(logFile):
-            try:
-                shutil.move(logFile, f"Z:\\9_Daily\\_RENDER\\Logs\\{render_name}_render.log")
-            except:
-                pass
-
-        ffmpeg_command = f"\"{ffmpeg}\" -framerate 30 -start_number {custom_start} -i \"{render_path}\\{render_name}.%04d.png\""
-        #ffmpeg_command += " -vcodec mpeg4 -b:v 128M -preset slow -y "
-        ffmpeg_command += " -y -probesize 5000000 -c:v libx264 -g 1 -tune stillimage -crf 19 -bf 0 -vendor apl0 -pix_fmt yuv420p "
-        ffmpeg_command += f"\"{movie_path}\\{render_name}.mp4\""
-        
-        subprocess.call(ffmpeg_command)
-
-        if os.path.isfile(f"{movie_path}\\{render_name}.mp4"):
-            try:
-                shutil.copy(f"{movie_path}\\{render_name}.mp4", f"{daily_path}\\{render_name}.mp4")
-                shutil.copy(f"{movie_path}\\{render_name}.mp4", f"{onedrive_daily_path}\\{render_name}.mp4")
-            except:
-                pass
-        time.sleep(300)
-
-    except IndexError:
-        print("no render_engine")
-
-#C:\Program Files\Epic Games\UE_4.25\Engine\Binaries\Win64\UE4Editor.exe
-#"D:\\\\depot\\Universe\\Universe_MV\\Universe_MV.uproject" "/Game/VisualTech/Map/ATEEZ_P" -game -MovieSceneCaptureType="/Script/MovieSceneCapture.AutomatedLevelSequenceCapture" -LevelSequence="/Game/VisualTech/Seq/1_ATEEZ/ATEEZ_master" -MovieFrameRate=30 -MovieFolder="T:\\9_Daily\\_RENDER\\Universe_MV\\20201012" -MovieName="1_ATEEZ_20201012" -noloadingscreen -ResX=1920 -ResY=1080 -ForceRes -MovieFormat=PNG -MovieQuality=100 -notexturestreaming -MovieCinematicMode=yes -NoScreenMessages -windowed -MovieWarmUpFrames=60
-
-# print(jobs)
-
+# import urllib.request
+import json
+import subprocess
+import os
+import posixpath
+import shutil
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+# from pathlib import Path
+
+from encode import (OUTPUT_FORMATS, StreamingEncoder, encode_segmented, encode_sequence, encode_targets, encode_video,
+                    target_files)
+from fanout_copy import fanout_copy
+from frame_scan import frames_in, scan_sequence, scan_summary
+from frames import existing_frames, resume_stamp_path
+from job_model import JobError, parse_jobs
+from p4_session import P4Session
+from perf_db import PerfDB
+from persistent_mirror import MirrorJob
+from preflight import GB, FrameSizeHistory, check_disk_space, check_engine, check_writable, sequence_bytes
+from progress import ProgressListener
+from render_cache import RenderCache, params_hash
+from render_daemon import RenderDaemon, WatchedFile, write_request
+from render_pipeline import StagedPipeline
+from render_server import WarmWorker, WarmWorkerPool, WorkerLost
+from scratch_gc import ScratchRetention
+from shards import ShardTicketWorker, ShardTickets, job_hosts, missing_ranges, plan_shards, wait_for_frames
+from stall_watchdog import Stalled, file_count, file_size, run_supervised
+from ue_log import LogAnalyzer, LogTailer, write_index
+from warmup import WarmupHistory, settle_frame
+from work_queue import LeaseKeeper, WorkQueue
+
+
+render_engines = {
+    'UE_5.0': r"C:\Program Files\Epic Games\UE_5.0\Engine\Binaries\Win64\UnrealEditor.exe",
+    'UE_5.1': r"C:\Program Files\Epic Games\UE_5.1\Engine\Binaries\Win64\UnrealEditor.exe",
+    # 'UE_5.5': r"C:\Program Files\Epic Games\UE_5.5\Engine\Binaries\Win64\UnrealEditor.exe",
+    'UE_5.5': r"D:\Epic Games\UE_5.5\Engine\Binaries\Win64\UnrealEditor.exe",
+    'UE_5.6': r"D:\Epic Games\UE_5.6\Engine\Binaries\Win64\UnrealEditor.exe",
+    # 'TL_4.25': r"C:\UE4\UnrealEngine4_25\Engine\Binaries\Win64\UE4Editor.exe"
+}
+
+render_job_file = r"Z:\9_Daily\data\render_jobs.json"
+render_cache_file = r"Z:\9_Daily\data\render_cache.json"
+# 렌더 품질 프로필 (CinemaMPRExecutor 가 읽음). 잡의 "quality" 는 이 파일에 있는 이름이어야 함.
+render_profile_file = r"Z:\9_Daily\data\render_profiles.json"
+warmup_history_file = r"Z:\9_Daily\data\warmup_history.json"
+frame_size_history_file = r"Z:\9_Daily\data\frame_sizes.json"
+shard_ticket_root = r"Z:\9_Daily\data\shards"
+# 여러 렌더 호스트가 같이 쓰는 작업 큐 (pipeline 의 "work_queue": true 일 때).
+work_queue_file = r"Z:\9_Daily\data\work_queue.db"
+perf_db_file = r"D:\dailyrender\render_perf.db"
+# 렌더 로그와 로그 분석 결과(<이름>_render.index.json)를 모아두는 곳.
+render_log_dir = r"Z:\9_Daily\_RENDER\Logs"
+#ffmpeg = r"C:\Program Files\ImageMagick-7.0.11-Q16-HDRI\ffmpeg.exe"
+ffmpeg = r"Z:\4_Lib\apps\FFMPEG\bin\ffmpeg.exe"
+
+# server_address = "http://vaalt/daily/"
+# data_string = urllib.request.urlopen(server_address).read()
+# jobs = json.loads(data_string)
+
+today = datetime.date.today().strftime("%Y%m%d")
+
+onedrive_path = r"C:\Users\cine-render\OneDrive - Madngine\Daily"
+daily_root = r"Z:\9_Daily"
+
+# _PERSISTENT 폴더를 오늘 폴더로 미러링 (예전 bat 의 xcopy). (이름, 원본, 날짜 폴더 루트, 하드링크 사용)
+# OneDrive 쪽은 동기화가 하드링크를 제대로 따라가지 않아서 복사만 한다.
+persistent_mirrors = [
+    ("daily", daily_root + r"\_PERSISTENT", daily_root, True),
+    ("onedrive", onedrive_path + r"\_PERSISTENT", onedrive_path, False),
+]
+persistent_manifest_dir = r"D:\dailyrender"
+# 미러링은 밤 실행에서 이 호스트만 한다 (큐 모드로 여러 호스트가 돌아도 한 번만).
+persistent_mirror_host = 1
+
+scratch_root = "E:/DAILYRENDER"
+
+render_host = 1
+
+# 데몬 모드 (python DailyRender_v2.py daemon). 밤마다 bat 으로 새로 띄우는 대신 계속 떠 있으면서
+# P4 연결, 띄워 둔 에디터(warm_workers), 읽어 둔 잡/기록을 유지하고, render_jobs.json 이 바뀌면 바로 다시 읽어서 검사.
+# nightly_at 에 하루 한 번 데일리를 돌리고 (그 시각에 꺼져 있었으면 nightly_window 시간 안에 켜질 때 바로),
+# 낮에는 daemon_request_dir 에 들어온 다시 렌더 요청(python DailyRender_v2.py rerender <render_name> ...)을 처리.
+# poll 은 잡 파일/요청 확인 간격(초). 상태(마지막 데일리 날짜)는 daemon_state_file.
+daemon_settings = {
+    "nightly_at": "01:00",
+    "nightly_window": 6,
+    "poll": 30,
+}
+daemon_request_dir = r"Z:\9_Daily\data\requests"
+daemon_state_file = r"D:\dailyrender\daemon_state.json"
+
+# 스테이지별 동시 작업 수. render_jobs.json 의 "pipeline" 항목으로 덮어쓸 수 있음.
+#   "pipeline": {"sync": 1, "render": 1, "encode": 2, "copy": 2, "sync_ahead": 1, "render_cooldown": 0}
+# sync_ahead 는 렌더를 기다리며 미리 싱크해 둘 수 있는 잡 수.
+# render_cooldown 은 렌더가 끝난 뒤 다음 렌더를 시작하기 전 대기 시간(초). 예전엔 잡마다 300초를 쉬었음.
+# render_cache 가 false 면 변경이 없어도 항상 다시 렌더. 잡 단위로는 "force_render": true.
+# encode_mode 가 "stream" 이면 렌더 중에 나오는 프레임을 바로 ffmpeg 로 인코딩. 잡 단위로 "encode_mode" 지정 가능.
+# group_renders 가 true 면 ue_project/engine_version 이 같은 잡을 에디터 한 번 실행으로 묶어서 렌더.
+# encode_mode 가 "segmented" 면 시퀀스를 encode_segments 개로 나눠 동시에 인코딩한 뒤 재인코딩 없이 이어 붙임.
+# 잡에 "shards": K, "frame_count": N 이 있으면 프레임 범위를 K 개로 나눠 렌더 (shards.py 참고).
+#   "host": [1, 2] 처럼 여러 호스트를 적으면 첫 호스트가 주인이고 나머지는 티켓을 받아 렌더.
+#   여러 호스트가 같이 쓰려면 "render_root" 를 공유 경로로 지정해야 함.
+# local_shards 는 이 호스트에서 동시에 띄울 샤드 프로세스 수.
+# progress_interval 은 에디터가 진행 상황을 보내는 간격(초), progress_report 는 로그에 찍는 간격(초).
+# warmup_mode 가 "fixed" 면 항상 warmup_frames (잡의 "render_warmup" 이 있으면 그 값) 만큼 워밍업.
+#   "adaptive" 면 지난 렌더에서 프레임 시간/스트리밍이 안정될 때까지 걸린 프레임 수로 다음 워밍업을 정함 (warmup.py).
+#   "calibrate" 면 렌더 전에 워밍업 없이 앞 warmup_calibration_frames 프레임을 따로 렌더해서 직접 잰다.
+#   잡 단위로 "warmup_mode" 지정 가능. 정해진 값은 warmup_min ~ warmup_max 안으로 자름.
+# output_format 은 에디터가 쓰는 중간 결과물 (잡 단위로 "output_format" 지정 가능).
+#   png/bmp/exr 는 프레임 시퀀스를 ffmpeg 로 인코딩. bmp 는 쓰기가 빠르고, exr 은 압축(exr_compression)을 고를 수 있음.
+#   prores/dnx 는 MRQ 가 잡마다 영상 하나를 쓰고 여기서는 mp4 로 변환만, cmdline 은 MRQ 커맨드라인 인코더가 만든 mp4 를 그대로 씀.
+#   영상 포맷은 샤드/스트림/분할 인코딩을 쓸 수 없고, 스트림 인코딩은 png 일 때만.
+# preflight_reserve_gb 는 렌더 드라이브에 항상 남겨둘 여유 공간(GB). 프레임이 들어갈 자리가 없는 잡은 시작 전에 실패 처리.
+# 스크래치 정리: 렌더 전에 스크래치 사용량이 scratch_budget_gb 를 넘거나 드라이브 여유가 preflight_reserve_gb 보다
+#   모자라면, daily_path 로 복사가 확인된 것만 오래 안 쓴 프레임부터 지우고, mp4 는 movie_keep_days 가 지난 것만 지움.
+#   frames_keep_days 는 프레임을 최소 며칠 남겨둘지. 장부는 scratch_root 의 scratch_ledger.json.
+# 로컬 샤드를 다 렌더했을 때(로컬 샤드가 없으면 shard_claim_timeout 안에) 다른 호스트가 가져가지 않은 샤드는 직접 렌더,
+#   shard_timeout 이 지나도 빠진 프레임은 직접 다시 렌더.
+# resume_frames 가 true 면 같은 렌더 경로에 이전 시도(크래시, 워치독 재시작, 다시 실행)의 프레임이 남아 있을 때
+#   빠졌거나 덜 쓴 프레임 범위만 다시 렌더. 같은 체인지리스트/설정/포맷으로 렌더된 프레임일 때만 (.<이름>.resume.json).
+#   프레임 수는 잡의 frame_count, 없으면 이전 시도에서 에디터가 알려준 값. 이어 렌더한 잡은 배치 인코딩.
+#   잡 단위로 "resume_frames": false 면 남은 프레임을 지우고 처음부터 (rerender --force 가 이렇게 한다).
+# work_queue 가 true 면 "host" 로 잡을 고정하지 않고 모든 호스트가 공유 큐(work_queue_file)에서 다음 잡을 가져감.
+#   설치된 엔진으로 렌더할 수 있는 잡만, "host" 에 이 호스트가 있는 잡을 먼저. 다른 호스트 잡도 queue_affinity_wait 초
+#   기다린 뒤에는 가져감. 가져간 잡은 queue_lease 초짜리 임대로, 호스트가 죽어서 갱신이 끊기면 다시 큐로
+#   (queue_max_attempts 번까지). 할 잡이 없으면 queue_poll 초마다 다시 확인.
+# 워치독: 에디터는 render_stall_timeout 초, ffmpeg 는 encode_stall_timeout 초 동안 프레임/로그/출력 파일이 하나도
+#   늘지 않으면 강제 종료하고 stall_retries 번까지 다시 실행. 그래도 멈추면 그 잡은 실패 처리하고 다음 잡으로.
+#   날린 시간은 perf DB 에 render_stall/encode_stall 로 기록. 0 이면 워치독 끔. watchdog_interval 은 확인 간격(초).
+# quality 는 렌더 품질 프로필 이름 (render_profile_file). "final" 은 예전과 같은 최종 품질,
+#   "preview" 는 AA 샘플을 줄이고 LOD/그림자 거리를 기본값으로, 텍스처 스트리밍을 켠 빠른 미리보기.
+#   잡 단위로 "quality" 지정 가능. 품질이 다르면 렌더 캐시도 따로. 프레임당 렌더 시간은 perf DB 의 frame_time.
+# 인코딩 전에 프레임 시퀀스를 frame_scan_workers 개 스레드로 검사 (빠진 프레임, 0 바이트, 덜 쓴 PNG).
+#   깨진 범위만 frame_repair_attempts 번까지 다시 렌더하고, 그래도 깨져 있으면 그 잡은 실패. 검사 결과는 perf DB 의 frame_scan.
+# encode_targets 는 리뷰 mp4 와 같은 ffmpeg 실행에서 (프레임은 한 번만 디코딩) 같이 만드는 결과물 목록 (encode.py).
+#   [{"kind": "proxy", "scale": 0.5}, {"kind": "thumbnails", "every": 24, "width": 480},
+#    {"kind": "contact_sheet", "every": 48, "width": 320, "columns": 8, "rows": 6}]
+#   잡 단위로 "encode_targets" 지정 가능. daily_path 의 <이름>_extras 폴더로 복사. 분할 인코딩/영상 포맷/캐시 재사용은
+#   완성된 mp4 를 한 번 더 디코딩해서 만든다.
+# warm_workers 가 true 면 프로젝트/엔진마다 에디터를 띄워 둔 채로 (render_server.py) 소켓으로 잡을 보내서 렌더.
+#   에디터 시작/맵 로드/셰이더 컴파일은 처음 한 번만. warm_idle_timeout 초 동안 일이 없거나 프로젝트를 싱크하기 전,
+#   다른 체인지리스트로 싱크됐으면 내리고 다시 띄움. 동시에 띄워 두는 에디터는 warm_max 개까지.
+#   띄워 둔 에디터가 다른 렌더에 쓰이는 중이거나 죽거나 멈추면 그 렌더는 예전처럼 새 에디터로. 샤드/워밍업 보정도 새 에디터로.
+pipeline_settings = {
+    "sync": 1,
+    "render": 1,
+    "encode": 2,
+    "copy": 2,
+    "sync_ahead": 1,
+    "render_cooldown": 0,
+    "render_cache": True,
+    "encode_mode": "batch",
+    "encode_segments": 4,
+    "group_renders": True,
+    "local_shards": 1,
+    "shard_claim_timeout": 600,
+    "shard_timeout": 4 * 3600,
+    "progress_interval": 2,
+    "progress_report": 60,
+    "warmup_mode": "fixed",
+    "warmup_frames": 100,
+    "warmup_min": 8,
+    "warmup_max": 300,
+    "warmup_calibration_frames": 240,
+    "preflight_reserve_gb": 20,
+    "output_format": "png",
+    "scratch_budget_gb": 1500,
+    "frames_keep_days": 0,
+    "movie_keep_days": 14,
+    "render_stall_timeout": 1800,
+    "encode_stall_timeout": 600,
+    "stall_retries": 1,
+    "watchdog_interval": 10,
+    "resume_frames": True,
+    "work_queue": False,
+    "queue_lease": 300,
+    "queue_affinity_wait": 120,
+    "queue_max_attempts": 3,
+    "queue_poll": 30,
+    "quality": "final",
+    "frame_scan_workers": 16,
+    "frame_repair_attempts": 1,
+    "encode_targets": [],
+    "warm_workers": False,
+    "warm_idle_timeout": 1800,
+    "warm_max": 1,
+}
+# 데몬에서는 실행마다 기본값에서 시작해서 그 잡 파일의 "pipeline" 을 덮어쓴다.
+default_pipeline_settings = dict(pipeline_settings)
+
+# 같은 프로젝트는 렌더 중에 싱크하면 안 되므로 uproject 단위로 잠금.
+_project_locks = {}
+_project_locks_guard = threading.Lock()
+
+
+def project_lock(ue_project):
+    with _project_locks_guard:
+        return _project_locks.setdefault(ue_project, threading.Lock())
+
+
+def force_drive_d(path):
+    # 절대 경로로 변환
+    abs_path = os.path.abspath(path)
+
+    # 드라이브가 D:가 아니라면, 드라이브 문자만 D:로 바꿈
+    drive, rest = os.path.splitdrive(abs_path)
+    if drive.upper() != "D:":
+        return os.path.join("D:", rest.lstrip("\\/"))
+    else:
+        return abs_path
+
+
+p4_settings = {
+    "port": "CinemaPerforce:1666",
+    "user": "cine-render",
+    "password": "Timeismoney$1$",
+}
+
+# 실행 전체에서 하나의 P4 연결을 공유. run_daily 에서 만든다.
+p4_session = None
+render_cache = None
+warmup_history = None
+frame_sizes = None
+retention = None
+render_slots = None
+shard_tickets = None
+progress_listener = None
+perf = None
+work_queue = None
+warm_pool = None
+# 렌더 캐시/워밍업/프레임 크기 기록 파일. 데몬에서는 바뀌었을 때만 다시 읽는다.
+history_files = {}
+# 큐에서 가져온 잡 -> 그 잡이 속한 큐 항목. 항목의 잡이 모두 끝나면 큐에 결과를 남긴다.
+queue_claims = {}
+queue_claims_lock = threading.Lock()
+
+
+def job_label(job):
+    return job.get('render_name', '?')
+
+
+def timed(ctx, stage, detail=None):
+    # 스테이지 시간 기록. 잡 이름은 날짜 없는 render_name 으로 해서 날짜별로 비교할 수 있게.
+    job = ctx['job'] if 'job' in ctx else ctx
+    return perf.timed(job['render_name'], stage, engine=job.get('engine_version'), detail=detail)
+
+
+def choose_warmup(ctx):
+    job = ctx['job']
+    if ctx['warmup_mode'] == "fixed":
+        return job.get('render_warmup', pipeline_settings["warmup_frames"])
+    return warmup_history.choose(job, job['engine_version'], pipeline_settings["warmup_frames"],
+                                 pipeline_settings["warmup_min"], pipeline_settings["warmup_max"])
+
+
+def job_daily_path(job):
+    daily_path = job['output_directory']
+    # daily_path = job['output_directory'] + "_TEST"
+
+    if "\\\\publicfile\\Cinema\\9_Daily" in daily_path:
+        return f"\\\\publicfile\\Cinema\\9_Daily\\{today}".replace("\\\\publicfile\\Cinema", "Z:")
+    return f"{daily_path}\\{today}".replace("\\\\publicfile\\Cinema", "Z:")
+
+
+def job_render_root(job):
+    return job.get('render_root', scratch_root)
+
+
+def job_output_format(job):
+    return job.get('output_format', pipeline_settings["output_format"])
+
+
+def sync_job(job):
+    render_engine = render_engines[job['engine_version']]
+
+    # 같은 depot 루트는 실행당 한 번만 싱크하고, 이후 잡은 결과를 재사용.
+    with project_lock(job['ue_project']), timed(job, "sync"):
+        # 띄워 둔 에디터가 파일을 잡고 있으면 싱크가 실패하므로, 받을 파일이 있으면 먼저 내린다.
+        uproject_res = p4_session.sync_project(job['ue_project'],
+                                               before=lambda depot_root: stop_warm_workers(job['ue_project'], depot_root))
+        synced_change = p4_session.have_change(posixpath.dirname(uproject_res['depotFile']))
+    uproject_path = force_drive_d(uproject_res['path'])
+
+    project_name = job['project_name']
+    daily_path = job_daily_path(job)
+
+    onedrive_daily_path = f"{onedrive_path}\\{today}"
+    movie_path = f"{scratch_root}/{today}"
+    render_path = f"{job_render_root(job)}/{project_name}/{today}"
+    render_name = job['render_name'] + f"_{today}"
+
+    for path in (daily_path, onedrive_daily_path, movie_path, render_path):
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+
+    print(f"Daily Path : {daily_path}")
+
+    output_format = job_output_format(job)
+    output_kind, output_ext = OUTPUT_FORMATS[output_format]
+    encode_mode = job.get('encode_mode', pipeline_settings["encode_mode"])
+    shards = job.get('shards', 1) if job.get('frame_count') else 1
+    if output_kind == "video":
+        encode_mode, shards = "batch", 1
+    elif encode_mode == "stream" and output_ext != "png":
+        encode_mode = "batch"
+
+    # 프로젝트/엔진/렌더 설정이 지난 데일리와 같으면 이전 mp4 를 재사용.
+    cached_movie = None
+    if pipeline_settings["render_cache"] and not job.get('force_render', False):
+        cached_movie = render_cache.lookup(job, synced_change)
+        if cached_movie:
+            print(f"Render cache hit : {job['render_name']} @{synced_change} -> {cached_movie}")
+
+    ctx = {
+        'job': job,
+        'render_engine': render_engine,
+        'uproject_path': uproject_path,
+        'umap_path': job['ue_umap'],
+        'seq_path': job['ue_sequence'],
+        'project_name': project_name,
+        'render_name': render_name,
+        'custom_start': job.get('custom_start', 1),
+        'daily_path': daily_path,
+        'onedrive_daily_path': onedrive_daily_path,
+        'movie_path': movie_path,
+        'movie_file': os.path.join(movie_path, f"{render_name}.mp4"),
+        'render_path': render_path,
+        'resx': job['res_x'],
+        'resy': job['res_y'],
+        'synced_change': synced_change,
+        'cached_movie': cached_movie,
+        'encode_mode': encode_mode,
+        'encoded': False,
+        'frame_count': job.get('frame_count'),
+        'shards': shards,
+        'output_format': output_format,
+        'output_kind': output_kind,
+        'output_ext': output_ext,
+        'warmup_mode': job.get('warmup_mode', pipeline_settings["warmup_mode"]),
+        'quality': job.get('quality', pipeline_settings["quality"]),
+        'encode_targets': job.get('encode_targets', pipeline_settings["encode_targets"]),
+    }
+    ctx['warmup'] = choose_warmup(ctx)
+    return ctx
+
+
+def manifest_jobs(ctxs, frame_range=None):
+    # CinemaMPRExecutor 가 한 번의 에디터 실행(또는 띄워 둔 에디터의 배치 하나)에서 차례로 렌더할 잡 목록.
+    return [{
+        'sequence': ctx['seq_path'],
+        'map': ctx['umap_path'],
+        'output_name': ctx['render_name'],
+        'output_directory': ctx['render_path'],
+        'res_x': ctx['resx'],
+        'res_y': ctx['resy'],
+        'warm_up_frames': ctx['warmup'],
+        'output_format': ctx['output_format'],
+        'exr_compression': ctx['job'].get('exr_compression', "PIZ"),
+        'frame_ranges': [list(frame_range)] if frame_range else ctx.get('resume_ranges'),
+        'quality_profile': ctx['quality'],
+    } for ctx in ctxs]
+
+
+def write_job_manifest(ctxs):
+    manifest_file = os.path.join(ctxs[0]['movie_path'], f"{ctxs[0]['render_name']}_jobs.json")
+    manifest = {"jobs": manifest_jobs(ctxs)}
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest_file
+
+
+def build_render_command(ctxs, frame_range=None, log_file=None):
+    ctx = ctxs[0]
+    render_command = f'"{ctx["render_engine"]}" "{ctx["uproject_path"]}" {ctx["umap_path"]} -game -unattended -MoviePipelineLocalExecutorClass=/Script/MovieRenderPipelineCore.MoviePipelinePythonHostExecutor'
+    render_command += ' -ExecutorPythonClass=/Engine/PythonTypes.CinemaMPRExecutor '
+    if len(ctxs) == 1:
+        render_command += f'-LevelSequence="{ctx["seq_path"]}" -OutputDirectory="{ctx["render_path"]}" -OutputName="{ctx["render_name"]}" -ResX=1920 -ResY=1080 -RenderResX={ctx["resx"]} -RenderResY={ctx["resy"]}'
+        render_command += f' -OutputFormat={ctx["output_format"]}'
+        if ctx['output_format'] == "exr":
+            render_command += f' -ExrCompression={ctx["job"].get("exr_compression", "PIZ")}'
+        if frame_range:
+            render_command += f' -StartFrame={frame_range[0]} -EndFrame={frame_range[1]}'
+        elif ctx.get('resume_ranges'):
+            render_command += ' -FrameRanges=' + ",".join(f"{a}-{b}" for a, b in ctx['resume_ranges'])
+        render_command += f' -QualityProfile={ctx["quality"]}'
+    else:
+        render_command += f'-JobManifest="{write_job_manifest(ctxs)}" -ResX=1920 -ResY=1080'
+    if progress_listener is not None:
+        render_command += f' -ProgressPort={progress_listener.port} -ProgressInterval={pipeline_settings["progress_interval"]}'
+    if log_file:
+        render_command += f' -abslog="{log_file}"'
+    render_command += f' -QualityProfileFile="{render_profile_file}"'
+    render_command += f' -MovieWarmUpFrames={max(c["warmup"] for c in ctxs)} -MovieDelayBeforeWarmUp=1 -log -windowed'
+    # 텍스처 스트리밍은 프로세스 전체 설정이라, 미리보기 잡이 하나라도 있으면 끄지 않는다.
+    # final 잡은 프로필의 texture_streaming 으로 스트리밍을 끔.
+    if all(c['quality'] == "final" for c in ctxs):
+        render_command += ' -notexturestreaming'
+
+    # 언리얼 4버전에서 다이렉트엑스11 사용.
+    # if render_engine.startswith("4"):
+    #     render_command += ' -dx11'
+    # render_command += ' -dx11'
+
+    return render_command.replace("\\", "\\\\")
+
+
+def build_worker_command(ctx, port, log_file):
+    # 띄워 둔 에디터용. 잡은 소켓으로 받으므로 프로젝트와 첫 맵만.
+    # 텍스처 스트리밍은 배치마다 품질이 달라질 수 있어서 끄지 않고, final 프로필의 texture_streaming 으로 끈다.
+    render_command = f'"{ctx["render_engine"]}" "{ctx["uproject_path"]}" {ctx["umap_path"]} -game -unattended -MoviePipelineLocalExecutorClass=/Script/MovieRenderPipelineCore.MoviePipelinePythonHostExecutor'
+    render_command += ' -ExecutorPythonClass=/Engine/PythonTypes.CinemaMPRExecutor -ResX=1920 -ResY=1080'
+    # 이쪽이 죽어도 에디터가 혼자 남지 않게, 에디터도 조금 더 기다린 뒤 스스로 종료.
+    render_command += f' -RenderServerPort={port} -RenderServerIdle={pipeline_settings["warm_idle_timeout"] + 300}'
+    render_command += f' -ProgressInterval={pipeline_settings["progress_interval"]} -abslog="{log_file}"'
+    render_command += ' -MovieDelayBeforeWarmUp=1 -log -windowed'
+    return render_command.replace("\\", "\\\\")
+
+
+def stream_encode(ctxs, render):
+    # 그룹은 순서대로 렌더되므로, 다음 잡의 프레임이 나오기 시작하면 앞 잡은 끝난 것으로 본다.
+    done = threading.Event()
+
+    def is_rendering(index):
+        if done.is_set():
+            return False
+        if index + 1 < len(ctxs):
+            following = ctxs[index + 1]
+            return not existing_frames(following['render_path'], following['render_name'])
+        return True
+
+    threads = []
+    for index, ctx in enumerate(ctxs):
+        encoder = StreamingEncoder(ffmpeg, ctx['render_path'], ctx['render_name'], ctx['custom_start'], ctx['movie_file'],
+                                   targets=ctx['encode_targets'])
+
+        def run(encoder=encoder, ctx=ctx, index=index):
+            returncode = encoder.run(lambda: is_rendering(index))
+            # ffmpeg 가 실패하면 encode_job 이 프레임에서 다시 배치 인코딩.
+            ctx['encoded'] = returncode == 0
+            if returncode != 0:
+                print(f"Stream encode {ctx['render_name']} failed (ffmpeg exit code {returncode}), encoding in batch")
+                return
+            print(f"Stream encoded {ctx['render_name']}: {encoder.frames_written} frames, gaps: {encoder.gaps}")
+
+        t = threading.Thread(target=run, name=f"stream-{ctx['render_name']}")
+        t.start()
+        threads.append(t)
+    try:
+        return render()
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+
+
+def supervised_call(ctx, stage, launch, probes, stall_timeout):
+    # 워치독 아래에서 실행. 멈춰서 죽인 시도마다 날린 시간을 기록하고, 재시도까지 멈추면 Stalled.
+    job = ctx['job']
+
+    def on_stall(attempt, lost, idle):
+        perf.record(job['render_name'], f"{stage}_stall", lost, engine=job['engine_version'], ok=False,
+                    detail=f"attempt {attempt}, no progress for {idle:.0f}s")
+
+    return run_supervised(launch, probes, stall_timeout, retries=pipeline_settings["stall_retries"],
+                          poll_interval=pipeline_settings["watchdog_interval"], on_stall=on_stall,
+                          label=f"{stage} {ctx['render_name']}")
+
+
+def render_probes(ctxs, log_file):
+    # 에디터가 살아 있다는 신호: 로그가 늘거나, 프레임 파일이 생기거나, 진행 상황 프레임이 바뀌거나.
+    probes = [file_size(log_file)]
+    for ctx in ctxs:
+        probes.append(file_count(ctx['render_path'], ctx['render_name'] + "."))
+        if progress_listener is not None:
+            probes.append(lambda name=ctx['render_name']: getattr(progress_listener.get(name), 'frame', None))
+    return probes
+
+
+def encode_call(ctx):
+    # encode.py 의 ffmpeg 실행을 워치독으로. 출력 파일(항상 마지막 인자)이 커지는 동안은 살아 있는 것.
+    # 썸네일/컨택트 시트만 만드는 실행은 movie_path 에 이미지가 늘어나는 것으로.
+    def call(command, **kwargs):
+        probes = [file_size(command[-1]), file_count(ctx['movie_path'], f"{ctx['render_name']}_")]
+        return supervised_call(ctx, "encode", lambda: subprocess.Popen(command, **kwargs), probes,
+                               pipeline_settings["encode_stall_timeout"])
+    return call
+
+
+def archive_log(ctxs, log_name, log_file, analyzer):
+    # 로그를 Logs 폴더로 옮기고, 잡별 분석 결과를 옆에 남긴다.
+    index = analyzer.index()
+    try:
+        write_index(os.path.join(render_log_dir, f"{log_name}_render.index.json"), index)
+    except OSError as e:
+        print(f"Could not write log index for {log_name}: {e}")
+    if os.path.isfile(log_file):
+        try:
+            shutil.move(log_file, os.path.join(render_log_dir, f"{log_name}_render.log"))
+        except OSError as e:
+            print(f"Could not move render log {log_file}: {e}")
+
+    for ctx in ctxs:
+        stats = index.get(ctx['render_name'])
+        if stats is None:
+            continue
+        frames = stats['frames'] or {}
+        print(f"Log {ctx['render_name']} ({ctx['quality']}): {frames.get('count', 0)} frames, mean {frames.get('mean_ms', '-')} ms,"
+              f" p95 {frames.get('p95_ms', '-')} ms, shaders {stats['shaders']['compile_seconds']}s,"
+              f" stalls {stats['stalls']['count']}, warnings {stats['warnings']}, errors {stats['errors']}")
+        # 품질 프로필별 프레임당 렌더 시간 (초).
+        if frames.get('mean_ms') is not None:
+            perf.record(ctx['job']['render_name'], "frame_time", frames['mean_ms'] / 1000.0,
+                        engine=ctx['job']['engine_version'],
+                        detail=f"{ctx['quality']}, {frames['count']} frames, p95 {frames.get('p95_ms')} ms")
+        if stats['shaders']['compile_seconds']:
+            perf.record(ctx['job']['render_name'], "shader_compile", stats['shaders']['compile_seconds'],
+                        engine=ctx['job']['engine_version'], detail=f"backlog {stats['shaders']['backlog_max']}")
+
+        # 워밍업 뒤에도 안정될 때까지 걸린 프레임 수를 다음 워밍업 계산용으로 기록.
+        job_stats = analyzer.jobs[ctx['render_name']]
+        settle = settle_frame(job_stats.frame_ms, job_stats.stall_frames)
+        # 이어 렌더한 잡은 프레임 시간이 여러 범위에 걸쳐 있어서 기록하지 않음.
+        if settle is not None and not ctx.get('resume_ranges'):
+            warmup_history.record(ctx['job'], ctx['job']['engine_version'], ctx['warmup'], settle, today,
+                                  calibration=ctx.get('calibration', False))
+            print(f"Warm-up {ctx['render_name']}: {ctx['warmup']} frames, settled {settle} frames later")
+
+
+def run_editor(ctxs, log_name, frame_range=None, wrap=None):
+    # 에디터를 자기 로그 파일(-abslog)로 띄우고, 렌더하는 동안 그 로그를 따라가며 분석.
+    # wrap 이 있으면 렌더 함수를 넘겨서 그 안에서 실행 (스트림 인코딩).
+    log_file = os.path.join(scratch_root, "logs", f"{log_name}.log")
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    if os.path.isfile(log_file):
+        os.remove(log_file)
+    analyzer = LogAnalyzer()
+    tailer = LogTailer(log_file, analyzer)
+    tailer.start()
+    render_command = build_render_command(ctxs, frame_range, log_file)
+    print(render_command)
+
+    def render():
+        return supervised_call(ctxs[0], "render", lambda: subprocess.Popen(render_command),
+                               render_probes(ctxs, log_file), pipeline_settings["render_stall_timeout"])
+
+    try:
+        return wrap(render) if wrap else render()
+    finally:
+        tailer.stop()
+        tailer.join()
+        archive_log(ctxs, log_name, log_file, analyzer)
+
+
+def warm_key(ctx):
+    return (ctx['job']['ue_project'], ctx['job']['engine_version'])
+
+
+def stop_warm_workers(ue_project, depot_root):
+    if warm_pool is None or not any(key[0] == ue_project for key in warm_pool.keys()):
+        return
+    if p4_session.sync_pending(depot_root):
+        warm_pool.stop_where(lambda key: key[0] == ue_project)
+
+
+def start_warm_worker(worker, ctx):
+    os.makedirs(os.path.dirname(worker.log_file), exist_ok=True)
+    if os.path.isfile(worker.log_file):
+        os.remove(worker.log_file)
+    with timed(ctx, "warm_start", detail=f"@{worker.change}"):
+        worker.start(lambda port: subprocess.Popen(build_worker_command(ctx, port, worker.log_file)),
+                     [file_size(worker.log_file)], pipeline_settings["render_stall_timeout"],
+                     pipeline_settings["watchdog_interval"])
+    print(f"Warm worker started: {worker}")
+
+
+def progress_frames(ctxs):
+    # 잡마다 진행 상황에 보고된 마지막 프레임. 이 사이에 바뀌었으면 그만큼 렌더한 것.
+    return [getattr(progress_listener.get(ctx['render_name']), 'frame', 0) for ctx in ctxs]
+
+
+def run_warm(ctxs, log_name, wrap=None):
+    # 띄워 둔 에디터에 배치로 보내서 렌더. 에디터 로그는 이번 배치가 쓴 부분만 분석하고 잘라서 Logs 로.
+    # 에디터를 쓸 수 없으면 None, 띄우다 실패하거나 멈추면 WorkerLost/Stalled (새 에디터로 렌더).
+    # 렌더 중에 에디터가 죽으면 새 에디터처럼 종료 코드를 돌려주고, 빠진 프레임은 verify_frames 가 다시 렌더.
+    # 한 프레임도 못 그리고 죽었으면 (배치를 받자마자 크래시) WorkerLost 로 새 에디터에 넘긴다.
+    ctx = ctxs[0]
+    key = warm_key(ctx)
+    log_file = os.path.join(scratch_root, "logs", f"warm_{ctx['project_name']}_{ctx['job']['engine_version']}.log")
+    worker = warm_pool.checkout(key, ctx['synced_change'],
+                                lambda: WarmWorker(key, ctx['synced_change'], log_file, lambda record: progress_listener.feed(record)))
+    if worker is None:
+        return None
+    try:
+        if not worker.alive():
+            start_warm_worker(worker, ctx)
+        start_offset = os.path.getsize(worker.log_file) if os.path.isfile(worker.log_file) else 0
+        analyzer = LogAnalyzer()
+        tailer = LogTailer(worker.log_file, analyzer, start_offset=start_offset)
+        tailer.start()
+        jobs = manifest_jobs(ctxs)
+
+        def render():
+            started = time.monotonic()
+            before = progress_frames(ctxs)
+            try:
+                result = worker.render(jobs, render_probes(ctxs, worker.log_file), pipeline_settings["render_stall_timeout"],
+                                       pipeline_settings["watchdog_interval"], render_profile_file)
+            except Stalled as e:
+                perf.record(ctx['job']['render_name'], "render_stall", time.monotonic() - started,
+                            engine=ctx['job']['engine_version'], ok=False, detail=f"warm worker, {e}")
+                raise
+            except WorkerLost as e:
+                if progress_frames(ctxs) == before:
+                    raise
+                print(f"Warm worker: {e}")
+                return worker.proc.returncode or 1
+            return 1 if result.get('failed') else 0
+
+        try:
+            returncode = wrap(render) if wrap else render()
+        finally:
+            tailer.stop()
+            tailer.join()
+            batch_log = os.path.join(scratch_root, "logs", f"{log_name}.log")
+            try:
+                with open(worker.log_file, "rb") as src, open(batch_log, "wb") as dst:
+                    src.seek(start_offset)
+                    shutil.copyfileobj(src, dst)
+            except OSError as e:
+                print(f"Could not copy the warm worker log for {log_name}: {e}")
+            archive_log(ctxs, log_name, batch_log, analyzer)
+    except BaseException:
+        warm_pool.discard(worker)
+        raise
+    if worker.alive():
+        warm_pool.checkin(worker)
+    else:
+        warm_pool.discard(worker)
+    return returncode
+
+
+def render_session(ctxs, log_name, wrap=None):
+    # warm_workers 면 띄워 둔 에디터로, 못 쓰거나 실패하면 새 에디터로.
+    if warm_pool is not None:
+        try:
+            returncode = run_warm(ctxs, log_name, wrap)
+            if returncode is not None:
+                return returncode
+        except (WorkerLost, Stalled) as e:
+            print(f"Warm worker: {e}, rendering {log_name} in a new editor")
+    return run_editor(ctxs, log_name, wrap=wrap)
+
+
+def calibrate_warmup(ctx):
+    # 워밍업 없이 시퀀스 앞부분만 따로 렌더해서 안정될 때까지 걸리는 프레임 수를 잰다.
+    # 결과 프레임은 버리고, 진행 상황이 본 렌더와 섞이지 않게 이름도 따로.
+    frames = pipeline_settings["warmup_calibration_frames"]
+    if ctx['frame_count']:
+        frames = min(frames, ctx['frame_count'])
+    calibration = dict(ctx, render_path=os.path.join(ctx['render_path'], "_calibrate"),
+                       render_name=f"{ctx['render_name']}_calibrate", warmup=0, calibration=True)
+    os.makedirs(calibration['render_path'], exist_ok=True)
+    try:
+        with timed(ctx, "warmup_calibration"):
+            run_editor([calibration], calibration['render_name'], (0, frames))
+    except Stalled as e:
+        # 보정은 없어도 렌더는 할 수 있다.
+        print(f"Warm-up calibration skipped: {e}")
+    shutil.rmtree(calibration['render_path'], ignore_errors=True)
+    ctx['warmup'] = choose_warmup(ctx)
+
+
+def render_ranges(ctx, ranges):
+    # 프레임 범위마다 에디터를 따로 띄워서 local_shards 개씩 동시에 렌더.
+    def render_range(frame_range):
+        return run_editor([ctx], f"{ctx['render_name']}_{frame_range[0]}-{frame_range[1]}", frame_range)
+
+    with ThreadPoolExecutor(max_workers=max(1, pipeline_settings["local_shards"])) as pool:
+        return list(pool.map(render_range, ranges))
+
+
+def render_sharded(ctx):
+    frame_count = ctx['frame_count']
+    hosts = job_hosts(ctx['job'])
+    plan = plan_shards(frame_count, ctx['shards'], hosts)
+    local = [(shard['start'], shard['end']) for shard in plan if shard['host'] == render_host]
+    remote = [shard for shard in plan if shard['host'] != render_host]
+    for shard in remote:
+        shard_tickets.publish(ctx['render_name'], shard, ctx['job'])
+
+    print(f"Sharded render {ctx['render_name']}: {len(local)} local, {len(remote)} remote of {len(plan)}")
+    started = time.monotonic()
+    render_ranges(ctx, local)
+
+    # 로컬 샤드가 끝났는데 아직 아무도 안 가져간 샤드는 바로 회수해서 직접 렌더 (쉬고 있는
+    # 호스트는 티켓을 안 가져가므로 기다리지 않는다). 로컬 샤드가 없을 때만 shard_claim_timeout 까지 기다림.
+    if remote:
+        claim_timeout = 0 if local else pipeline_settings["shard_claim_timeout"]
+        shard_tickets.wait_claimed(ctx['render_name'], remote, claim_timeout - (time.monotonic() - started))
+        reclaimed = [shard_tickets.reclaim(ctx['render_name'], shard['index'], render_host) for shard in remote]
+        render_ranges(ctx, [(t['start'], t['end']) for t in reclaimed if t])
+
+    missing = wait_for_frames(ctx['render_path'], ctx['render_name'], ctx['custom_start'], frame_count,
+                              pipeline_settings["shard_timeout"] - (time.monotonic() - started), ext=ctx['output_ext'])
+    if missing:
+        print(f"Sharded render {ctx['render_name']}: re-rendering missing frames {missing}")
+        render_ranges(ctx, missing)
+
+
+def render_shard_ticket(ticket):
+    # 다른 호스트가 맡긴 샤드. 프로젝트는 이 호스트에서 싱크해서 렌더.
+    ctx = sync_job(ticket['job'])
+    with render_slots:
+        with project_lock(ctx['job']['ue_project']):
+            render_ranges(ctx, [(ticket['start'], ticket['end'])])
+
+
+def record_render_timings(ctxs, launched, exited):
+    # 에디터 실행 -> 첫 프레임, 워밍업, 렌더 시간을 진행 상황 기록에서 계산.
+    # 그룹이면 두 번째 잡부터는 앞 잡이 끝난 시점부터 잰다. editor_session 도 잡마다
+    # 그 구간만큼 나눠 기록하고, 마지막 잡이 에디터 종료까지 가져간다.
+    session = ",".join(ctx['render_name'] for ctx in ctxs)
+    previous_end = launched
+    for index, ctx in enumerate(ctxs):
+        progress = progress_listener.get(ctx['render_name'])
+        job = ctx['job']
+        if index == len(ctxs) - 1:
+            end = exited
+        elif progress is not None:
+            end = min(progress.finished or exited, exited)
+        else:
+            end = previous_end
+        perf.record(job['render_name'], "editor_session", end - previous_end, engine=job['engine_version'],
+                    detail=f"{index + 1}/{len(ctxs)} {session}" if len(ctxs) > 1 else None)
+        if progress is None:
+            previous_end = end
+            continue
+        states = progress.state_times
+        warming = states.get('WARMING_UP')
+        rendering = states.get('RENDERING')
+        finished = progress.finished or exited
+        first = min([t for t in (warming, rendering, progress.first_seen) if t is not None])
+        perf.record(job['render_name'], "first_frame", first - previous_end, engine=job['engine_version'])
+        if warming is not None and rendering is not None:
+            perf.record(job['render_name'], "warmup", rendering - warming, engine=job['engine_version'])
+        perf.record(job['render_name'], "render", finished - (rendering or first), engine=job['engine_version'],
+                    ok=bool(progress.success), detail=f"{progress.frame}/{progress.total} frames, {ctx['quality']}")
+        previous_end = finished
+
+
+def read_resume_stamp(ctx):
+    try:
+        with open(resume_stamp_path(ctx['render_path'], ctx['render_name']), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_resume_stamp(ctx, frame_count):
+    path = resume_stamp_path(ctx['render_path'], ctx['render_name'])
+    os.makedirs(ctx['render_path'], exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({'change': ctx['synced_change'], 'params': params_hash(ctx['job']), 'format': ctx['output_format'],
+                   'frame_count': frame_count}, f)
+    os.replace(path + ".tmp", path)
+
+
+def clear_frames(ctx):
+    # 이전 렌더의 프레임과 resume.json. 스트림 인코더가 남은 프레임을 새 프레임으로 보지 않게.
+    prefix = ctx['render_name'] + "."
+    try:
+        entries = list(os.scandir(ctx['render_path']))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith(prefix) and entry.is_file():
+            os.remove(entry.path)
+    stamp = resume_stamp_path(ctx['render_path'], ctx['render_name'])
+    if os.path.isfile(stamp):
+        os.remove(stamp)
+
+
+def plan_resume(ctx):
+    # 이전 시도의 프레임을 이어 쓸 수 있으면 다시 렌더할 범위 목록 (비어 있으면 다 있음),
+    # 처음부터 렌더해야 하면 None. 이번 렌더의 내용으로 resume.json 을 새로 쓴다.
+    if not ctx['job'].get('resume_frames', True):
+        clear_frames(ctx)
+    stamp = read_resume_stamp(ctx) or {}
+    frame_count = ctx['frame_count'] or stamp.get('frame_count')
+    ranges = None
+    if (pipeline_settings["resume_frames"] and ctx['job'].get('resume_frames', True) and frame_count
+            and stamp.get('change') == ctx['synced_change'] and stamp.get('params') == params_hash(ctx['job'])
+            and stamp.get('format') == ctx['output_format']
+            and existing_frames(ctx['render_path'], ctx['render_name'], ctx['output_ext'])):
+        ranges = missing_ranges(ctx['render_path'], ctx['render_name'], ctx['custom_start'], frame_count, ctx['output_ext'])
+    write_resume_stamp(ctx, frame_count)
+    return ranges
+
+
+def resume_renders(ctxs):
+    # 이어 렌더할 수 있는 잡은 빠진 범위만, 프레임이 다 있는 잡은 렌더에서 뺀다. 샤드 잡은 render_sharded 가 따로 처리.
+    remaining = []
+    for ctx in ctxs:
+        if ctx['output_kind'] != "sequence" or ctx['shards'] > 1:
+            # 샤드 잡은 디스크의 프레임으로 끝났는지 보므로 처음부터 렌더할 때는 지워 둔다.
+            if ctx['output_kind'] == "sequence" and not ctx['job'].get('resume_frames', True):
+                clear_frames(ctx)
+            remaining.append(ctx)
+            continue
+        ctx['resume_ranges'] = plan_resume(ctx)
+        if ctx['resume_ranges'] is None:
+            remaining.append(ctx)
+            continue
+        if ctx['resume_ranges']:
+            missing = sum(end - start for start, end in ctx['resume_ranges'])
+            print(f"Resume {ctx['render_name']}: rendering {missing} missing frames {ctx['resume_ranges']}")
+        else:
+            print(f"Resume {ctx['render_name']}: every frame is already rendered")
+        # 스트림 인코더는 뒤쪽 범위가 렌더될 때까지 기다리지 못하므로 배치로 인코딩.
+        if ctx['encode_mode'] == "stream":
+            ctx['encode_mode'] = "batch"
+        if ctx['resume_ranges']:
+            remaining.append(ctx)
+    return remaining
+
+
+def remember_frame_count(ctxs):
+    # frame_count 가 없는 잡은 에디터가 알려준 전체 프레임 수를 남겨서 다음 시도가 이어 렌더할 수 있게.
+    for ctx in ctxs:
+        stamp = read_resume_stamp(ctx)
+        if stamp is None or stamp.get('frame_count'):
+            continue
+        progress = progress_listener.get(ctx['render_name'])
+        if progress is not None and progress.total:
+            write_resume_stamp(ctx, progress.total)
+
+
+def verify_frames(ctxs, returncode):
+    # 렌더 뒤 인코딩 전에 프레임 시퀀스 검사 (frame_scan.py). 빠졌거나 0 바이트거나 덜 쓴 프레임이 있으면
+    # 그 범위만 frame_repair_attempts 번까지 다시 렌더하고, 그래도 깨져 있으면 인코딩에서 실패 처리해서
+    # 반쪽짜리 mp4 가 복사/캐시되지 않게 하고 다음 실행이 이어 렌더하게 둔다.
+    # 프레임 수는 잡의 frame_count, 없으면 에디터가 알려준 값, 그것도 없으면 디스크의 마지막 프레임까지.
+    pending = [ctx for ctx in ctxs if ctx['output_kind'] == "sequence"]
+    attempt = 0
+    while pending:
+        broken = []
+        for ctx in pending:
+            frame_count = ctx['frame_count'] or (read_resume_stamp(ctx) or {}).get('frame_count')
+            report = scan_sequence(ctx['render_path'], ctx['render_name'], ctx['custom_start'], frame_count,
+                                   ctx['output_ext'], workers=pipeline_settings["frame_scan_workers"])
+            ctx['frame_scan'] = report
+            perf.record(ctx['job']['render_name'], "frame_scan", report['seconds'], engine=ctx['job']['engine_version'],
+                        ok=not report['broken'] and report['present'] > 0, detail=scan_summary(report))
+            if report['present'] == 0:
+                ctx['render_error'] = f"no frames rendered (editor exit code {returncode})"
+            elif report['broken']:
+                broken.append(ctx)
+            else:
+                ctx.pop('render_error', None)
+        if not broken or attempt >= pipeline_settings["frame_repair_attempts"]:
+            for ctx in broken:
+                ctx['render_error'] = f"broken frames after the render (editor exit code {returncode}): {scan_summary(ctx['frame_scan'])}"
+            return
+        attempt += 1
+        for ctx in broken:
+            print(f"Frame check {ctx['render_name']}: {scan_summary(ctx['frame_scan'])}, re-rendering {ctx['frame_scan']['broken']}")
+            ctx['resume_ranges'] = ctx['frame_scan']['broken']
+            # 스트림 인코딩한 mp4 에는 구멍이 있으므로 다시 배치로.
+            ctx['encoded'] = False
+            ctx['encode_mode'] = "batch"
+            try:
+                with timed(ctx, "frame_repair", detail=f"{frames_in(ctx['resume_ranges'])} frames"):
+                    returncode = render_session([ctx], f"{ctx['render_name']}_repair{attempt}")
+            except Stalled as e:
+                print(f"Frame repair {ctx['render_name']}: {e}")
+        pending = broken
+
+
+def render_group(ctxs):
+    # 같은 프로젝트/엔진의 잡은 에디터를 한 번만 띄워서 연달아 렌더.
+    to_render = [ctx for ctx in ctxs if not ctx['cached_movie']]
+    if not to_render:
+        return ctxs
+
+    first = to_render[0]
+
+    with render_slots, project_lock(first['job']['ue_project']):
+        # 이번 렌더의 프레임이 들어갈 자리를 먼저 만든다.
+        needed = sum(frame_sizes.estimate(ctx['job'], ctx['output_format']) or 0 for ctx in to_render)
+        with timed(first, "scratch_gc"):
+            gc = retention.make_room(job_render_root(first['job']), needed, today)
+        if gc['evicted'] or gc['short']:
+            print(f"Scratch GC: evicted {gc['evicted']} ({gc['bytes'] / GB:.1f} GB), skipped {gc['unverified']} not verified"
+                  + (", still short of space" if gc['short'] else ""))
+        to_render = resume_renders(to_render)
+        if not to_render:
+            return ctxs
+        first = to_render[0]
+        for ctx in to_render:
+            if ctx['warmup_mode'] == "calibrate" and not ctx.get('resume_ranges'):
+                calibrate_warmup(ctx)
+        launched = time.monotonic()
+        returncode = None
+        if len(to_render) == 1 and first['shards'] > 1:
+            with timed(first, "render_sharded"):
+                render_sharded(first)
+        else:
+            try:
+                if all(ctx['encode_mode'] == "stream" for ctx in to_render):
+                    returncode = render_session(to_render, first['render_name'], wrap=lambda render: stream_encode(to_render, render))
+                else:
+                    returncode = render_session(to_render, first['render_name'])
+            except Stalled as e:
+                # 멈춘 잡 하나 때문에 그룹 전체를 실패시키지 않는다. 프레임이 다 있는 잡은 그대로 인코딩으로,
+                # 나머지는 verify_frames 가 빠진 범위만 다시 렌더하고 그래도 안 되면 그 잡만 실패.
+                print(f"Render {first['render_name']}: {e}, checking the frames of every job in the group")
+            finally:
+                remember_frame_count(to_render)
+            record_render_timings(to_render, launched, time.monotonic())
+        verify_frames(to_render, returncode)
+
+    if pipeline_settings["render_cooldown"]:
+        with timed(first, "cooldown"):
+            time.sleep(pipeline_settings["render_cooldown"])
+    return ctxs
+
+
+def remove_encode_outputs(ctx, movie=True):
+    # 실패한 인코딩이 남긴 mp4/추가 결과물. 남아 있으면 복사되거나 캐시될 수 있다.
+    paths = target_files(ctx['encode_targets'], ctx['movie_file'])
+    if movie:
+        paths.append(ctx['movie_file'])
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def checked_encode(ctx, what, encode, movie=True):
+    # ffmpeg 종료 코드가 0 이 아니거나 워치독이 죽였으면 결과물을 지우고 잡을 실패 처리.
+    try:
+        returncode = encode()
+    except BaseException:
+        remove_encode_outputs(ctx, movie)
+        raise
+    if returncode != 0:
+        remove_encode_outputs(ctx, movie)
+        raise RuntimeError(f"{what} of {ctx['render_name']} failed with exit code {returncode}")
+
+
+def encode_job(ctx):
+    if ctx.get('render_error'):
+        raise RuntimeError(ctx['render_error'])
+    if ctx['cached_movie']:
+        if os.path.abspath(ctx['cached_movie']) != os.path.abspath(ctx['movie_file']):
+            with timed(ctx, "cache_reuse"):
+                shutil.copy(ctx['cached_movie'], ctx['movie_file'])
+        if ctx['encode_targets']:
+            with timed(ctx, "encode_targets"):
+                # 캐시에서 가져온 mp4 는 멀쩡하므로 추가 결과물만 지운다.
+                checked_encode(ctx, "encode_targets", lambda: encode_targets(
+                    ffmpeg, ["-i", ctx['movie_file']], ctx['movie_file'], ctx['encode_targets'], call=encode_call(ctx)),
+                    movie=False)
+        ctx['encoded'] = True
+        return ctx
+
+    # 다음 실행의 디스크 공간 예측용.
+    if ctx['output_kind'] == "sequence":
+        total_bytes, frames = sequence_bytes(ctx['render_path'], ctx['render_name'])
+        frame_sizes.record(ctx['job'], total_bytes, frames, today, ctx['output_format'])
+    if not ctx['encoded']:
+        with timed(ctx, "encode", detail=f"{ctx['encode_mode']} {ctx['output_format']}"):
+            if ctx['output_kind'] == "video":
+                video_file = os.path.join(ctx['render_path'], f"{ctx['render_name']}.{ctx['output_ext']}")
+                encode = lambda: encode_video(ffmpeg, video_file, ctx['movie_file'], call=encode_call(ctx),
+                                              targets=ctx['encode_targets'])
+            elif ctx['encode_mode'] == "segmented":
+                encode = lambda: encode_segmented(ffmpeg, ctx['render_path'], ctx['render_name'], ctx['custom_start'],
+                                                  ctx['movie_file'], segments=pipeline_settings["encode_segments"],
+                                                  ext=ctx['output_ext'], call=encode_call(ctx), targets=ctx['encode_targets'])
+            else:
+                encode = lambda: encode_sequence(ffmpeg, ctx['render_path'], ctx['render_name'], ctx['custom_start'],
+                                                 ctx['movie_file'], ext=ctx['output_ext'], call=encode_call(ctx),
+                                                 targets=ctx['encode_targets'])
+            checked_encode(ctx, "encode", encode)
+        ctx['encoded'] = True
+
+    # 복사가 확인되기 전까지는 스크래치 정리 대상이 아님.
+    retention.add_frames(ctx['render_path'], ctx['render_name'], today)
+    return ctx
+
+
+def copy_job(ctx):
+    render_name = ctx['render_name']
+    movie_file = ctx['movie_file']
+    daily_file = f"{ctx['daily_path']}\\{render_name}.mp4"
+    onedrive_file = f"{ctx['onedrive_daily_path']}\\{render_name}.mp4"
+    if not os.path.isfile(movie_file):
+        print(f"No movie to copy : {movie_file}")
+        finish_claimed(ctx['job'], False, "no movie")
+        return ctx
+
+    # 원본은 한 번만 읽고 두 곳에 동시에 쓴 뒤 체크섬으로 확인.
+    job = ctx['job']
+    results = fanout_copy(movie_file, [daily_file, onedrive_file])
+    for stage, result in zip(("copy_daily", "copy_onedrive"), results):
+        perf.record(job['render_name'], stage, result['seconds'], engine=job['engine_version'], ok=result['ok'],
+                    detail=f"{result['mb_per_s']:.1f} MB/s" if result['ok'] else result['error'])
+    ctx['copies'] = results
+    if results[0]['ok']:
+        retention.mark_copied(ctx['render_path'], render_name, movie_file, daily_file, today)
+
+    copy_targets(ctx)
+
+    # 공유 드라이브 쪽을 먼저 기록해서 로컬 스크래치가 지워져도 재사용 가능하게.
+    # 인코딩이 끝났고 데일리 복사가 확인된 mp4 만 캐시한다.
+    verified = [result['target'] for result in results if result['ok']]
+    if ctx['encoded'] and results[0]['ok']:
+        render_cache.store(job, ctx['synced_change'], today, verified + [movie_file])
+    finish_claimed(job, results[0]['ok'], None if results[0]['ok'] else f"copy: {results[0]['error']}")
+    return ctx
+
+
+def copy_targets(ctx):
+    # 프록시/썸네일/컨택트 시트는 daily_path 의 <이름>_extras 폴더로만.
+    files = target_files(ctx['encode_targets'], ctx['movie_file'])
+    if not files:
+        return
+    extras_path = f"{ctx['daily_path']}\\{ctx['render_name']}_extras"
+    started = time.monotonic()
+    copied = []
+    failed = 0
+    for path in files:
+        target = f"{extras_path}\\{os.path.basename(path)}"
+        result = fanout_copy(path, [target])[0]
+        if result['ok']:
+            copied.append((path, target))
+        else:
+            failed += 1
+    perf.record(ctx['job']['render_name'], "copy_extras", time.monotonic() - started, engine=ctx['job']['engine_version'],
+                ok=not failed, detail=f"{len(copied)} files" + (f", {failed} failed" if failed else ""))
+    if copied:
+        retention.mark_files_copied(copied, today)
+
+
+def sync_group(group):
+    ctxs = []
+    for job in group:
+        try:
+            ctxs.append(sync_job(job))
+        except Exception as e:
+            print(f"[sync] {job_label(job)} failed: {e!r}")
+            finish_claimed(job, False, f"sync: {e!r}")
+    return ctxs or None
+
+
+def group_jobs(daily_jobs):
+    if not pipeline_settings["group_renders"]:
+        return [[job] for job in daily_jobs]
+    groups = {}
+    for job in daily_jobs:
+        if job.get('shards', 1) > 1:
+            groups[id(job)] = [job]
+            continue
+        groups.setdefault((job['ue_project'], job['engine_version']), []).append(job)
+    return list(groups.values())
+
+
+def preflight_jobs(daily_jobs):
+    # 싱크/렌더 전에 모든 잡을 한 번에 점검. 문제 있는 잡만 빼고 나머지는 그대로 진행.
+    problems = {id(job): [] for job in daily_jobs}
+    for job in daily_jobs:
+        problem = check_engine(job, render_engines)
+        if problem:
+            problems[id(job)].append(problem)
+
+    resolved = p4_session.where([job['ue_project'] for job in daily_jobs])
+    for job in daily_jobs:
+        if job['ue_project'] not in resolved:
+            problems[id(job)].append(f"{job['ue_project']} is not mapped in the P4 client")
+
+    writable = {}
+    for job in daily_jobs:
+        for path in (job_daily_path(job), f"{onedrive_path}\\{today}"):
+            if path not in writable:
+                writable[path] = check_writable(path)
+            if writable[path]:
+                problems[id(job)].append(writable[path])
+
+    candidates = [job for job in daily_jobs if not problems[id(job)]]
+    reserve = pipeline_settings["preflight_reserve_gb"] * GB
+    estimate = lambda job: frame_sizes.estimate(job, job_output_format(job))
+    # 스크래치 GC 는 렌더 직전에만 돌기 때문에, 지울 수 있는 (복사가 확인된) 프레임/mp4 도 여유 공간으로 친다.
+    reclaimable = lambda root: retention.evictable_bytes(root, today)
+    for key, problem in check_disk_space(candidates, job_render_root, estimate, reserve, reclaimable).items():
+        problems[key].append(problem)
+
+    passed = []
+    failures = []
+    for job in daily_jobs:
+        if problems[id(job)]:
+            error = JobError(job, problems[id(job)])
+            print(f"[preflight] {error}")
+            perf.record(job['render_name'], "preflight", 0, engine=job['engine_version'], ok=False, detail=str(error))
+            failures.append(("preflight", job, error))
+        else:
+            passed.append(job)
+    return passed, failures
+
+
+def item_jobs(item):
+    # 파이프라인 단계별 항목(잡 묶음, ctx 목록, ctx)에 들어 있는 잡들.
+    if isinstance(item, list):
+        return [job for x in item for job in item_jobs(x)]
+    return [item.get('job', item)]
+
+
+def finish_claimed(job, ok, detail=None):
+    # 큐 모드가 아니거나 큐에서 가져온 잡이 아니면 아무것도 안 함.
+    with queue_claims_lock:
+        claim = queue_claims.pop(id(job), None)
+        if claim is None:
+            return
+        claim['left'] -= 1
+        claim['ok'] = claim['ok'] and ok
+        if detail:
+            claim['details'].append(f"{job['render_name']}: {detail}")
+        last = claim['left'] == 0
+    if last and not work_queue.finish(claim['key'], claim['ok'], "; ".join(claim['details']) or None):
+        print(f"Work queue: lease of {claim['key']} was lost before it finished")
+
+
+def stage_failed(stage, item, error):
+    for job in item_jobs(item):
+        finish_claimed(job, False, f"{stage}: {error!r}")
+
+
+def claimed_groups(failures):
+    # 큐에서 한 묶음씩 가져와 점검한 뒤 파이프라인으로. 싱크 단계가 비어야 다음 것을 가져가므로
+    # 호스트마다 실제로 처리할 수 있는 만큼만 가져간다. 다른 호스트가 잡고 있는 항목이 남아 있으면
+    # (그 호스트가 죽으면 다시 풀리므로) 끝날 때까지 계속 확인.
+    while True:
+        claim = work_queue.claim()
+        if claim is None:
+            if not work_queue.outstanding():
+                return
+            time.sleep(pipeline_settings["queue_poll"])
+            continue
+        key, group = claim
+        print(f"Work queue: claimed {key}")
+        claim = {'key': key, 'left': len(group), 'ok': True, 'details': []}
+        with queue_claims_lock:
+            for job in group:
+                queue_claims[id(job)] = claim
+        with perf.timed("*", "preflight", detail=key):
+            passed, failed = preflight_jobs(group)
+        for stage, job, error in failed:
+            finish_claimed(job, False, str(error))
+        failures += failed
+        if passed:
+            yield passed
+
+
+def ctx_label(item):
+    if isinstance(item, list):
+        return ", ".join(ctx_label(x) for x in item)
+    return item.get('render_name') or job_label(item.get('job', item))
+
+
+def quality_profiles():
+    # 품질 프로필 이름 -> 설정. 파일을 못 읽으면 None (검사 없이 에디터가 모르는 이름은 final 로 렌더).
+    try:
+        with open(render_profile_file, "r", encoding="utf-8") as f:
+            return dict(json.load(f))
+    except (OSError, ValueError) as e:
+        print(f"Could not read quality profiles {render_profile_file}: {e}")
+        return None
+
+
+def profile_settings(profiles, name):
+    # CinemaMPRExecutor.resolve_quality_profiles 와 같게: 파일에 없는 이름은 final.
+    if profiles is None:
+        return None
+    return profiles.get(name if name in profiles else "final")
+
+
+def history_changed(path):
+    watched = history_files.get(path)
+    if watched is None:
+        watched = history_files[path] = WatchedFile(path)
+    return watched.changed()
+
+
+def load_histories():
+    # 다른 호스트도 쓰는 파일이라 실행마다 확인은 하지만, 내용이 그대로면 읽어 둔 것을 그대로 쓴다.
+    global render_cache, warmup_history, frame_sizes
+    if history_changed(render_cache_file) or render_cache is None or render_cache.path != render_cache_file:
+        render_cache = RenderCache(render_cache_file)
+    if history_changed(warmup_history_file) or warmup_history is None or warmup_history.path != warmup_history_file:
+        warmup_history = WarmupHistory(warmup_history_file)
+    if history_changed(frame_size_history_file) or frame_sizes is None or frame_sizes.path != frame_size_history_file:
+        frame_sizes = FrameSizeHistory(frame_size_history_file)
+
+
+def open_session():
+    # 실행 사이에 유지하는 것 (P4 연결과 where 결과, 진행 상황 리스너, 띄워 둔 에디터).
+    # 한 번만 실행할 때는 run_daily 가 열고 닫고, 데몬은 계속 열어 둔다.
+    global p4_session, progress_listener
+    p4_session = P4Session(**p4_settings)
+    progress_listener = ProgressListener(report_interval=pipeline_settings["progress_report"]).start()
+
+
+def close_session():
+    global p4_session, progress_listener, warm_pool
+    if warm_pool is not None:
+        warm_pool.stop_all()
+        warm_pool = None
+    if progress_listener is not None:
+        progress_listener.stop()
+        progress_listener = None
+    if p4_session is not None:
+        p4_session.disconnect()
+        p4_session = None
+
+
+def run_daily(jobs, nightly=True):
+    # nightly=False 는 데몬의 다시 렌더 요청: 렌더만 하고 _PERSISTENT 미러링은 하지 않는다.
+    global today, retention, render_slots, shard_tickets, perf, work_queue, warm_pool
+    today = datetime.date.today().strftime("%Y%m%d")
+    pipeline_settings.clear()
+    pipeline_settings.update(default_pipeline_settings)
+    pipeline_settings.update(jobs.get("pipeline", {}))
+
+    perf = PerfDB(perf_db_file, run_date=today)
+
+    # 형식이 잘못된 잡은 여기서 바로 실패 처리하고 나머지만 진행.
+    active = [job for job in jobs["daily_render"] if not isinstance(job, dict) or job.get('activate')]
+    profiles = quality_profiles()
+    valid_jobs, invalid = parse_jobs(active, render_engines, profiles)
+    failures = []
+    for error in invalid:
+        print(f"[preflight] {error}")
+        perf.record(error.job.get('render_name', '?') if isinstance(error.job, dict) else '?', "preflight", 0,
+                    ok=False, detail=str(error))
+        failures.append(("preflight", error.job, error))
+    # 품질, 출력 포맷, 추가 인코딩 목록이 렌더 캐시/이어 렌더 기준에 들어가도록 기본값을 잡에 채워 둔다.
+    # 프로필은 이름만이 아니라 에디터가 실제로 쓸 설정까지 넣어서, 프로필 파일을 고치면 다시 렌더한다.
+    for job in valid_jobs:
+        job.setdefault('quality', pipeline_settings["quality"])
+        job['quality_settings'] = profile_settings(profiles, job['quality'])
+        job.setdefault('output_format', pipeline_settings["output_format"])
+        job.setdefault('encode_targets', list(pipeline_settings["encode_targets"]))
+
+    if pipeline_settings["work_queue"]:
+        # 어느 호스트가 먼저 시작하든 같은 큐가 되도록 모두가 채운다 (이미 있는 항목은 그대로).
+        installed = [engine for engine, path in render_engines.items() if os.path.isfile(path)]
+        work_queue = WorkQueue(work_queue_file, today, render_host, installed,
+                               lease_seconds=pipeline_settings["queue_lease"],
+                               affinity_wait=pipeline_settings["queue_affinity_wait"],
+                               max_attempts=pipeline_settings["queue_max_attempts"])
+        groups = group_jobs(valid_jobs)
+        added = work_queue.seed([(group, job_hosts(group[0]), group[0]['engine_version']) for group in groups])
+        print(f"Work queue {work_queue.worker}: {added} of {len(groups)} groups added, engines {', '.join(installed)}")
+        daily_jobs = []
+    else:
+        # host 가 리스트면 첫 번째 호스트가 잡의 주인.
+        daily_jobs = [job for job in valid_jobs if job_hosts(job)[0] == render_host]
+
+    render_slots = threading.BoundedSemaphore(max(1, pipeline_settings["render"]))
+    shard_tickets = ShardTickets(os.path.join(shard_ticket_root, today))
+
+    load_histories()
+    retention = ScratchRetention(os.path.join(scratch_root, "scratch_ledger.json"),
+                                 pipeline_settings["scratch_budget_gb"] * GB, pipeline_settings["preflight_reserve_gb"] * GB,
+                                 pipeline_settings["frames_keep_days"], pipeline_settings["movie_keep_days"])
+    own_session = p4_session is None
+    if own_session:
+        open_session()
+    else:
+        p4_session.new_run()
+        progress_listener.reset()
+        progress_listener.report_interval = pipeline_settings["progress_report"]
+    if pipeline_settings["warm_workers"] and warm_pool is None:
+        warm_pool = WarmWorkerPool(pipeline_settings["warm_idle_timeout"], pipeline_settings["warm_max"]).start()
+    elif pipeline_settings["warm_workers"]:
+        warm_pool.idle_timeout = pipeline_settings["warm_idle_timeout"]
+        warm_pool.max_workers = max(1, pipeline_settings["warm_max"])
+    elif warm_pool is not None:
+        warm_pool.stop_all()
+        warm_pool = None
+    with perf.timed("*", "p4_connect"):
+        p4_session.connect()
+    # 모든 잡의 uproject 를 where 한 번으로 미리 조회.
+    with perf.timed("*", "p4_where", detail=f"{len(daily_jobs)} jobs"):
+        p4_session.where([job['ue_project'] for job in daily_jobs])
+    with perf.timed("*", "preflight", detail=f"{len(daily_jobs)} jobs"):
+        daily_jobs, failed = preflight_jobs(daily_jobs)
+    failures += failed
+
+    pipeline = StagedPipeline(label=ctx_label, on_failure=stage_failed)
+    # 큐 모드에서는 싱크 앞에 한 묶음만 기다리게 해서 큐에서 미리 많이 가져가지 않게.
+    pipeline.add_stage("sync", sync_group, workers=pipeline_settings["sync"], backlog=1 if work_queue else 0)
+    pipeline.add_stage("render", render_group, workers=pipeline_settings["render"], backlog=pipeline_settings["sync_ahead"], split=True)
+    pipeline.add_stage("encode", encode_job, workers=pipeline_settings["encode"])
+    pipeline.add_stage("copy", copy_job, workers=pipeline_settings["copy"])
+
+    # _PERSISTENT 미러링은 첫 렌더와 동시에 백그라운드로. 밤 실행의 주인 호스트만.
+    mirrors = []
+    if nightly and render_host == persistent_mirror_host:
+        mirrors = [
+            MirrorJob(name, source, root, today, os.path.join(persistent_manifest_dir, f"persistent_{name}.json"), use_links)
+            for name, source, root, use_links in persistent_mirrors
+        ]
+    for mirror_job in mirrors:
+        mirror_job.start()
+
+    # 다른 호스트가 이 호스트 앞으로 남긴 샤드 티켓을 렌더하는 백그라운드 워커.
+    ticket_worker = ShardTicketWorker(shard_tickets, render_host, render_shard_ticket)
+    ticket_worker.start()
+    lease_keeper = None
+    if work_queue is not None:
+        lease_keeper = LeaseKeeper(work_queue, max(1, pipeline_settings["queue_lease"] / 3))
+        lease_keeper.start()
+    try:
+        if work_queue is not None:
+            results = pipeline.run(claimed_groups(failures))
+        else:
+            results = pipeline.run(group_jobs(daily_jobs))
+        return failures + results
+    finally:
+        if lease_keeper is not None:
+            lease_keeper.stop()
+            lease_keeper.join()
+            # 끝나지 못한 항목은 다른 호스트가 바로 가져갈 수 있게 돌려준다.
+            for key in {claim['key'] for claim in queue_claims.values()}:
+                work_queue.release(key)
+            queue_claims.clear()
+            work_queue.close()
+            work_queue = None
+        for mirror_job in mirrors:
+            mirror_job.join()
+            perf.record("*", f"persistent_{mirror_job.label}", mirror_job.seconds, ok=mirror_job.error is None,
+                        detail=str(mirror_job.stats or mirror_job.error))
+        ticket_worker.stop()
+        ticket_worker.join()
+        if own_session:
+            close_session()
+        perf.close()
+
+
+def check_jobs(jobs):
+    # 데몬이 잡 파일을 새로 읽을 때마다. 잘못된 잡을 밤이 아니라 고친 그 자리에서 알 수 있게.
+    active = [job for job in jobs.get("daily_render", []) if not isinstance(job, dict) or job.get('activate')]
+    valid, invalid = parse_jobs(active, render_engines, quality_profiles())
+    mine = [job for job in valid if job_hosts(job)[0] == render_host]
+    print(f"Jobs: {len(valid)} active ({len(mine)} on host {render_host}), {len(invalid)} invalid")
+    for error in invalid:
+        print(f"[preflight] {error}")
+
+
+def run_request(jobs, request):
+    # 데몬이 받은 다시 렌더 요청. 잡 파일에서 이름이 맞는 잡만, activate/host 와 상관없이 이 호스트에서 렌더.
+    # force 면 렌더 캐시도, 오늘 이미 렌더한 프레임도 무시하고 처음부터. 큐는 쓰지 않는다.
+    names = request.get('jobs', [])
+    force = {'force_render': True, 'resume_frames': False} if request.get('force') else {}
+    selected = [dict(job, activate=True, host=render_host, **force)
+                for job in jobs.get("daily_render", []) if isinstance(job, dict) and job.get('render_name') in names]
+    found = {job['render_name'] for job in selected}
+    failures = [("request", {'render_name': name}, f"{name} is not in {render_job_file}") for name in names if name not in found]
+    if not selected:
+        return failures
+    pipeline = dict(jobs.get("pipeline", {}), work_queue=False)
+    return failures + run_daily({"pipeline": pipeline, "daily_render": selected}, nightly=False)
+
+
+def run_service():
+    # 데몬: 세션(P4 연결, 리스너, 띄워 둔 에디터)을 열어 둔 채로 RenderDaemon 이 잡 파일/일정/요청을 처리.
+    daemon = RenderDaemon(render_job_file, check_jobs, run_daily, run_request, render_host, daemon_state_file,
+                          request_dir=daemon_request_dir, nightly_at=daemon_settings["nightly_at"],
+                          nightly_window=daemon_settings["nightly_window"], poll_interval=daemon_settings["poll"])
+    open_session()
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        print("Daemon: stopped")
+    finally:
+        close_session()
+
+
+def request_rerender(names, force=False, host=None):
+    # 요청 파일만 남기고 끝. host 를 안 주면 잡 파일에서 그 잡의 주인 호스트.
+    if host is None:
+        with open(render_job_file, "r", encoding="utf-8") as f:
+            owners = {job.get('render_name'): job_hosts(job)[0]
+                      for job in json.load(f).get("daily_render", []) if isinstance(job, dict) and 'host' in job}
+        host = owners.get(names[0])
+    path = write_request(daemon_request_dir, names, force, host, requested_by=os.environ.get("USERNAME"))
+    print(f"Requested {', '.join(names)} on {'any host' if host is None else f'host {host}'}: {path}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Daily render")
+    parser.add_argument("command", nargs="?", default="run", choices=("run", "daemon", "rerender"),
+                        help="run: one daily run and exit (default), daemon: keep running (render_daemon.py), "
+                             "rerender: ask the daemon to render the named jobs again")
+    parser.add_argument("names", nargs="*", help="render_name of the jobs to re-render")
+    parser.add_argument("--host", type=int, default=render_host, help="host number of this worker")
+    parser.add_argument("--jobs", default=render_job_file, help="render_jobs.json to read")
+    parser.add_argument("--force", action="store_true", help="rerender: ignore the render cache")
+    parser.add_argument("--on", type=int, help="rerender: host to render on (default: the job's host)")
+    args = parser.parse_args()
+    render_host = args.host
+    render_job_file = args.jobs
+
+    if args.command == "rerender":
+        if not args.names:
+            parser.error("rerender needs at least one render_name")
+        request_rerender(args.names, args.force, args.on)
+    else:
+        # 호스트 번호마다 하나씩만. 큐 모드에서는 한 PC 에서 여러 워커를 띄울 수 있다.
+        # 같은 호스트로 데몬이 떠 있으면 밤의 bat 실행은 여기서 끝난다.
+        from tendo import singleton
+        me = singleton.SingleInstance(flavor_id=f"host{render_host}")
+
+        if args.command == "daemon":
+            run_service()
+        else:
+            jobs = json.load(open(args.jobs, "r"))
+            run_daily(jobs)
+
+#C:\Program Files\Epic Games\UE_4.25\Engine\Binaries\Win64\UE4Editor.exe
+#"D:\\\\depot\\Universe\\Universe_MV\\Universe_MV.uproject" "/Game/VisualTech/Map/ATEEZ_P" -game -MovieSceneCaptureType="/Script/MovieSceneCapture.AutomatedLevelSequenceCapture" -LevelSequence="/Game/VisualTech/Seq/1_ATEEZ/ATEEZ_master" -MovieFrameRate=30 -MovieFolder="T:\\9_Daily\\_RENDER\\Universe_MV\\20201012" -MovieName="1_ATEEZ_20201012" -noloadingscreen -ResX=1920 -ResY=1080 -ForceRes -MovieFormat=PNG -MovieQuality=100 -notexturestreaming -MovieCinematicMode=yes -NoScreenMessages -windowed -MovieWarmUpFrames=60
+
+# print(jobs)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import os
+import shlex
+import sys
+import time
+
+# Stand-in for UnrealEditor.exe. Takes the command line DailyRender_v2 builds,
+# loads the real CinemaMPRExecutor on top of the stub `unreal` module
+# (bench/stubs) and runs it in a tick loop until the executor finishes, so
+# frames, the -abslog log and the progress socket all behave like a render.
+#
+#   BENCH_STARTUP_S     editor start-up before the executor runs
+#   BENCH_FRAME_MS      time per output frame
+#   BENCH_WARMUP_MS     time per warm-up frame
+#   BENCH_FRAME_BYTES   size of every synthetic frame
+#   BENCH_FRAMES        frames of a sequence whose name has no _<count>
+#   BENCH_MAP_LOAD_S    time of every map change inside a session
+#   BENCH_SHADERS       shaders "compiled" at start-up, as a shader log line pair
+#   BENCH_CRASH_AT      <sequence text>:<frame>, exit with a half written frame
+#                       once that many frames of the sequence are rendered
+#   BENCH_HANG          hang after start-up (no frames, no log) when the command
+#                       line contains this text, for the stall watchdog
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "stubs"))
+sys.path.insert(1, os.path.dirname(BENCH_DIR))
+
+import unreal
+
+
+def env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def main(argv):
+    command_line = " ".join(shlex.quote(arg) for arg in argv[1:])
+    unreal.set_command_line(command_line)
+    _, _, params = unreal.SystemLibrary.parse_command_line(command_line)
+    unreal.set_log_file(params.get('abslog') or params.get('ABSLOG'))
+
+    unreal.log("LogInit: fake editor " + command_line)
+    shaders = int(env_float("BENCH_SHADERS", 0))
+    if shaders:
+        unreal._write_log("Display", f"Shaders left to compile {shaders}", "LogShaderCompilers")
+    time.sleep(env_float("BENCH_STARTUP_S", 0.5))
+    if shaders:
+        unreal._write_log("Display", "Shaders left to compile 0", "LogShaderCompilers")
+    if os.environ.get("BENCH_HANG") and os.environ["BENCH_HANG"] in command_line:
+        while True:
+            time.sleep(60)
+
+    from CinemaMPRExecutor import CinemaMPRExecutor
+    executor = CinemaMPRExecutor()
+    executor.execute_delayed(None)
+    while not executor.finished:
+        executor.on_begin_frame()
+        unreal.tick_pipelines()
+        if not unreal.tick():
+            time.sleep(0.001)
+    unreal.log("LogExit: Exiting.")
+    unreal.set_log_file(None)
+    return 1 if executor.errored else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import time
+
+# Stand-in for ffmpeg with the argument shapes encode.py uses: an image
+# sequence (-start_number N -i name.%04d.ext [-frames:v K]), image2pipe on
+# stdin, the concat demuxer, or a single movie input. It reads every input
+# byte, spends BENCH_ENCODE_MS per frame and writes an output of
+# BENCH_MP4_FRAME_BYTES per frame. With a -filter_complex graph every -map
+# output is written: movies sized by their scale, numbered images by the
+# graph's select/tile. Exits 1 when there is nothing to encode.
+
+
+def env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def option(args, name, default=None):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def read_sequence(pattern, start, limit):
+    frames = 0
+    total = 0
+    frame = start
+    while limit is None or frames < limit:
+        path = pattern.replace("%04d", "%04d" % frame)
+        try:
+            with open(path, "rb") as f:
+                total += len(f.read())
+        except OSError:
+            break
+        frames += 1
+        frame += 1
+    return frames, total
+
+
+def read_pipe():
+    frames = 0
+    total = 0
+    trailer = b"IEND\xaeB`\x82"
+    tail = b""
+    while True:
+        chunk = sys.stdin.buffer.read(1024 * 1024)
+        if not chunk:
+            break
+        data = tail + chunk
+        frames += data.count(trailer)
+        tail = data[-(len(trailer) - 1):]
+        total += len(chunk)
+    return frames, total
+
+
+def outputs(args):
+    # [(map label, path)]; each output ends with its path, right before the
+    # next -map (or at the end).
+    maps = [i for i, arg in enumerate(args) if arg == "-map"]
+    if not maps:
+        return [(None, args[-1])]
+    ends = [i - 1 for i in maps[1:]] + [len(args) - 1]
+    return [(args[i + 1], args[end]) for i, end in zip(maps, ends)]
+
+
+def write_output(label, path, frames, graph):
+    chain = ""
+    if label and graph:
+        m = re.search(r"\](?:split=\d+(?:\[s\d+\])+;)?([^;\[]*)" + re.escape(label), graph)
+        chain = m.group(1) if m else ""
+    size = int(frames * env_float("BENCH_MP4_FRAME_BYTES", 8 * 1024))
+    if "%" not in path:
+        m = re.search(r"scale=trunc\(iw\*([\d.]+)", chain)
+        scale = float(m.group(1)) if m else 1.0
+        with open(path, "wb") as f:
+            f.write(b"\0" * int(size * scale * scale))
+        return
+    m = re.search(r"mod\(n\\,(\d+)\)", chain)
+    count = -(-frames // int(m.group(1))) if m else frames
+    m = re.search(r"tile=(\d+)x(\d+)", chain)
+    if m:
+        count = -(-count // (int(m.group(1)) * int(m.group(2))))
+    for index in range(1, count + 1):
+        with open(path % index, "wb") as f:
+            f.write(b"\xff\xd8" + b"\0" * 4096 + b"\xff\xd9")
+
+
+def main(args):
+    output = args[-1]
+    source = option(args, "-i")
+    if source == "-":
+        frames, _ = read_pipe()
+    elif option(args, "-f") == "concat":
+        frames = 0
+        parts = []
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                m = re.match(r"file '(.*)'", line.strip())
+                if m:
+                    parts.append(m.group(1))
+        data = b""
+        for part in parts:
+            with open(part, "rb") as f:
+                data += f.read()
+        with open(output, "wb") as f:
+            f.write(data)
+        return 0
+    elif "%" in (source or ""):
+        limit = option(args, "-frames:v")
+        frames, _ = read_sequence(source, int(option(args, "-start_number", 0)), int(limit) if limit else None)
+    else:
+        frames = 1 if source and os.path.isfile(source) else 0
+
+    if not frames:
+        print(f"fake ffmpeg: no input frames for {output}", file=sys.stderr)
+        return 1
+    time.sleep(frames * env_float("BENCH_ENCODE_MS", 2.0) / 1000.0)
+    for label, path in outputs(args):
+        write_output(label, path, frames, option(args, "-filter_complex"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
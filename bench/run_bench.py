@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import shlex
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# Offline end-to-end benchmark of DailyRender_v2.run_daily.
+#
+# Nothing here needs Perforce, Unreal or ffmpeg: P4 is the fake module in
+# bench/stubs, the editor is bench/fake_editor.py (which runs the real
+# CinemaMPRExecutor on the stub `unreal` module and writes synthetic frames and
+# a UE-style log) and ffmpeg is bench/fake_ffmpeg.py. Every run gets its own
+# temp directory for scratch, daily output, caches and the perf database, so
+# runs never share a render cache. The report is makespan, throughput and the
+# per-stage rows of the perf database:
+#
+#   python bench/run_bench.py --jobs 1,10,50,200 --frames 120 --frame-ms 5
+#   python bench/run_bench.py --jobs 20 --projects 4 --pipeline '{"render": 2, "encode_mode": "stream"}'
+#   python bench/run_bench.py --jobs 10 --json bench_result.json --keep
+#   python bench/run_bench.py --jobs 20 --workers 3     (3 hosts sharing the work queue)
+#   python bench/run_bench.py --jobs 8 --pipeline '{"group_renders": false, "warm_workers": true, "warm_max": 2}'
+#
+# Timings of the fakes come from the environment (see the top of each fake):
+# BENCH_STARTUP_S, BENCH_FRAME_MS, BENCH_WARMUP_MS, BENCH_FRAME_BYTES,
+# BENCH_ENCODE_MS, BENCH_P4_SYNC_S, BENCH_P4_LATENCY_S, BENCH_MAP_LOAD_S.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FAKE_EDITOR = os.path.join(BENCH_DIR, "fake_editor.py")
+FAKE_FFMPEG = os.path.join(BENCH_DIR, "fake_ffmpeg.py")
+ENGINE = "UE_5.5"
+
+sys.path.insert(0, os.path.join(BENCH_DIR, "stubs"))
+sys.path.insert(1, REPO_DIR)
+
+
+class PosixSubprocess:
+    # DailyRender_v2 builds the editor command as one Windows command string
+    # and hands it to subprocess.call/Popen; on POSIX that has to be split.
+
+    PIPE = subprocess.PIPE
+    DEVNULL = subprocess.DEVNULL
+    STDOUT = subprocess.STDOUT
+    CalledProcessError = subprocess.CalledProcessError
+    TimeoutExpired = subprocess.TimeoutExpired
+
+    @staticmethod
+    def _args(command):
+        return shlex.split(command) if isinstance(command, str) else command
+
+    def call(self, command, **kwargs):
+        return subprocess.call(self._args(command), **kwargs)
+
+    def Popen(self, command, **kwargs):
+        return subprocess.Popen(self._args(command), **kwargs)
+
+    def run(self, command, **kwargs):
+        return subprocess.run(self._args(command), **kwargs)
+
+
+def make_jobs(count, frames, projects, maps, overrides):
+    jobs = []
+    for i in range(count):
+        project = f"P{i % projects}"
+        jobs.append(dict({
+            "activate": True,
+            "host": 1,
+            "engine_version": ENGINE,
+            "project_name": project,
+            "render_name": f"bench_{i:03d}",
+            "ue_project": f"//depot/{project}/{project}.uproject",
+            "ue_umap": f"/Game/Bench/Map_{(i // projects) % maps}",
+            "ue_sequence": f"/Game/Bench/Seq_{i:03d}_{frames}",
+            "output_directory": "",
+            "res_x": 320,
+            "res_y": 180,
+            "frame_count": frames,
+            "force_render": True,
+        }, **overrides))
+    return jobs
+
+
+def stage_rows(perf_db_file):
+    conn = sqlite3.connect(perf_db_file)
+    try:
+        return conn.execute("SELECT job, stage, seconds, ok FROM stage_timing").fetchall()
+    finally:
+        conn.close()
+
+
+def summarize(rows):
+    stages = {}
+    for job, stage, seconds, ok in rows:
+        entry = stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'failed': 0})
+        entry['count'] += 1
+        entry['total'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+        entry['failed'] += 0 if ok else 1
+    for entry in stages.values():
+        entry['mean'] = entry['total'] / entry['count']
+    return stages
+
+
+def configure(d, args, work_dir, host=None):
+    import P4
+
+    P4._synced.clear()
+    os.environ["BENCH_P4_ROOT"] = os.path.join(work_dir, "depot")
+    if args.frame_ms is not None:
+        os.environ["BENCH_FRAME_MS"] = str(args.frame_ms)
+
+    # Shared data (caches, histories, queue) like Z:, scratch and perf DB per host.
+    local = os.path.join(work_dir, f"host{host}") if host else work_dir
+    d.render_engines = {ENGINE: FAKE_EDITOR}
+    d.ffmpeg = FAKE_FFMPEG
+    d.scratch_root = os.path.join(local, "scratch")
+    d.daily_root = os.path.join(work_dir, "daily")
+    d.onedrive_path = os.path.join(work_dir, "onedrive")
+    d.render_cache_file = os.path.join(work_dir, "data", "render_cache.json")
+    d.render_profile_file = os.path.join(REPO_DIR, "render_profiles.json")
+    d.warmup_history_file = os.path.join(work_dir, "data", "warmup_history.json")
+    d.frame_size_history_file = os.path.join(work_dir, "data", "frame_sizes.json")
+    d.shard_ticket_root = os.path.join(work_dir, "data", "shards")
+    d.work_queue_file = os.path.join(work_dir, "data", "work_queue.db")
+    d.perf_db_file = os.path.join(local, "render_perf.db")
+    d.render_log_dir = os.path.join(work_dir, "logs")
+    d.persistent_mirrors = []
+    d.persistent_manifest_dir = os.path.join(local, "data")
+    d.subprocess = PosixSubprocess()
+    # The real one moves the workspace to D:, which has no meaning here.
+    d.force_drive_d = os.path.abspath
+    if host:
+        d.render_host = host
+
+    pipeline = {"preflight_reserve_gb": 0, "warmup_frames": args.warmup, "progress_report": 3600}
+    if args.workers > 1:
+        pipeline.update({"work_queue": True, "queue_poll": 0.2, "queue_lease": 10,
+                         "queue_affinity_wait": args.affinity_wait})
+    pipeline.update(json.loads(args.pipeline or "{}"))
+    return pipeline
+
+
+def bench_jobs(d, args, count):
+    jobs = make_jobs(count, args.frames, args.projects, args.maps, {"output_directory": d.daily_root})
+    for i, job in enumerate(jobs):
+        job["host"] = i % max(1, args.workers) + 1
+    return jobs
+
+
+def failure_rows(d, failures):
+    return [(stage, d.ctx_label(item) if isinstance(item, (dict, list)) else "?", str(error))
+            for stage, item, error in failures]
+
+
+def run_worker(args):
+    # One worker process of a --workers run.
+    import DailyRender_v2 as d
+
+    pipeline = configure(d, args, args.work_dir, args.worker_host)
+    failures = d.run_daily({"pipeline": pipeline, "daily_render": bench_jobs(d, args, int(args.jobs))})
+    with open(os.path.join(args.work_dir, f"result_host{args.worker_host}.json"), "w", encoding="utf-8") as f:
+        json.dump(failure_rows(d, failures), f)
+    return 0
+
+
+def result(count, args, makespan, rows, failures):
+    stages = summarize(rows)
+    render_seconds = stages.get("render", {}).get('total', 0.0)
+    frames = count * args.frames
+    return {
+        'jobs': count,
+        'workers': args.workers,
+        'frames': frames,
+        'makespan': makespan,
+        'jobs_per_hour': count / makespan * 3600 if makespan else 0.0,
+        'frames_per_second': frames / makespan if makespan else 0.0,
+        'render_seconds': render_seconds,
+        'overhead_seconds': max(0.0, makespan - render_seconds / max(1, args.workers)),
+        'failures': failures,
+        'stages': stages,
+    }
+
+
+def run_once(count, args, work_dir):
+    if args.workers > 1:
+        return run_workers(count, args, work_dir)
+    import DailyRender_v2 as d
+
+    pipeline = configure(d, args, work_dir)
+    jobs = bench_jobs(d, args, count)
+    started = time.perf_counter()
+    failures = d.run_daily({"pipeline": pipeline, "daily_render": jobs})
+    makespan = time.perf_counter() - started
+    return result(count, args, makespan, stage_rows(d.perf_db_file), failure_rows(d, failures))
+
+
+def run_workers(count, args, work_dir):
+    # --workers N: N local worker processes (hosts 1..N) pulling from one
+    # shared work queue, like N render PCs on the same Z: drive.
+    command = [sys.executable, os.path.abspath(__file__), "--jobs", str(count), "--work-dir", work_dir,
+               "--frames", str(args.frames), "--warmup", str(args.warmup), "--projects", str(args.projects),
+               "--maps", str(args.maps), "--workers", str(args.workers), "--affinity-wait", str(args.affinity_wait)]
+    if args.frame_ms is not None:
+        command += ["--frame-ms", str(args.frame_ms)]
+    if args.pipeline:
+        command += ["--pipeline", args.pipeline]
+    started = time.perf_counter()
+    procs = [subprocess.Popen(command + ["--worker-host", str(host)]) for host in range(1, args.workers + 1)]
+    for proc in procs:
+        proc.wait()
+    makespan = time.perf_counter() - started
+
+    rows = []
+    failures = []
+    per_host = {}
+    for host in range(1, args.workers + 1):
+        perf_db_file = os.path.join(work_dir, f"host{host}", "render_perf.db")
+        host_rows = stage_rows(perf_db_file) if os.path.isfile(perf_db_file) else []
+        rows += host_rows
+        per_host[host] = sum(1 for row in host_rows if row[1] == "render")
+        try:
+            with open(os.path.join(work_dir, f"result_host{host}.json"), "r", encoding="utf-8") as f:
+                failures += [tuple(row) for row in json.load(f)]
+        except (OSError, ValueError):
+            failures.append(("worker", f"host{host}", f"exited with {procs[host - 1].returncode}"))
+    bench = result(count, args, makespan, rows, failures)
+    bench['renders_per_host'] = per_host
+    return bench
+
+
+def print_result(result):
+    print(f"\n== {result['jobs']} jobs, {result['frames']} frames, {result['workers']} worker(s) ==")
+    print(f"makespan {result['makespan']:.2f}s  {result['jobs_per_hour']:.0f} jobs/h  "
+          f"{result['frames_per_second']:.1f} frames/s  render {result['render_seconds']:.2f}s  "
+          f"overhead {result['overhead_seconds']:.2f}s  failures {len(result['failures'])}")
+    print(f"{'stage':<24}{'count':>7}{'total s':>10}{'mean s':>10}{'max s':>10}{'failed':>8}")
+    for stage, entry in sorted(result['stages'].items(), key=lambda item: -item[1]['total']):
+        print(f"{stage:<24}{entry['count']:>7}{entry['total']:>10.2f}{entry['mean']:>10.3f}"
+              f"{entry['max']:>10.3f}{entry['failed']:>8}")
+    if 'renders_per_host' in result:
+        print("renders per host: " + ", ".join(f"host{host} {n}" for host, n in result['renders_per_host'].items()))
+    for stage, name, error in result['failures']:
+        print(f"  failed [{stage}] {name}: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the daily render")
+    parser.add_argument("--jobs", default="1,10", help="comma separated job counts, one run each")
+    parser.add_argument("--frames", type=int, default=60, help="frames per job")
+    parser.add_argument("--frame-ms", type=float, help="fake render time per frame (default $BENCH_FRAME_MS or 10)")
+    parser.add_argument("--warmup", type=int, default=8, help="warm-up frames per job")
+    parser.add_argument("--projects", type=int, default=2, help="distinct uprojects the jobs are spread over")
+    parser.add_argument("--maps", type=int, default=2, help="distinct maps per project")
+    parser.add_argument("--pipeline", help="JSON object merged into pipeline_settings")
+    parser.add_argument("--json", help="write all results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the work directories")
+    parser.add_argument("--workers", type=int, default=1, help="local worker processes sharing one work queue")
+    parser.add_argument("--affinity-wait", type=float, default=0.5, help="queue_affinity_wait of the workers")
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-host", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker_host:
+        return run_worker(args)
+
+    for fake in (FAKE_EDITOR, FAKE_FFMPEG):
+        os.chmod(fake, os.stat(fake).st_mode | 0o111)
+
+    results = []
+    for count in [int(n) for n in args.jobs.split(",") if n.strip()]:
+        work_dir = tempfile.mkdtemp(prefix=f"dailyrender_bench_{count}_")
+        try:
+            result = run_once(count, args, work_dir)
+        finally:
+            if not args.keep:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    return 1 if any(result['failures'] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
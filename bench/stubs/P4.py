@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+# Stand-in for P4Python used by the benchmark harness (bench/run_bench.py).
+#
+# Depot paths //depot/<rest> map to $BENCH_P4_ROOT/<rest>. A sync sleeps
+# $BENCH_P4_SYNC_S seconds per depot root (the first time only, like a real
+# have list), `where` and `changes` sleep $BENCH_P4_LATENCY_S per call.
+# Paths containing "unmapped" are reported as not in the client view.
+
+_synced = set()
+_synced_lock = threading.Lock()
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class P4Exception(Exception):
+    pass
+
+
+class P4:
+
+    def __init__(self):
+        self.port = None
+        self.user = None
+        self.password = None
+        self.exception_level = 2
+        self._connected = False
+        self.root = os.environ.get("BENCH_P4_ROOT", os.path.join(os.getcwd(), "bench_ws"))
+
+    def connect(self):
+        time.sleep(_env_float("BENCH_P4_LATENCY_S", 0.0))
+        self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def connected(self):
+        return self._connected
+
+    def _local(self, depot_path):
+        rest = depot_path[len("//depot/"):] if depot_path.startswith("//depot/") else depot_path.lstrip("/")
+        return os.path.join(self.root, *rest.split("/"))
+
+    def run(self, cmd, *args):
+        if not self._connected:
+            raise P4Exception("not connected")
+        time.sleep(_env_float("BENCH_P4_LATENCY_S", 0.0))
+        paths = []
+        for arg in args:
+            paths.extend(arg if isinstance(arg, (list, tuple)) else [arg])
+
+        if cmd == "where":
+            records = []
+            for path in paths:
+                if "unmapped" in path:
+                    records.append({'unmap': path, 'depotFile': path})
+                    continue
+                records.append({'depotFile': path, 'clientFile': path, 'path': self._local(path)})
+            return records
+
+        if cmd == "sync":
+            # Like a real have list, only the first sync of a root gets files;
+            # later ones (and "sync -n" of a synced root) return nothing.
+            preview = "-n" in paths
+            records = []
+            for path in paths:
+                if path.startswith("-"):
+                    continue
+                root = path[:-len("/...")] if path.endswith("/...") else path
+                with _synced_lock:
+                    first = root not in _synced
+                    if not preview:
+                        _synced.add(root)
+                if first and not preview:
+                    time.sleep(_env_float("BENCH_P4_SYNC_S", 0.0))
+                    local = self._local(root)
+                    os.makedirs(local, exist_ok=True)
+                if first:
+                    records.append({'depotFile': root + "/...", 'change': "100"})
+            return records
+
+        if cmd == "changes":
+            return [{'change': "100"}]
+
+        return []
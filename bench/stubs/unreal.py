@@ -0,0 +1,556 @@
+import os
+import select
+import shlex
+import socket
+import struct
+import time
+
+# A small stand-in for the `unreal` Python module, just enough to load and run
+# CinemaMPRExecutor outside the engine (see bench/fake_editor.py).
+#
+# MoviePipeline simulates a render: engine warm-up frames, then one output
+# frame every $BENCH_FRAME_MS milliseconds (at the 1x8 anti-aliasing samples
+# a loaded config starts with; fewer samples render proportionally faster),
+# written as a synthetic image of
+# $BENCH_FRAME_BYTES bytes. A sequence path ending in _<number> (e.g.
+# /Game/Bench/Seq_300) has that many frames, otherwise $BENCH_FRAMES.
+# Everything the executor logs goes to the file set with set_log_file(), in
+# the engine's "[time][frame]Category: Verbosity: message" format.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_TRAILER = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+_state = {
+    'command_line': "",
+    'log_file': None,
+    'frame': 0,
+    'pending': [],
+}
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def set_command_line(command_line):
+    _state['command_line'] = command_line
+
+
+def set_log_file(path):
+    if _state['log_file'] is not None:
+        _state['log_file'].close()
+    _state['log_file'] = open(path, "a", encoding="utf-8") if path else None
+
+
+def tick():
+    # Runs what the engine would do between two frames; returns True when
+    # something was pending.
+    _state['frame'] += 1
+    pending, _state['pending'] = _state['pending'], []
+    for callback in pending:
+        callback()
+    return bool(pending)
+
+
+def _write_log(verbosity, message, category="LogPython"):
+    now = time.time()
+    stamp = time.strftime("%Y.%m.%d-%H.%M.%S", time.localtime(now)) + ":%03d" % int(now % 1 * 1000)
+    prefix = f"{category}: " + (f"{verbosity}: " if verbosity else "")
+    line = f"[{stamp}][{_state['frame'] % 1000:3d}]{prefix}{message}\n"
+    if _state['log_file'] is not None:
+        _state['log_file'].write(line)
+        _state['log_file'].flush()
+    if os.environ.get("BENCH_EDITOR_VERBOSE"):
+        print(line, end="")
+
+
+def log(message):
+    _write_log(None, message)
+
+
+def log_warning(message):
+    _write_log("Warning", message)
+
+
+def log_error(message):
+    _write_log("Error", message)
+
+
+# --- reflection markup ----------------------------------------------------
+
+def uclass(*args, **kwargs):
+    return lambda cls: cls
+
+
+def ufunction(*args, **kwargs):
+    return lambda func: func
+
+
+def uproperty(*args, **kwargs):
+    return None
+
+
+class Array(list):
+
+    def __init__(self, element_type=None):
+        super().__init__()
+
+
+class Map(dict):
+
+    def __init__(self, key_type=None, value_type=None):
+        super().__init__()
+
+
+def new_object(cls, outer=None, base_type=None):
+    return cls()
+
+
+# --- simple value types ----------------------------------------------------
+
+class _Value:
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.__dict__.update(kwargs)
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.args}"
+
+
+class IntPoint(_Value):
+    pass
+
+
+class DirectoryPath(_Value):
+
+    def __init__(self, path=""):
+        super().__init__(path)
+        self.path = path
+
+
+class SoftObjectPath(_Value):
+    pass
+
+
+class SoftClassPath(_Value):
+    pass
+
+
+class _Enum:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+class EXRCompressionFormat:
+    NONE = _Enum("NONE")
+    PIZ = _Enum("PIZ")
+    ZIP = _Enum("ZIP")
+
+
+class MoviePipelineTextureStreamingMethod:
+    NONE = _Enum("NONE")
+    DISABLED = _Enum("DISABLED")
+    FULLY_LOAD = _Enum("FULLY_LOAD")
+
+
+class _Delegate:
+
+    def __init__(self):
+        self._functions = []
+
+    def add_function_unique(self, obj, name):
+        if (obj, name) not in self._functions:
+            self._functions.append((obj, name))
+
+    def broadcast(self, *args):
+        for obj, name in list(self._functions):
+            getattr(obj, name)(*args)
+
+
+# --- settings and jobs -----------------------------------------------------
+
+class MoviePipelineSetting:
+    pass
+
+
+class MoviePipelineOutputSetting(MoviePipelineSetting):
+
+    def __init__(self):
+        self.output_resolution = IntPoint(1920, 1080)
+        self.file_name_format = "{sequence_name}.{frame_number}"
+        self.output_directory = DirectoryPath("")
+        self.use_custom_playback_range = False
+        self.custom_start_frame = 0
+        self.custom_end_frame = 0
+        self.frame_number_offset = 0
+
+
+class MoviePipelineDeferredPassBase(MoviePipelineSetting):
+    pass
+
+
+class MoviePipelineAntiAliasingSetting(MoviePipelineSetting):
+
+    def __init__(self):
+        self.engine_warm_up_count = 0
+        self.render_warm_up_frames = False
+        self.spatial_sample_count = 1
+        self.temporal_sample_count = 8
+
+
+class MoviePipelineBurnInSetting(MoviePipelineSetting):
+    pass
+
+
+class MoviePipelineGameOverrideSetting(MoviePipelineSetting):
+    pass
+
+
+class MoviePipelineImageSequenceOutput_PNG(MoviePipelineSetting):
+    extension = "png"
+
+
+class MoviePipelineImageSequenceOutput_BMP(MoviePipelineSetting):
+    extension = "bmp"
+
+
+class MoviePipelineImageSequenceOutput_EXR(MoviePipelineSetting):
+    extension = "exr"
+
+    def __init__(self):
+        self.compression = EXRCompressionFormat.PIZ
+
+
+class MoviePipelineAppleProResOutput(MoviePipelineSetting):
+    extension = "mov"
+    video = True
+
+
+class MoviePipelineAvidDNxOutput(MoviePipelineSetting):
+    extension = "mxf"
+    video = True
+
+
+class MoviePipelineCommandLineEncoder(MoviePipelineSetting):
+
+    def __init__(self):
+        self.file_name_format_override = ""
+        self.delete_source_files = False
+
+
+class MoviePipelineConfig:
+
+    def __init__(self):
+        self._settings = []
+
+    def find_setting_by_class(self, cls):
+        for setting in self._settings:
+            if type(setting) is cls:
+                return setting
+        return None
+
+    def find_or_add_setting_by_class(self, cls):
+        setting = self.find_setting_by_class(cls)
+        if setting is None:
+            setting = cls()
+            self._settings.append(setting)
+        return setting
+
+    def remove_setting(self, setting):
+        self._settings.remove(setting)
+
+    def initialize_transient_settings(self):
+        pass
+
+
+class MoviePipelineExecutorJob:
+
+    def __init__(self):
+        self.sequence = None
+        self.map = None
+        self.author = ""
+        self.job_name = ""
+        self._config = MoviePipelineConfig()
+
+    def set_configuration(self, config):
+        # Presets are not loaded; every job starts from an empty config.
+        self._config = MoviePipelineConfig()
+
+    def get_configuration(self):
+        return self._config
+
+
+class MoviePipelineQueue:
+
+    def __init__(self):
+        self.jobs = []
+
+    def allocate_new_job(self, cls):
+        job = cls()
+        self.jobs.append(job)
+        return job
+
+    def delete_all_jobs(self):
+        self.jobs = []
+
+
+class MoviePipelineOutputData:
+
+    def __init__(self, success):
+        self.success = success
+
+
+class _Sequence:
+
+    def __init__(self, path):
+        self.path = path
+        name = path.split("/")[-1].split(".")[0]
+        tail = name.rsplit("_", 1)[-1]
+        self.frames = int(tail) if tail.isdigit() else int(_env_float("BENCH_FRAMES", 60))
+
+    def get_playback_start(self):
+        return 0
+
+    def get_playback_end(self):
+        return self.frames
+
+
+def load_asset(path):
+    return _Sequence(path)
+
+
+class MoviePipeline:
+    # Simulated render of one job. tick() is called by the fake editor's loop.
+
+    def __init__(self):
+        self.on_movie_pipeline_work_finished_delegate = _Delegate()
+        self.job = None
+        self.state = "UNINITIALIZED"
+        self.frame = 0
+        self.total = 0
+        self.warmup_left = 0
+        self._next_time = 0.0
+
+    def initialize(self, job):
+        self.job = job
+        config = job.get_configuration()
+        self.output = config.find_or_add_setting_by_class(MoviePipelineOutputSetting)
+        self.outputs = [s for s in config._settings if getattr(s, "extension", None)]
+        aa = config.find_setting_by_class(MoviePipelineAntiAliasingSetting)
+        self.warmup_left = aa.engine_warm_up_count if aa else 0
+        self.frame_cost = aa.spatial_sample_count * aa.temporal_sample_count / 8.0 if aa else 1.0
+        sequence = _Sequence(job.sequence.args[0] if job.sequence else "")
+        if self.output.use_custom_playback_range:
+            self.total = max(0, self.output.custom_end_frame - self.output.custom_start_frame)
+        else:
+            self.total = sequence.frames
+        self.state = "WARMING_UP" if self.warmup_left else "RENDERING"
+        self._next_time = time.monotonic()
+        _PIPELINES.append(self)
+
+    def _frame_file(self, setting, frame):
+        name = self.output.file_name_format
+        name = name.replace("{frame_number_rel}", "%04d" % (frame + 1 + self.output.frame_number_offset))
+        name = name.replace("{frame_number}", "%04d" % (frame + 1 + self.output.frame_number_offset))
+        return os.path.join(self.output.output_directory.path, f"{name}.{setting.extension}")
+
+    def tick(self):
+        now = time.monotonic()
+        if now < self._next_time or self.state == "FINISHED":
+            return
+        if self.state == "WARMING_UP":
+            self.warmup_left -= 1
+            self._next_time = now + _env_float("BENCH_WARMUP_MS", 1.0) / 1000.0
+            if self.warmup_left <= 0:
+                self.state = "RENDERING"
+            return
+        if self.frame < self.total:
+            size = int(_env_float("BENCH_FRAME_BYTES", 64 * 1024))
+            os.makedirs(self.output.output_directory.path, exist_ok=True)
+            for setting in self.outputs:
+                if getattr(setting, "video", False):
+                    continue
+                data = PNG_SIGNATURE + b"\0" * max(0, size - 20) + PNG_TRAILER if setting.extension == "png" else b"\0" * size
+                with open(self._frame_file(setting, self.frame), "wb") as f:
+                    f.write(data)
+            self.frame += 1
+            crash = os.environ.get("BENCH_CRASH_AT", "")
+            if crash and crash.rsplit(":", 1)[0] in self.job.sequence.args[0] and self.frame == int(crash.rsplit(":", 1)[1]):
+                # Like a crash in the middle of writing the next frame.
+                for setting in self.outputs:
+                    if not getattr(setting, "video", False):
+                        with open(self._frame_file(setting, self.frame), "wb") as f:
+                            f.write(PNG_SIGNATURE + b"\0" * 100)
+                log_error(f"Fatal error: BENCH_CRASH_AT {crash}")
+                os._exit(3)
+            self._next_time = now + _env_float("BENCH_FRAME_MS", 10.0) * self.frame_cost / 1000.0
+            return
+        for setting in self.outputs:
+            if getattr(setting, "video", False):
+                path = os.path.join(self.output.output_directory.path, f"{self.output.file_name_format}.{setting.extension}")
+                with open(path, "wb") as f:
+                    f.write(b"\0" * int(_env_float("BENCH_FRAME_BYTES", 64 * 1024)) * max(1, self.total // 10))
+        encoder = self.job.get_configuration().find_setting_by_class(MoviePipelineCommandLineEncoder)
+        if encoder is not None:
+            path = os.path.join(self.output.output_directory.path, f"{encoder.file_name_format_override}.mp4")
+            with open(path, "wb") as f:
+                f.write(b"\0" * int(_env_float("BENCH_FRAME_BYTES", 64 * 1024)) * max(1, self.total // 10))
+            if encoder.delete_source_files:
+                for setting in self.outputs:
+                    for frame in range(self.total):
+                        try:
+                            os.remove(self._frame_file(setting, frame))
+                        except OSError:
+                            pass
+        self.state = "FINISHED"
+        _PIPELINES.remove(self)
+        _state['pending'].append(lambda: self.on_movie_pipeline_work_finished_delegate.broadcast(MoviePipelineOutputData(True)))
+
+
+_PIPELINES = []
+
+
+def tick_pipelines():
+    for pipeline in list(_PIPELINES):
+        pipeline.tick()
+
+
+class MoviePipelineLibrary:
+
+    @staticmethod
+    def get_overall_output_frames(pipeline):
+        return pipeline.frame, pipeline.total
+
+    @staticmethod
+    def get_current_segment_state(pipeline):
+        return _Enum(pipeline.state)
+
+    @staticmethod
+    def get_completion_percentage(pipeline):
+        return pipeline.frame / pipeline.total if pipeline.total else 0.0
+
+
+# --- world, command line and the host executor -----------------------------
+
+class World:
+
+    def __init__(self, level_name):
+        self.level_name = level_name
+
+
+class GameplayStatics:
+
+    @staticmethod
+    def get_current_level_name(world, remove_prefix=True):
+        return world.level_name
+
+    @staticmethod
+    def open_level(world, level_name, absolute=True, options=""):
+        def loaded():
+            time.sleep(_env_float("BENCH_MAP_LOAD_S", 0.0))
+            world.level_name = level_name.replace("\\", "/").split("/")[-1].split(".")[0]
+            for executor in _EXECUTORS:
+                executor.on_map_load(world)
+        _state['pending'].append(loaded)
+
+
+class SystemLibrary:
+
+    @staticmethod
+    def get_command_line():
+        return _state['command_line']
+
+    @staticmethod
+    def parse_command_line(command_line):
+        tokens, switches, params = [], [], {}
+        for arg in shlex.split(command_line):
+            if arg.startswith("-"):
+                if "=" in arg:
+                    key, value = arg[1:].split("=", 1)
+                    params[key] = value
+                else:
+                    switches.append(arg[1:])
+            else:
+                tokens.append(arg)
+        return tokens, switches, params
+
+
+_EXECUTORS = []
+
+
+class MoviePipelinePythonHostExecutor:
+
+    def __init__(self):
+        self.socket_message_recieved_delegate = _Delegate()
+        self.http_response_recieved_delegate = _Delegate()
+        self.target_pipeline_class = MoviePipeline
+        self.finished = False
+        self.errored = False
+        self._socket = None
+        self._received = b""
+        tokens, _, _ = SystemLibrary.parse_command_line(_state['command_line'])
+        self._world = World(tokens[1].split("/")[-1].split(".")[0] if len(tokens) > 1 else "")
+        _EXECUTORS.append(self)
+        self._post_init()
+
+    def _post_init(self):
+        pass
+
+    def get_last_loaded_world(self):
+        return self._world
+
+    def on_begin_frame(self):
+        # Size-prefixed messages from the other end of the socket are handed
+        # to socket_message_recieved_delegate here, like the engine does.
+        while self._socket is not None and select.select([self._socket], [], [], 0)[0]:
+            try:
+                data = self._socket.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                self._socket = None
+                break
+            self._received += data
+        while len(self._received) >= 4:
+            (size,) = struct.unpack("<I", self._received[:4])
+            if len(self._received) < 4 + size:
+                break
+            message = self._received[4:4 + size].decode("utf-8")
+            self._received = self._received[4 + size:]
+            self.socket_message_recieved_delegate.broadcast(message)
+
+    def on_map_load(self, world):
+        pass
+
+    def connect_socket(self, host, port):
+        try:
+            self._socket = socket.create_connection((host, port), timeout=5)
+            return True
+        except OSError:
+            self._socket = None
+            return False
+
+    def send_socket_message(self, message):
+        if self._socket is None:
+            return False
+        payload = message.encode("utf-8")
+        try:
+            self._socket.sendall(struct.pack("<I", len(payload)) + payload)
+            return True
+        except OSError:
+            return False
+
+    def on_executor_finished_impl(self):
+        self.finished = True
+
+    def on_executor_errored(self, *args):
+        self.errored = True
+        self.finished = True
@@ -0,0 +1,332 @@
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from frames import contiguous_end, existing_frames, frame_path, frame_pattern, png_complete
+
+# ffmpeg encodes for the daily MP4s. Every ffmpeg run goes through `call`
+# (subprocess.call unless the caller passes its own, e.g. a watchdog).
+
+FRAMERATE = 30
+# All intra (-g 1) so every frame can be scrubbed in review. This is also what
+# makes it safe to cut the sequence anywhere for the segmented encode.
+X264_ARGS = ["-c:v", "libx264", "-g", "1", "-tune", "stillimage", "-crf", "19", "-bf", "0", "-vendor", "apl0", "-pix_fmt", "yuv420p"]
+
+# What CinemaMPRExecutor writes for each output format: "sequence" formats are
+# frames we encode here, "video" formats are one movie per job written by the
+# editor (cmdline is already an MP4 from the command line encoder).
+OUTPUT_FORMATS = {
+    'png': ("sequence", "png"),
+    'bmp': ("sequence", "bmp"),
+    'exr': ("sequence", "exr"),
+    'prores': ("video", "mov"),
+    'dnx': ("video", "mxf"),
+    'cmdline': ("video", "mp4"),
+}
+
+# Extra ffmpeg input options per frame format. Movie Render Queue writes EXRs
+# in linear, so they need the sRGB curve back for the review MP4.
+INPUT_ARGS = {
+    'exr': ["-apply_trc", "iec61966_2_1"],
+}
+
+
+# Deliverables made from the same decode as the review MP4: the frames are
+# read once and split in one filter graph, so each extra output only costs its
+# own scaling and encoding. Targets ("encode_targets" in pipeline_settings or
+# a job), written next to the review MP4 {name}.mp4:
+#   {"kind": "proxy", "scale": 0.5}                       -> {name}_proxy.mp4
+#   {"kind": "thumbnails", "every": 24, "width": 480}     -> {name}_thumb.0001.jpg, ...
+#   {"kind": "contact_sheet", "every": 48, "width": 320, "columns": 8, "rows": 6}
+#                                                         -> {name}_contact.01.jpg, ...
+# Thumbnails and contact sheets take every Nth frame from the first one; a
+# contact sheet that fills up continues on the next page.
+TARGET_KINDS = ("proxy", "thumbnails", "contact_sheet")
+PROXY_X264_ARGS = ["-c:v", "libx264", "-g", "1", "-crf", "23", "-bf", "0", "-pix_fmt", "yuv420p"]
+JPEG_ARGS = ["-q:v", "3"]
+
+
+def target_path(target, movie_file):
+    base = os.path.splitext(movie_file)[0]
+    kind = target['kind']
+    if kind == "proxy":
+        return f"{base}_proxy.mp4"
+    if kind == "thumbnails":
+        return f"{base}_thumb.%04d.jpg"
+    if kind == "contact_sheet":
+        return f"{base}_contact.%02d.jpg"
+    return movie_file
+
+
+def select_every(every):
+    # Every Nth frame, renumbered so the image muxer doesn't repeat frames to
+    # fill the gaps.
+    return f"select='not(mod(n\\,{int(every)}))',setpts=N/FRAME_RATE/TB"
+
+
+def target_filter(target):
+    kind = target['kind']
+    if kind == "proxy":
+        scale = float(target.get('scale', 0.5))
+        return f"scale=trunc(iw*{scale}/2)*2:-2"
+    if kind == "thumbnails":
+        return f"{select_every(target.get('every', 24))},scale={int(target.get('width', 480))}:-2"
+    if kind == "contact_sheet":
+        return (f"{select_every(target.get('every', 48))},scale={int(target.get('width', 320))}:-2,"
+                f"tile={int(target.get('columns', 8))}x{int(target.get('rows', 6))}")
+    return "null"
+
+
+def target_outputs(targets, movie_file, review=True):
+    # [(target, path)]. Image outputs first and the review MP4 last, so the
+    # last argument of the command is still the file that grows the most
+    # (the watchdog watches it).
+    order = {'thumbnails': 0, 'contact_sheet': 1, 'proxy': 2}
+    extras = sorted((t for t in targets or () if t.get('kind') in TARGET_KINDS), key=lambda t: order[t['kind']])
+    outputs = [(target, target_path(target, movie_file)) for target in extras]
+    if review:
+        outputs.append(({'kind': "review"}, movie_file))
+    return outputs
+
+
+def output_args(outputs):
+    # Everything after the input: one filter graph that splits the decoded
+    # frames into every output, or the plain review encode when that is all.
+    if len(outputs) == 1 and outputs[0][0]['kind'] == "review":
+        return [*X264_ARGS, outputs[0][1]]
+    if len(outputs) == 1:
+        graph = [f"[0:v]{target_filter(outputs[0][0])}[o0]"]
+    else:
+        graph = [f"[0:v]split={len(outputs)}" + "".join(f"[s{i}]" for i in range(len(outputs)))]
+        graph += [f"[s{i}]{target_filter(target)}[o{i}]" for i, (target, _) in enumerate(outputs)]
+    args = ["-filter_complex", ";".join(graph)]
+    for i, (target, path) in enumerate(outputs):
+        codec = {'review': X264_ARGS, 'proxy': PROXY_X264_ARGS}.get(target['kind'], JPEG_ARGS)
+        args += ["-map", f"[o{i}]", *codec, path]
+    return args
+
+
+def numbered_files(path):
+    # Files written for an image pattern like foo_thumb.%04d.jpg, sorted.
+    directory, pattern = os.path.split(path)
+    prefix = pattern.split("%")[0]
+    suffix = os.path.splitext(pattern)[1]
+    try:
+        names = sorted(name for name in os.listdir(directory or ".") if name.startswith(prefix) and name.endswith(suffix))
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def clear_outputs(outputs):
+    # Numbered images of an earlier encode of the same name would be mixed
+    # with the new ones.
+    for target, path in outputs:
+        if "%" in path:
+            for old in numbered_files(path):
+                os.remove(old)
+
+
+def target_files(targets, movie_file):
+    # The extra files the last encode actually wrote, in output order.
+    files = []
+    for target, path in target_outputs(targets, movie_file, review=False):
+        if "%" in path:
+            files += numbered_files(path)
+        elif os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+def encode_sequence(ffmpeg, render_path, render_name, start, movie_file, ext="png", call=subprocess.call, targets=()):
+    # Encodes the whole frame sequence after the render is done, with the
+    # extra targets from the same decode.
+    outputs = target_outputs(targets, movie_file)
+    clear_outputs(outputs)
+    command = [
+        ffmpeg, "-framerate", str(FRAMERATE), "-start_number", str(start), *INPUT_ARGS.get(ext, []),
+        "-i", frame_pattern(render_path, render_name, ext),
+        "-y", "-probesize", "5000000", *output_args(outputs),
+    ]
+    return call(command)
+
+
+def encode_targets(ffmpeg, source_args, movie_file, targets, call=subprocess.call):
+    # Only the extra targets, for review MP4s that were not made by one ffmpeg
+    # run over the frames (segmented encodes, editor movies, the render cache).
+    # source_args is the input part of the command, e.g. ["-i", movie].
+    outputs = target_outputs(targets, movie_file, review=False)
+    if not outputs:
+        return 0
+    clear_outputs(outputs)
+    return call([ffmpeg, *source_args, "-y", *output_args(outputs)])
+
+
+def encode_video(ffmpeg, video_file, movie_file, call=subprocess.call, targets=()):
+    # For formats the editor wrote as one movie: an MP4 is only moved into
+    # place, ProRes/DNx are transcoded to the review H.264.
+    if not os.path.isfile(video_file):
+        print(f"encode: {video_file} was not written")
+        return 1
+    if os.path.splitext(video_file)[1].lower() == ".mp4":
+        shutil.move(video_file, movie_file)
+        return encode_targets(ffmpeg, ["-i", movie_file], movie_file, targets, call=call)
+    outputs = target_outputs(targets, movie_file)
+    clear_outputs(outputs)
+    command = [ffmpeg, "-i", video_file, "-y", *output_args(outputs)]
+    return call(command)
+
+
+# Output that does not depend on the ffmpeg build or the time of day, so a
+# segmented encode is byte-for-byte repeatable.
+BITEXACT_ARGS = ["-fflags", "+bitexact", "-flags:v", "+bitexact", "-map_metadata", "-1"]
+
+
+def split_range(start, end, segments):
+    # Splits [start, end) into at most `segments` contiguous, nearly equal ranges.
+    count = end - start
+    segments = max(1, min(segments, count))
+    ranges = []
+    first = start
+    for i in range(segments):
+        size = count // segments + (1 if i < count % segments else 0)
+        ranges.append((first, first + size))
+        first += size
+    return ranges
+
+
+def encode_segmented(ffmpeg, render_path, render_name, start, movie_file, segments=4, threads_per_segment=2, end=None,
+                     ext="png", call=subprocess.call, targets=()):
+    # Encodes [start, end) as `segments` independent ffmpeg processes running
+    # side by side and joins the parts with the concat demuxer (-c copy, no
+    # re-encode). x264 gets a fixed thread count so the result only depends on
+    # the number of segments, not on the machine it ran on. Extra targets are
+    # made afterwards from the joined MP4, which decodes faster than the frames.
+    if end is None:
+        end = contiguous_end(existing_frames(render_path, render_name, ext), start)
+    ranges = split_range(start, end, segments)
+    if not ranges or ranges[0][0] >= ranges[0][1]:
+        print(f"segmented encode: no frames for {render_name} from {start}")
+        return 1
+
+    work_dir = os.path.join(os.path.dirname(movie_file), f"{render_name}_segments")
+    os.makedirs(work_dir, exist_ok=True)
+
+    def encode_part(index, first, last):
+        part = os.path.join(work_dir, f"part_{index:03d}.mp4")
+        command = [
+            ffmpeg, "-framerate", str(FRAMERATE), "-start_number", str(first), *INPUT_ARGS.get(ext, []),
+            "-i", frame_pattern(render_path, render_name, ext), "-frames:v", str(last - first),
+            "-y", "-probesize", "5000000", *X264_ARGS, "-threads", str(threads_per_segment),
+            *BITEXACT_ARGS, part,
+        ]
+        return part, call(command, stdin=subprocess.DEVNULL)
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        results = list(pool.map(lambda r: encode_part(r[0], *r[1]), enumerate(ranges)))
+
+    failed = [part for part, returncode in results if returncode != 0]
+    if failed:
+        print(f"segmented encode: {len(failed)} segment(s) of {render_name} failed, keeping {work_dir}")
+        return 1
+
+    concat_list = os.path.join(work_dir, "parts.txt")
+    with open(concat_list, "w", encoding="utf-8") as f:
+        for part, _ in results:
+            f.write("file '%s'\n" % part.replace("\\", "/").replace("'", "'\\''"))
+
+    command = [
+        ffmpeg, "-f", "concat", "-safe", "0", "-i", concat_list,
+        "-y", "-c", "copy", *BITEXACT_ARGS, movie_file,
+    ]
+    returncode = call(command, stdin=subprocess.DEVNULL)
+    if returncode == 0:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        returncode = encode_targets(ffmpeg, ["-i", movie_file], movie_file, targets, call=call)
+    return returncode
+
+
+class StreamingEncoder:
+    # Feeds frames to one long-lived ffmpeg process while they are still being
+    # rendered, so the MP4 is done a few seconds after the last frame lands.
+    #
+    # Frames are sent strictly in order. A frame counts as written once its PNG
+    # ends with the IEND chunk. If a frame is missing (or stays truncated) while
+    # a later frame already exists, we wait up to gap_timeout seconds for it and
+    # then repeat the previous frame so the timing of the movie is kept. Once
+    # the renderer has exited, gaps are filled right away.
+
+    def __init__(self, ffmpeg, render_path, render_name, start, movie_file, poll_interval=0.5, gap_timeout=60,
+                 targets=()):
+        self.ffmpeg = ffmpeg
+        self.render_path = render_path
+        self.render_name = render_name
+        self.start = start
+        self.movie_file = movie_file
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.outputs = target_outputs(targets, movie_file)
+        self.frames_written = 0
+        self.gaps = []
+
+    def command(self):
+        return [
+            self.ffmpeg, "-f", "image2pipe", "-framerate", str(FRAMERATE), "-c:v", "png", "-i", "-",
+            "-y", *output_args(self.outputs),
+        ]
+
+    def _has_later_frame(self, frame):
+        frames = existing_frames(self.render_path, self.render_name)
+        return bool(frames) and frames[-1] > frame
+
+    def run(self, is_rendering):
+        # is_rendering() must return True while the renderer may still write frames.
+        clear_outputs(self.outputs)
+        proc = subprocess.Popen(self.command(), stdin=subprocess.PIPE)
+        frame = self.start
+        last_data = None
+        gap_since = None
+        try:
+            while True:
+                rendering = is_rendering()
+                path = frame_path(self.render_path, self.render_name, frame)
+                if png_complete(path):
+                    with open(path, "rb") as f:
+                        last_data = f.read()
+                    proc.stdin.write(last_data)
+                    self.frames_written += 1
+                    frame += 1
+                    gap_since = None
+                    continue
+
+                if not self._has_later_frame(frame):
+                    if not rendering:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+
+                if rendering:
+                    if gap_since is None:
+                        gap_since = time.monotonic()
+                    if time.monotonic() - gap_since < self.gap_timeout:
+                        time.sleep(self.poll_interval)
+                        continue
+
+                print(f"stream encode: frame {frame} of {self.render_name} is missing, repeating previous frame")
+                self.gaps.append(frame)
+                if last_data is not None:
+                    proc.stdin.write(last_data)
+                    self.frames_written += 1
+                frame += 1
+                gap_since = None
+        except BrokenPipeError:
+            print(f"stream encode: ffmpeg exited early for {self.render_name}")
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            returncode = proc.wait()
+        return returncode
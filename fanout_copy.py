@@ -0,0 +1,181 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+
+# Copies one file to several destinations at once.
+#
+# The source is read once in large chunks and every chunk is handed to one
+# writer thread per destination, so a slow share only slows its own writer
+# until its queue is full. Each destination is written to "<target>.part"
+# and renamed into place after it has been read back and its checksum matches
+# the one computed while reading the source. An existing .part file (or a
+# complete target) is resumed instead of rewritten; if a resumed copy does
+# not verify, it is copied once more from scratch.
+
+CHUNK_SIZE = 8 * 1024 * 1024
+QUEUE_CHUNKS = 16
+
+
+def new_hash():
+    return hashlib.blake2b(digest_size=32)
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    digest = new_hash()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Writer(threading.Thread):
+
+    def __init__(self, target, source_size, resume):
+        super().__init__(name=f"copy-{os.path.basename(target)}", daemon=True)
+        self.target = target
+        self.part = target + ".part"
+        self.queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+        self.error = None
+        self.offset = 0
+        self.written = 0
+        self.seconds = 0.0
+        self.skip_write = False
+
+        if resume:
+            if os.path.isfile(target) and os.path.getsize(target) == source_size:
+                # Already there; only needs to be verified.
+                self.skip_write = True
+                self.offset = source_size
+            elif os.path.isfile(self.part) and os.path.getsize(self.part) <= source_size:
+                self.offset = os.path.getsize(self.part)
+
+    def run(self):
+        t0 = time.perf_counter()
+        f = None
+        position = 0
+        try:
+            if not self.skip_write:
+                os.makedirs(os.path.dirname(self.target) or ".", exist_ok=True)
+                f = open(self.part, "r+b" if self.offset else "wb")
+                f.seek(self.offset)
+            while True:
+                chunk = self.queue.get()
+                if chunk is None:
+                    break
+                if self.error is not None or f is None:
+                    continue
+                end = position + len(chunk)
+                if end > self.offset:
+                    data = chunk[max(0, self.offset - position):]
+                    f.write(data)
+                    self.written += len(data)
+                position = end
+        except OSError as e:
+            self.error = e
+            # Keep draining so the reader never blocks on us.
+            while self.queue.get() is not None:
+                pass
+        finally:
+            if f is not None:
+                try:
+                    f.close()
+                except OSError as e:
+                    self.error = self.error or e
+            self.seconds = time.perf_counter() - t0
+
+
+def _copy_once(source, targets, resume, chunk_size):
+    size = os.path.getsize(source)
+    writers = [_Writer(target, size, resume) for target in targets]
+    for writer in writers:
+        writer.start()
+
+    digest = new_hash()
+    t0 = time.perf_counter()
+    complete = False
+    try:
+        with open(source, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                for writer in writers:
+                    writer.queue.put(chunk)
+        complete = True
+    finally:
+        # Writers wait for the sentinel even when the source could not be read.
+        for writer in writers:
+            writer.queue.put(None)
+        for writer in writers:
+            writer.join()
+        if not complete:
+            for writer in writers:
+                if not writer.skip_write:
+                    try:
+                        os.remove(writer.part)
+                    except OSError:
+                        pass
+    read_seconds = time.perf_counter() - t0
+    checksum = digest.hexdigest()
+
+    results = {}
+    for writer in writers:
+        result = {
+            'target': writer.target,
+            'bytes': size,
+            'written': writer.written,
+            'resumed': writer.offset > 0,
+            'seconds': writer.seconds,
+            'checksum': checksum,
+            'ok': False,
+            'error': None,
+        }
+        if writer.error is not None:
+            result['error'] = repr(writer.error)
+        else:
+            written_file = writer.target if writer.skip_write else writer.part
+            try:
+                t1 = time.perf_counter()
+                if file_digest(written_file, chunk_size) == checksum:
+                    if not writer.skip_write:
+                        os.replace(writer.part, writer.target)
+                    result['ok'] = True
+                else:
+                    result['error'] = "checksum mismatch"
+                result['seconds'] += time.perf_counter() - t1
+            except OSError as e:
+                result['error'] = repr(e)
+        result['mb_per_s'] = size / (1024 * 1024) / max(result['seconds'], 1e-6)
+        results[writer.target] = result
+    return results, read_seconds
+
+
+def fanout_copy(source, targets, resume=True, chunk_size=CHUNK_SIZE):
+    # Returns one result dict per target, in the order given.
+    results, _ = _copy_once(source, targets, resume, chunk_size)
+
+    retry = [target for target, result in results.items() if not result['ok'] and result['resumed']]
+    if retry:
+        for target in retry:
+            for path in (target + ".part", target):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        again, _ = _copy_once(source, retry, False, chunk_size)
+        results.update(again)
+
+    for target in targets:
+        result = results[target]
+        if result['ok']:
+            note = " (resumed)" if result['resumed'] else ""
+            print(f"Copied {os.path.basename(source)} -> {target}: {result['mb_per_s']:.1f} MB/s{note}")
+        else:
+            print(f"Copy FAILED {os.path.basename(source)} -> {target}: {result['error']}")
+    return [results[target] for target in targets]
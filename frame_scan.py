@@ -0,0 +1,130 @@
+import os
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from frames import PNG_SIGNATURE, PNG_TRAILER
+
+# Integrity scan of a rendered `{render_name}.NNNN.<ext>` sequence, run before
+# it is encoded.
+#
+# One directory listing gives every frame's size (os.scandir has it without an
+# extra stat per file on Windows), so gaps and zero-byte frames cost nothing
+# more. A thread pool then reads only a few bytes at both ends of the other
+# frames:
+#   png  the signature and the IEND chunk at the very end (frames are written
+#        front to back, so an interrupted write has no trailer)
+#   bmp  "BM" and the file size stored in the header
+#   exr  the magic number; there is no end marker, so only its size counts
+# Expected are the frames custom_start .. custom_start + frame_count - 1, or up
+# to the highest frame on disk when the count is not known.
+#
+# The report holds offsets from custom_start, end exclusive, like the shard
+# and resume ranges:
+#   {"expected": 3000, "present": 2991, "bytes": ..., "seconds": 0.4,
+#    "missing": [[120, 128]], "zero": [[2999, 3000]], "truncated": [[1500, 1501]],
+#    "broken": [[120, 128], [1500, 1501], [2999, 3000]]}
+
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+BMP_HEADER = struct.Struct("<2sI")
+
+
+def frame_intact(path, size, ext):
+    try:
+        with open(path, "rb") as f:
+            if ext == "png":
+                if size < len(PNG_SIGNATURE) + len(PNG_TRAILER):
+                    return False
+                head = f.read(len(PNG_SIGNATURE))
+                f.seek(-len(PNG_TRAILER), os.SEEK_END)
+                return head == PNG_SIGNATURE and f.read(len(PNG_TRAILER)) == PNG_TRAILER
+            if ext == "bmp":
+                head = f.read(BMP_HEADER.size)
+                if len(head) < BMP_HEADER.size:
+                    return False
+                magic, declared = BMP_HEADER.unpack(head)
+                return magic == b"BM" and declared <= size
+            if ext == "exr":
+                return f.read(len(EXR_MAGIC)) == EXR_MAGIC
+    except OSError:
+        return False
+    return True
+
+
+def to_ranges(offsets):
+    # Sorted offsets -> [[start, end), ...] runs.
+    ranges = []
+    for offset in offsets:
+        if ranges and ranges[-1][1] == offset:
+            ranges[-1][1] = offset + 1
+        else:
+            ranges.append([offset, offset + 1])
+    return ranges
+
+
+def scan_sequence(render_path, render_name, custom_start, frame_count=None, ext="png", workers=16):
+    started = time.monotonic()
+    pattern = re.compile(re.escape(render_name) + r"\.(\d+)\." + re.escape(ext) + "$")
+    sizes = {}
+    try:
+        with os.scandir(render_path) as entries:
+            for entry in entries:
+                m = pattern.match(entry.name)
+                if m:
+                    try:
+                        sizes[int(m.group(1))] = entry.stat().st_size
+                    except OSError:
+                        pass
+    except OSError:
+        pass
+
+    if frame_count is None:
+        frame_count = max(0, max(sizes) - custom_start + 1) if sizes else 0
+    missing = []
+    zero = []
+    candidates = []
+    for offset in range(frame_count):
+        size = sizes.get(custom_start + offset)
+        if size is None:
+            missing.append(offset)
+        elif size == 0:
+            zero.append(offset)
+        else:
+            candidates.append(offset)
+
+    def check(offset):
+        path = os.path.join(render_path, f"{render_name}.{custom_start + offset:04d}.{ext}")
+        return frame_intact(path, sizes[custom_start + offset], ext)
+
+    if len(candidates) > 64:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            intact = list(pool.map(check, candidates))
+    else:
+        intact = [check(offset) for offset in candidates]
+    truncated = [offset for offset, ok in zip(candidates, intact) if not ok]
+
+    return {
+        'expected': frame_count,
+        'present': frame_count - len(missing),
+        'bytes': sum(sizes.get(custom_start + offset, 0) for offset in range(frame_count)),
+        'seconds': round(time.monotonic() - started, 3),
+        'missing': to_ranges(missing),
+        'zero': to_ranges(zero),
+        'truncated': to_ranges(truncated),
+        'broken': to_ranges(sorted(missing + zero + truncated)),
+    }
+
+
+def frames_in(ranges):
+    return sum(end - start for start, end in ranges)
+
+
+def scan_summary(report):
+    text = f"{report['expected'] - frames_in(report['broken'])}/{report['expected']} frames ok in {report['seconds']}s"
+    for kind in ("missing", "zero", "truncated"):
+        if report[kind]:
+            shown = ", ".join(f"{start}-{end}" for start, end in report[kind][:5])
+            more = f" +{len(report[kind]) - 5} ranges" if len(report[kind]) > 5 else ""
+            text += f", {kind} {frames_in(report[kind])} ({shown}{more})"
+    return text
@@ -0,0 +1,65 @@
+import os
+import re
+
+# Helpers for the `{render_name}.NNNN.<ext>` frame sequences written by
+# CinemaMPRExecutor.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Zero length IEND chunk + its CRC. A PNG that ends with this was fully written.
+PNG_TRAILER = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+
+def resume_stamp_path(render_path, render_name):
+    # What the frames in render_path were rendered from (see DailyRender_v2's
+    # resume). Hidden, so it is not part of the `{render_name}.*` sequence.
+    return os.path.join(render_path, f".{render_name}.resume.json")
+
+
+def frame_path(render_path, render_name, frame, ext="png"):
+    return os.path.join(render_path, f"{render_name}.{frame:04d}.{ext}")
+
+
+def frame_pattern(render_path, render_name, ext="png"):
+    # ffmpeg image2 pattern for the same sequence.
+    return os.path.join(render_path, f"{render_name}.%04d.{ext}")
+
+
+def png_complete(path):
+    # Only reads the first 8 and the last 12 bytes, so it is cheap even for 4K frames.
+    try:
+        with open(path, "rb") as f:
+            head = f.read(len(PNG_SIGNATURE))
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size < len(PNG_SIGNATURE) + len(PNG_TRAILER):
+                return False
+            f.seek(-len(PNG_TRAILER), os.SEEK_END)
+            tail = f.read(len(PNG_TRAILER))
+    except OSError:
+        return False
+    return head == PNG_SIGNATURE and tail == PNG_TRAILER
+
+
+def existing_frames(render_path, render_name, ext="png"):
+    # Frame numbers present on disk, sorted. Does not check the contents.
+    pattern = re.compile(re.escape(render_name) + r"\.(\d+)\." + re.escape(ext) + "$")
+    frames = []
+    try:
+        names = os.listdir(render_path)
+    except OSError:
+        return frames
+    for name in names:
+        m = pattern.match(name)
+        if m:
+            frames.append(int(m.group(1)))
+    frames.sort()
+    return frames
+
+
+def contiguous_end(frames, start):
+    # First frame number after the unbroken run that begins at `start`.
+    present = set(frames)
+    end = start
+    while end in present:
+        end += 1
+    return end
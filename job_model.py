@@ -0,0 +1,131 @@
+# Render job entries of render_jobs.json, checked before anything runs.
+#
+# Jobs stay plain dicts (they are stored in the render cache and written into
+# shard tickets as JSON), but every field the pipeline reads is declared here
+# with its type, so a typo or a missing value is reported for that job up
+# front instead of as a KeyError halfway through the night.
+
+import ntpath
+
+from encode import OUTPUT_FORMATS, TARGET_KINDS
+
+REQUIRED_FIELDS = (
+    ('render_name', str),
+    ('project_name', str),
+    ('engine_version', str),
+    ('ue_project', str),
+    ('ue_umap', str),
+    ('ue_sequence', str),
+    ('output_directory', str),
+    ('res_x', int),
+    ('res_y', int),
+)
+
+OPTIONAL_FIELDS = (
+    ('activate', bool),
+    ('host', (int, list)),
+    ('custom_start', int),
+    ('frame_count', int),
+    ('shards', int),
+    ('encode_mode', str),
+    ('render_root', str),
+    ('force_render', bool),
+    ('resume_frames', bool),
+    ('warmup_mode', str),
+    ('render_warmup', int),
+    ('output_format', str),
+    ('exr_compression', str),
+    ('quality', str),
+    ('encode_targets', list),
+)
+
+POSITIVE_FIELDS = ('res_x', 'res_y', 'frame_count', 'shards')
+
+CHOICES = {
+    'encode_mode': ("batch", "stream", "segmented"),
+    'warmup_mode': ("fixed", "adaptive", "calibrate"),
+    'output_format': tuple(OUTPUT_FORMATS),
+}
+
+
+class JobError(ValueError):
+
+    def __init__(self, job, problems):
+        self.job = job
+        self.problems = problems
+        super().__init__(f"{job_name(job)}: " + "; ".join(problems))
+
+
+def job_name(job):
+    if isinstance(job, dict):
+        return job.get('render_name') or "<no render_name>"
+    return "<not an object>"
+
+
+def _type_name(kind):
+    if isinstance(kind, tuple):
+        return " or ".join(k.__name__ for k in kind)
+    return kind.__name__
+
+
+def _is_type(value, kind):
+    # bool is an int in Python, but "res_x": true is still a mistake.
+    if isinstance(value, bool) and kind is not bool:
+        return False
+    return isinstance(value, kind)
+
+
+def check_job(job, engines=None, profiles=None):
+    # Returns the list of problems with one job entry, empty when it is fine.
+    if not isinstance(job, dict):
+        return ["job entry is not an object"]
+    problems = []
+    for name, kind in REQUIRED_FIELDS:
+        if name not in job:
+            problems.append(f"missing '{name}'")
+        elif not _is_type(job[name], kind):
+            problems.append(f"'{name}' must be {_type_name(kind)}, got {job[name]!r}")
+    for name, kind in OPTIONAL_FIELDS:
+        if name in job and not _is_type(job[name], kind):
+            problems.append(f"'{name}' must be {_type_name(kind)}, got {job[name]!r}")
+    for name in POSITIVE_FIELDS:
+        if _is_type(job.get(name), int) and job[name] <= 0:
+            problems.append(f"'{name}' must be positive, got {job[name]}")
+    for name, choices in CHOICES.items():
+        if name in job and job[name] not in choices:
+            problems.append(f"'{name}' must be one of {', '.join(choices)}, got {job[name]!r}")
+    if isinstance(job.get('host'), list) and (not job['host'] or not all(_is_type(h, int) for h in job['host'])):
+        problems.append(f"'host' must be a host number or a non-empty list of them, got {job['host']!r}")
+    if isinstance(job.get('encode_targets'), list):
+        for target in job['encode_targets']:
+            if not isinstance(target, dict) or target.get('kind') not in TARGET_KINDS:
+                problems.append(f"'encode_targets' entries need a 'kind' of {', '.join(TARGET_KINDS)}, got {target!r}")
+    # A local workspace path works too; the preflight resolves it with p4 where.
+    if isinstance(job.get('ue_project'), str) and not (job['ue_project'].startswith("//") or ntpath.isabs(job['ue_project'])):
+        problems.append(f"'ue_project' must be a depot path or an absolute workspace path, got {job['ue_project']!r}")
+    if engines is not None and isinstance(job.get('engine_version'), str) and job['engine_version'] not in engines:
+        problems.append(f"unknown engine_version {job['engine_version']!r} (known: {', '.join(sorted(engines))})")
+    if profiles is not None and isinstance(job.get('quality'), str) and job['quality'] not in profiles:
+        problems.append(f"unknown quality {job['quality']!r} (known: {', '.join(sorted(profiles))})")
+    return problems
+
+
+def parse_jobs(entries, engines=None, profiles=None):
+    # Splits the "daily_render" entries into (valid jobs, [JobError, ...]).
+    # Two jobs with the same project_name/render_name would overwrite each
+    # other's frames and cache entry, so the later one is rejected.
+    valid = []
+    invalid = []
+    seen = set()
+    for job in entries:
+        problems = check_job(job, engines, profiles)
+        if not problems:
+            key = (job['project_name'], job['render_name'])
+            if key in seen:
+                problems.append(f"duplicate job {key[0]}/{key[1]}")
+            seen.add(key)
+        if problems:
+            invalid.append(JobError(job, problems))
+        else:
+            valid.append(job)
+    return valid, invalid
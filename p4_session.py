@@ -0,0 +1,142 @@
+import ntpath
+import posixpath
+import threading
+
+from P4 import P4, P4Exception
+
+# One Perforce connection shared by every job of a run.
+#
+# P4Python connections are not thread safe, so every command goes through a
+# lock. `where` results are cached per path and can be resolved for all jobs in
+# a single batched call, and each depot root is synced at most once per run;
+# jobs that point at an already synced root reuse the first result.
+
+
+def _same_path(path, record):
+    if path in (record.get('depotFile'), record.get('clientFile')):
+        return True
+    # p4 answers with the local path in Windows form; the job may use / or another case.
+    return not path.startswith("//") and ntpath.normcase(path) == ntpath.normcase(record.get('path') or "")
+
+
+class P4Session:
+
+    def __init__(self, port, user, password, exception_level=1):
+        self.port = port
+        self.user = user
+        self.password = password
+        self.exception_level = exception_level
+        self.p4 = None
+        self._lock = threading.RLock()
+        self._where = {}
+        self._syncs = {}
+        self._syncs_guard = threading.Lock()
+        self._have_changes = {}
+
+    def connect(self):
+        with self._lock:
+            if self.p4 is not None and self.p4.connected():
+                return self.p4
+            p4 = P4()
+            p4.port = self.port
+            p4.user = self.user
+            p4.password = self.password
+            p4.exception_level = self.exception_level
+            p4.connect()
+            self.p4 = p4
+            return p4
+
+    def disconnect(self):
+        with self._lock:
+            if self.p4 is not None and self.p4.connected():
+                self.p4.disconnect()
+            self.p4 = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.disconnect()
+
+    def new_run(self):
+        # A session kept open between runs (the daemon) syncs every root again
+        # in the next run; `where` results stay cached.
+        with self._syncs_guard:
+            self._syncs = {}
+        with self._lock:
+            self._have_changes = {}
+
+    def sync_pending(self, depot_root):
+        # True when a sync of depot_root would update any file (sync -n).
+        return bool(self.run("sync", "-n", depot_root + "/..."))
+
+    def run(self, *args):
+        with self._lock:
+            p4 = self.connect()
+            return p4.run(*args)
+
+    def where(self, paths):
+        # Resolves every path that is not cached yet with one `p4 where` call
+        # and returns {path: where_record}. Paths may be depot paths or local
+        # workspace paths. Paths that are not mapped in the client are left out.
+        if isinstance(paths, str):
+            paths = [paths]
+        with self._lock:
+            missing = [path for path in dict.fromkeys(paths) if path not in self._where]
+            if missing:
+                for record in self.run("where", missing):
+                    if not isinstance(record, dict) or 'unmap' in record:
+                        continue
+                    for path in missing:
+                        if _same_path(path, record):
+                            self._where[path] = record
+            return {path: self._where[path] for path in paths if path in self._where}
+
+    def where_one(self, path):
+        res = self.where([path])
+        if path not in res:
+            raise P4Exception(f"{path} is not mapped in the client view")
+        return res[path]
+
+    def sync_root(self, depot_root, before=None):
+        # Syncs `depot_root/...` once. Concurrent callers for the same root
+        # wait for the first sync and share its result (or its error).
+        # before(depot_root) runs right before the sync itself, only for the
+        # caller that actually syncs.
+        with self._syncs_guard:
+            entry = self._syncs.get(depot_root)
+            owner = entry is None
+            if owner:
+                entry = self._syncs[depot_root] = {"done": threading.Event(), "result": None, "error": None}
+
+        if owner:
+            try:
+                if before is not None:
+                    before(depot_root)
+                entry["result"] = self.run("sync", depot_root + "/...")
+            except Exception as e:
+                entry["error"] = e
+            finally:
+                entry["done"].set()
+        else:
+            entry["done"].wait()
+
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry["result"]
+
+    def have_change(self, depot_root):
+        # Highest changelist synced under depot_root in this workspace. Cached
+        # per run, so ask only after the root has been synced.
+        with self._lock:
+            if depot_root not in self._have_changes:
+                res = self.run("changes", "-m1", depot_root + "/...#have")
+                self._have_changes[depot_root] = int(res[0]['change']) if res else 0
+            return self._have_changes[depot_root]
+
+    def sync_project(self, ue_project, before=None):
+        # Syncs the folder that holds the uproject and returns its where record.
+        record = self.where_one(ue_project)
+        self.sync_root(posixpath.dirname(record['depotFile']), before)
+        return record
@@ -0,0 +1,217 @@
+import argparse
+import os
+import socket
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Stage timings of the daily run, kept in a local SQLite database.
+#
+# Every stage of every job (P4 connect, where, sync, editor launch to first
+# frame, warm-up, render, encode, each copy, cooldown) is one row keyed by job,
+# run date, host and engine version. The report command summarises a date range:
+#
+#   python perf_db.py report --since 20240101 --until 20240131
+#   python perf_db.py report --threshold 0.25 --top 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_timing (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_date TEXT NOT NULL,
+    job TEXT NOT NULL,
+    host TEXT NOT NULL,
+    engine TEXT,
+    stage TEXT NOT NULL,
+    started REAL,
+    seconds REAL NOT NULL,
+    ok INTEGER NOT NULL DEFAULT 1,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS stage_timing_date ON stage_timing (run_date);
+CREATE INDEX IF NOT EXISTS stage_timing_job_stage ON stage_timing (job, stage, run_date);
+"""
+
+
+class PerfDB:
+
+    def __init__(self, path, run_date=None, host=None):
+        self.path = path
+        self.run_date = run_date or time.strftime("%Y%m%d")
+        self.host = host or socket.gethostname()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def record(self, job, stage, seconds, engine=None, ok=True, detail=None, started=None):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO stage_timing (run_date, job, host, engine, stage, started, seconds, ok, detail)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.run_date, job, self.host, engine, stage, started, float(seconds), int(bool(ok)), detail),
+            )
+            self.conn.commit()
+
+    @contextmanager
+    def timed(self, job, stage, engine=None, detail=None):
+        # Times the block; a block that raises is recorded with ok=0.
+        started = time.time()
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(job, stage, time.perf_counter() - t0, engine=engine, ok=ok, detail=detail, started=started)
+
+    def rows(self, since=None, until=None):
+        query = "SELECT run_date, job, host, engine, stage, seconds, ok FROM stage_timing WHERE 1=1"
+        args = []
+        if since:
+            query += " AND run_date >= ?"
+            args.append(since)
+        if until:
+            query += " AND run_date <= ?"
+            args.append(until)
+        with self._lock:
+            return self.conn.execute(query + " ORDER BY run_date", args).fetchall()
+
+
+# Rows that are not wall-clock time of their own and must not be added to the
+# other stages: parts of editor_session (launch to first frame, warm-up,
+# render, starting a warm editor, attempts killed by the watchdog) and
+# measurements that aren't a stage at all (mean seconds per frame, shader
+# compile time reported by the editor log).
+NESTED_STAGES = ("first_frame", "warmup", "render", "warm_start")
+DERIVED_STAGES = ("frame_time", "shader_compile")
+
+
+def is_nested(stage):
+    return stage in NESTED_STAGES or stage.endswith("_stall")
+
+
+def is_derived(stage):
+    return stage in DERIVED_STAGES
+
+
+def format_seconds(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def stage_trends(rows):
+    # {stage: {run_date: total seconds}}. Derived rows have no total.
+    trends = {}
+    for run_date, job, host, engine, stage, seconds, ok in rows:
+        if is_derived(stage):
+            continue
+        per_date = trends.setdefault(stage, {})
+        per_date[run_date] = per_date.get(run_date, 0.0) + seconds
+    return trends
+
+
+def regressions(rows, threshold):
+    # (job, stage) whose latest run is more than `threshold` (0.2 = 20%) slower
+    # than the median of its earlier runs in the range.
+    history = {}
+    for run_date, job, host, engine, stage, seconds, ok in rows:
+        if not ok:
+            continue
+        per_date = history.setdefault((job, stage), {})
+        per_date[run_date] = per_date.get(run_date, 0.0) + seconds
+    found = []
+    for (job, stage), per_date in history.items():
+        dates = sorted(per_date)
+        if len(dates) < 2:
+            continue
+        baseline = statistics.median(per_date[d] for d in dates[:-1])
+        latest = per_date[dates[-1]]
+        if baseline > 0 and latest > baseline * (1 + threshold):
+            found.append((latest / baseline - 1, job, stage, dates[-1], baseline, latest))
+    found.sort(reverse=True)
+    return found
+
+
+def slowest(rows, top):
+    # A job's night is the sum of its top-level stages only; nested stages
+    # are already in editor_session.
+    jobs = {}
+    stages = {}
+    for run_date, job, host, engine, stage, seconds, ok in rows:
+        if is_derived(stage):
+            continue
+        stages.setdefault((job, stage), []).append(seconds)
+        if is_nested(stage):
+            continue
+        jobs.setdefault(job, {}).setdefault(run_date, 0.0)
+        jobs[job][run_date] += seconds
+    job_avg = sorted(((statistics.mean(d.values()), job) for job, d in jobs.items()), reverse=True)[:top]
+    stage_avg = sorted(((statistics.mean(v), job, stage) for (job, stage), v in stages.items()), reverse=True)[:top]
+    return job_avg, stage_avg
+
+
+def report(db, since=None, until=None, threshold=0.2, top=10, out=sys.stdout):
+    rows = db.rows(since, until)
+    if not rows:
+        print("No timings in range.", file=out)
+        return
+
+    dates = sorted({row[0] for row in rows})
+    print(f"Stage timings {dates[0]} - {dates[-1]} ({len(rows)} rows)", file=out)
+
+    print("\nTrend (total per night, indented stages are part of editor_session):", file=out)
+    trends = stage_trends(rows)
+    shown = dates[-7:]
+    print("  %-16s" % "stage" + "".join("%10s" % d[4:] for d in shown), file=out)
+    for stage in sorted(trends, key=lambda s: -sum(trends[s].values())):
+        print("  %-16s" % (("  " if is_nested(stage) else "") + stage) + "".join("%10s" % (format_seconds(trends[stage][d]) if d in trends[stage] else "-") for d in shown), file=out)
+    totals = {d: sum(trends[s].get(d, 0.0) for s in trends if not is_nested(s)) for d in shown}
+    print("  %-16s" % "(night)" + "".join("%10s" % format_seconds(totals[d]) for d in shown), file=out)
+
+    print(f"\nRegressions (latest > median x {1 + threshold:.2f}):", file=out)
+    found = regressions(rows, threshold)
+    if not found:
+        print("  none", file=out)
+    for ratio, job, stage, run_date, baseline, latest in found[:top]:
+        print(f"  {job:<32} {stage:<16} {run_date}  {format_seconds(baseline)} -> {format_seconds(latest)}  (+{ratio:.0%})", file=out)
+
+    job_avg, stage_avg = slowest(rows, top)
+    print("\nSlowest jobs (average per night):", file=out)
+    for seconds, job in job_avg:
+        print(f"  {job:<32} {format_seconds(seconds)}", file=out)
+    print("\nSlowest stages (average per run):", file=out)
+    for seconds, job, stage in stage_avg:
+        print(f"  {job:<32} {stage:<16} {format_seconds(seconds)}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily render stage timings")
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_perf.db"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    rep = sub.add_parser("report", help="trends, regressions and slowest jobs/stages")
+    rep.add_argument("--since", help="first run date, YYYYMMDD")
+    rep.add_argument("--until", help="last run date, YYYYMMDD")
+    rep.add_argument("--threshold", type=float, default=0.2, help="regression threshold, 0.2 = 20%% slower")
+    rep.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    db = PerfDB(args.db)
+    try:
+        if args.command == "report":
+            report(db, args.since, args.until, args.threshold, args.top)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
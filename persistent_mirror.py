@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+# Incremental mirror of a _PERSISTENT folder into today's daily folder.
+#
+# Replaces the nightly `xcopy _PERSISTENT\*.* <today> /y`. A manifest keeps
+# size, mtime and a content hash per source file, so unchanged files are not
+# hashed again. A file that is already in today's folder with the same size
+# and mtime is skipped; a file that is unchanged since the previous day's
+# folder is hard linked from there when the filesystem allows it, and copied
+# otherwise. Like the xcopy it replaces, only the top level files are mirrored.
+
+DATE_DIR = re.compile(r"^\d{8}$")
+
+
+def file_hash(path, chunk_size=4 * 1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def previous_day_dir(root, today):
+    # Newest YYYYMMDD folder under root that is older than today.
+    try:
+        days = [name for name in os.listdir(root) if DATE_DIR.match(name) and name < today]
+    except OSError:
+        return None
+    days = [name for name in days if os.path.isdir(os.path.join(root, name))]
+    return os.path.join(root, max(days)) if days else None
+
+
+def same_stat(st, entry):
+    return st.st_size == entry['size'] and int(st.st_mtime) == entry['mtime']
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def mirror(source_dir, dest_dir, manifest_path, link_from=None, use_links=True):
+    # Returns counts of what happened to each file.
+    stats = {'skipped': 0, 'linked': 0, 'copied': 0, 'failed': 0}
+    old = load_manifest(manifest_path)
+    manifest = {}
+    os.makedirs(dest_dir, exist_ok=True)
+
+    for entry in os.scandir(source_dir):
+        if not entry.is_file():
+            continue
+        name = entry.name
+        st = entry.stat()
+        previous = old.get(name)
+        if previous and same_stat(st, previous):
+            digest = previous['hash']
+        else:
+            digest = file_hash(entry.path)
+        manifest[name] = {'size': st.st_size, 'mtime': int(st.st_mtime), 'hash': digest}
+
+        target = os.path.join(dest_dir, name)
+        try:
+            if os.path.isfile(target) and same_stat(os.stat(target), manifest[name]):
+                stats['skipped'] += 1
+                continue
+            if os.path.lexists(target):
+                os.remove(target)
+            if use_links and link_from and previous and previous['hash'] == digest:
+                linked = os.path.join(link_from, name)
+                if os.path.isfile(linked) and same_stat(os.stat(linked), manifest[name]):
+                    try:
+                        os.link(linked, target)
+                        stats['linked'] += 1
+                        continue
+                    except OSError:
+                        pass
+            shutil.copy2(entry.path, target)
+            stats['copied'] += 1
+        except OSError as e:
+            stats['failed'] += 1
+            print(f"Persistent mirror failed for {name}: {e}")
+
+    save_manifest(manifest_path, manifest)
+    return stats
+
+
+class MirrorJob(threading.Thread):
+    # Runs one mirror in the background; join() and read .stats/.seconds/.error.
+
+    def __init__(self, name, source_dir, root, today, manifest_path, use_links=True):
+        super().__init__(name=f"mirror-{name}", daemon=True)
+        self.label = name
+        self.source_dir = source_dir
+        self.dest_dir = os.path.join(root, today)
+        self.link_from = previous_day_dir(root, today) if use_links else None
+        self.manifest_path = manifest_path
+        self.use_links = use_links
+        self.stats = None
+        self.error = None
+        self.seconds = 0.0
+
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            self.stats = mirror(self.source_dir, self.dest_dir, self.manifest_path, self.link_from, self.use_links)
+            print(f"Persistent mirror {self.label}: {self.stats}")
+        except Exception as e:
+            self.error = e
+            print(f"Persistent mirror {self.label} failed: {e!r}")
+        finally:
+            self.seconds = time.perf_counter() - t0
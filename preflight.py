@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from render_cache import job_key
+
+# Checks done for every job before the first sync: is the engine installed,
+# does the uproject resolve in the P4 client, are the daily and OneDrive
+# folders writable, and is there room on the scratch drive for the frames.
+#
+# The frame size estimate comes from the last render of the same job (bytes
+# per pixel per frame, kept in a small JSON file) times resolution times frame
+# count, or a conservative default per output format for a job we have never
+# rendered in that format:
+#   {"<job key>": {"bytes_per_pixel": 1.9, "frames": 3000, "format": "png",
+#                  "date": "20240101"}}
+
+DEFAULT_BYTES_PER_PIXEL = {'png': 3.0, 'bmp': 4.0, 'exr': 6.0}
+VIDEO_BYTES_PER_PIXEL = 0.5
+GB = 1024 ** 3
+
+
+def check_engine(job, engines):
+    path = engines.get(job['engine_version'])
+    if not path or not os.path.isfile(path):
+        return f"engine {job['engine_version']} not found at {path}"
+    return None
+
+
+def check_writable(path):
+    try:
+        os.makedirs(path, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path, prefix=".preflight_"):
+            pass
+    except OSError as e:
+        return f"{path} is not writable: {e}"
+    return None
+
+
+def sequence_bytes(render_path, render_name):
+    # (total bytes, frame count) of the frames of one render.
+    total = 0
+    count = 0
+    prefix = render_name + "."
+    try:
+        entries = list(os.scandir(render_path))
+    except OSError:
+        return 0, 0
+    for entry in entries:
+        if entry.name.startswith(prefix) and entry.is_file():
+            total += entry.stat().st_size
+            count += 1
+    return total, count
+
+
+class FrameSizeHistory:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"frame size history ignored ({path}): {e}")
+                self.entries = {}
+
+    def record(self, job, total_bytes, frames, date, output_format="png"):
+        if not frames:
+            return
+        pixels = job['res_x'] * job['res_y']
+        with self._lock:
+            self.entries[job_key(job)] = {
+                'bytes_per_pixel': total_bytes / frames / pixels,
+                'frames': frames,
+                'format': output_format,
+                'date': date,
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    def estimate(self, job, output_format="png"):
+        # Expected size in bytes of the job's frames, or None if we can't tell
+        # how many frames it has.
+        with self._lock:
+            entry = self.entries.get(job_key(job))
+        frames = job.get('frame_count') or (entry or {}).get('frames')
+        if not frames:
+            return None
+        if entry and entry.get('format', "png") == output_format:
+            bytes_per_pixel = entry['bytes_per_pixel']
+        else:
+            bytes_per_pixel = DEFAULT_BYTES_PER_PIXEL.get(output_format, VIDEO_BYTES_PER_PIXEL)
+        return int(bytes_per_pixel * job['res_x'] * job['res_y'] * frames)
+
+
+def check_disk_space(jobs, render_root_of, estimate, reserve_bytes, reclaimable=None):
+    # Adds up the frames of all jobs per scratch drive, in job order, and
+    # returns {id(job): problem} for the jobs that no longer fit.
+    # reclaimable(root) is space the scratch GC can free before the render.
+    problems = {}
+    budget = {}
+    for job in jobs:
+        size = estimate(job)
+        if size is None:
+            continue
+        root = render_root_of(job)
+        if root not in budget:
+            try:
+                os.makedirs(root, exist_ok=True)
+                budget[root] = shutil.disk_usage(root).free - reserve_bytes
+                if reclaimable is not None:
+                    budget[root] += reclaimable(root)
+            except OSError as e:
+                budget[root] = None
+                print(f"Preflight: can't read free space of {root}: {e}")
+        if budget[root] is None:
+            continue
+        if size > budget[root]:
+            problems[id(job)] = (f"needs ~{size / GB:.1f} GB on {root}, "
+                                 f"only {max(0, budget[root]) / GB:.1f} GB left above the reserve"
+                                 + (" with what scratch GC can free" if reclaimable is not None else ""))
+            continue
+        budget[root] -= size
+    return problems
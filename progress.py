@@ -0,0 +1,175 @@
+import json
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+# Live render progress from CinemaMPRExecutor.
+#
+# The executor connects to this listener with the host executor's
+# connect_socket/send_socket_message, which prefixes every message with its
+# size as a uint32. Each message is one JSON record:
+#   {"type": "progress", "job": "<output name>", "frame": 120, "total": 3000,
+#    "completion": 0.04, "frame_ms": 410.5, "memory_mb": 21034.2,
+#    "state": "RENDERING", "time": ...}
+# plus "job_finished" / "session_finished" records. The listener keeps per job
+# frames/sec and an ETA and prints a short status line now and then.
+
+HEADER = struct.Struct("<I")
+
+
+def encode_message(record):
+    payload = json.dumps(record).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def read_messages(conn):
+    # Yields the decoded records from a socket-like object (anything with recv).
+    buffer = b""
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            return
+        buffer += chunk
+        while len(buffer) >= HEADER.size:
+            (size,) = HEADER.unpack_from(buffer)
+            if len(buffer) < HEADER.size + size:
+                break
+            payload = buffer[HEADER.size:HEADER.size + size]
+            buffer = buffer[HEADER.size + size:]
+            try:
+                yield json.loads(payload.decode("utf-8"))
+            except ValueError:
+                print(f"progress: ignoring malformed message {payload[:80]!r}")
+
+
+class JobProgress:
+
+    def __init__(self, job, window=30):
+        self.job = job
+        self.frame = 0
+        self.total = 0
+        self.completion = 0.0
+        self.frame_ms = None
+        self.memory_mb = None
+        self.first_seen = None
+        self.finished = None
+        self.success = None
+        # First time each shot state (WARMING_UP, RENDERING, ...) was reported.
+        self.state_times = {}
+        self._samples = deque(maxlen=window)
+
+    def update(self, record, now):
+        if self.first_seen is None:
+            self.first_seen = now
+        self.frame = record.get('frame', self.frame)
+        self.total = record.get('total', self.total)
+        self.completion = record.get('completion', self.completion)
+        self.frame_ms = record.get('frame_ms', self.frame_ms)
+        self.memory_mb = record.get('memory_mb', self.memory_mb)
+        state = record.get('state')
+        if state and state not in self.state_times:
+            self.state_times[state] = now
+        self._samples.append((now, self.frame))
+
+    def fps(self):
+        if len(self._samples) < 2:
+            return 0.0
+        (t0, f0), (t1, f1) = self._samples[0], self._samples[-1]
+        if t1 <= t0 or f1 <= f0:
+            return 0.0
+        return (f1 - f0) / (t1 - t0)
+
+    def eta(self):
+        # Seconds left, or None when we can't tell yet.
+        fps = self.fps()
+        if not fps or not self.total:
+            return None
+        return max(0, self.total - self.frame) / fps
+
+    def summary(self):
+        eta = self.eta()
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta is not None else "--:--:--"
+        return f"{self.job}: {self.frame}/{self.total} frames, {self.fps():.2f} fps, ETA {eta_text}"
+
+
+class ProgressListener:
+
+    def __init__(self, host="127.0.0.1", port=0, report_interval=60, clock=time.monotonic):
+        self.host = host
+        self.port = port
+        self.report_interval = report_interval
+        self.clock = clock
+        self.jobs = {}
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._last_report = {}
+
+    def start(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name="progress-listener", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def _accept_loop(self):
+        while self._server is not None:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.handle_connection, args=(conn,), daemon=True).start()
+
+    def handle_connection(self, conn):
+        try:
+            for record in read_messages(conn):
+                self.feed(record)
+        except OSError:
+            pass
+        finally:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def reset(self):
+        # Forgets the jobs of the previous run (a listener kept between runs).
+        with self._lock:
+            self.jobs = {}
+            self._last_report = {}
+
+    def feed(self, record):
+        now = self.clock()
+        if record.get('type') == 'session_finished':
+            for listener in list(self.listeners):
+                listener(record, None)
+            return
+        name = record.get('job', '?')
+        with self._lock:
+            progress = self.jobs.setdefault(name, JobProgress(name))
+            kind = record.get('type', 'progress')
+            if kind == 'progress':
+                progress.update(record, now)
+            elif kind == 'job_finished':
+                progress.finished = now
+                progress.success = record.get('success')
+            report = kind != 'progress' or now - self._last_report.get(name, float("-inf")) >= self.report_interval
+            if report:
+                self._last_report[name] = now
+        for listener in list(self.listeners):
+            listener(record, progress)
+        if report:
+            print(f"Progress {progress.summary()}")
+
+    def get(self, job):
+        with self._lock:
+            return self.jobs.get(job)
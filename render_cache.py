@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+
+# Persistent render cache for the daily run.
+#
+# For every job we remember what the last successful daily was rendered from:
+# the synced head changelist of the uproject root, the engine version and a
+# hash of the render parameters, plus where the resulting MP4 ended up. If none
+# of those changed, the previous MP4 can be reused instead of rendering again.
+#
+# The cache is a small JSON file next to render_jobs.json:
+#   {"<job key>": {"change": 12345, "engine_version": "UE_5.5",
+#                  "params": "<sha1>", "date": "20240101",
+#                  "movies": ["Z:\\9_Daily\\20240101\\foo_20240101.mp4", ...]}}
+
+RENDER_PARAMS = ('ue_umap', 'ue_sequence', 'res_x', 'res_y', 'custom_start', 'quality', 'quality_settings',
+                 'output_format', 'encode_targets')
+
+
+def job_key(job):
+    return f"{job['project_name']}/{job['render_name']}"
+
+
+def params_hash(job):
+    params = {name: job.get(name) for name in RENDER_PARAMS}
+    if params['custom_start'] is None:
+        params['custom_start'] = 1
+    # Final quality hashes like it did before jobs had a quality profile.
+    if params['quality'] in (None, "final"):
+        del params['quality']
+    # The settings of the resolved profile, when the run could read the
+    # profile file, so editing a profile invalidates what it rendered.
+    if params['quality_settings'] is None:
+        del params['quality_settings']
+    # Likewise PNG frames and no extra encode targets.
+    if params['output_format'] in (None, "png"):
+        del params['output_format']
+    if not params['encode_targets']:
+        del params['encode_targets']
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.isfile(path):
+            try:
+                self.entries = self._load()
+            except (OSError, ValueError) as e:
+                print(f"render cache ignored ({path}): {e}")
+                self.entries = {}
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def lookup(self, job, change):
+        # Returns the path of a reusable MP4 or None.
+        with self._lock:
+            entry = self.entries.get(job_key(job))
+        if not entry:
+            return None
+        if entry.get('change') != change:
+            return None
+        if entry.get('engine_version') != job['engine_version']:
+            return None
+        if entry.get('params') != params_hash(job):
+            return None
+        for movie in entry.get('movies', []):
+            if os.path.isfile(movie):
+                return movie
+        return None
+
+    def store(self, job, change, date, movies):
+        movies = [movie for movie in movies if os.path.isfile(movie)]
+        if not movies:
+            return
+        with self._lock:
+            # Other hosts of the work queue write the same file; take their
+            # entries over before ours replaces it.
+            try:
+                self.entries.update({key: entry for key, entry in self._load().items() if key != job_key(job)})
+            except (OSError, ValueError):
+                pass
+            self.entries[job_key(job)] = {
+                'change': change,
+                'engine_version': job['engine_version'],
+                'params': params_hash(job),
+                'date': date,
+                'movies': movies,
+            }
+            self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
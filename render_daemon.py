@@ -0,0 +1,218 @@
+import copy
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Long-running daily render service.
+#
+# Instead of a fresh interpreter per night, one process keeps what is slow to
+# set up (the P4 connection and its where cache, the progress listener, warm
+# editors, parsed jobs and histories) and loops:
+#
+#   - the job file is re-read when its mtime/size change and its content hash
+#     differs; a new version is parsed right away so a broken edit is reported
+#     during the day, not at night
+#   - the nightly run starts at nightly_at (HH:MM), once per day, and is
+#     caught up when the service was down at that time but starts again
+#     within nightly_window hours
+#   - re-render requests dropped into request_dir are picked up between runs
+#
+# A request is a small JSON file, written by `DailyRender_v2.py rerender`:
+#   {"jobs": ["render_name", ...], "force": false, "host": 2, "requested_by": "...", "time": ...}
+# "host" null means any service may take it. Like a shard ticket it is
+# claimed by renaming it to <name>.<host>; the result is written next to it as
+# <name>.done ({"failures": [...], "seconds": ...}).
+#
+# The daemon only knows callbacks, so it doesn't depend on DailyRender_v2:
+#   load_jobs(doc)            called with every new version of the job file
+#   run_nightly(doc)          -> failures, [(stage, item, error), ...]
+#   run_request(doc, request) -> failures
+
+
+class WatchedFile:
+    # changed() is True when the file's content differs from the last call.
+    # The content is only hashed when mtime or size moved, so polling a file
+    # that nobody touches costs one stat.
+
+    def __init__(self, path):
+        self.path = path
+        self.stat = None
+        self.digest = None
+
+    def changed(self):
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat = None
+        if stat == self.stat:
+            return False
+        self.stat = stat
+        digest = None
+        if stat is not None:
+            try:
+                with open(self.path, "rb") as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+            except OSError:
+                digest = None
+        if digest == self.digest:
+            return False
+        self.digest = digest
+        return True
+
+
+def parse_time_of_day(text):
+    hour, minute = text.split(":")
+    return datetime.time(int(hour), int(minute))
+
+
+def write_request(request_dir, names, force=False, host=None, requested_by=None):
+    os.makedirs(request_dir, exist_ok=True)
+    request = {"jobs": list(names), "force": bool(force), "host": host,
+               "requested_by": requested_by, "time": time.time()}
+    path = os.path.join(request_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{names[0]}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(request, f)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class RenderDaemon:
+
+    def __init__(self, job_file, load_jobs, run_nightly, run_request, host, state_file, request_dir=None,
+                 nightly_at="01:00", nightly_window=6, poll_interval=30, clock=datetime.datetime.now):
+        self.job_file = WatchedFile(job_file)
+        self.load_jobs = load_jobs
+        self.run_nightly = run_nightly
+        self.run_request = run_request
+        self.host = host
+        self.state_file = state_file
+        self.request_dir = request_dir
+        self.nightly_at = parse_time_of_day(nightly_at)
+        self.nightly_window = nightly_window
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.jobs = None
+        self.state = self._load_state()
+        self._stop_event = threading.Event()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        with open(self.state_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(self.state_file + ".tmp", self.state_file)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def check_job_file(self):
+        if not self.job_file.changed():
+            return False
+        try:
+            with open(self.job_file.path, "r", encoding="utf-8") as f:
+                jobs = json.load(f)
+        except (OSError, ValueError) as e:
+            # Keep the last good version; it is read again on the next change.
+            print(f"Daemon: could not read {self.job_file.path}, keeping the previous jobs: {e}")
+            return False
+        self.jobs = jobs
+        print(f"Daemon: loaded {self.job_file.path} ({self.job_file.digest[:10]})")
+        self.load_jobs(jobs)
+        return True
+
+    def nightly_due(self, now):
+        scheduled = datetime.datetime.combine(now.date(), self.nightly_at)
+        if now < scheduled or now - scheduled > datetime.timedelta(hours=self.nightly_window):
+            return False
+        return self.state.get('last_nightly') != now.strftime("%Y%m%d")
+
+    def nightly(self, now):
+        print(f"Daemon: nightly run {now:%Y-%m-%d %H:%M}")
+        # Recorded before the run so a crash in it doesn't start it over and over.
+        self.state['last_nightly'] = now.strftime("%Y%m%d")
+        self._save_state()
+        started = time.monotonic()
+        failures = self.run_nightly(copy.deepcopy(self.jobs))
+        self.state['last_nightly_seconds'] = round(time.monotonic() - started, 1)
+        self.state['last_nightly_failures'] = len(failures)
+        self._save_state()
+        return failures
+
+    def claim_request(self):
+        if not self.request_dir:
+            return None, None
+        try:
+            names = sorted(os.listdir(self.request_dir))
+        except OSError:
+            return None, None
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.request_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    host = json.load(f).get('host')
+            except (OSError, ValueError):
+                continue
+            if host is not None and host != self.host:
+                continue
+            claimed = f"{path}.{self.host}"
+            try:
+                os.rename(path, claimed)
+                with open(claimed, "r", encoding="utf-8") as f:
+                    return claimed, json.load(f)
+            except (OSError, ValueError):
+                continue
+        return None, None
+
+    def serve_request(self, path, request):
+        print(f"Daemon: re-render request {os.path.basename(path)}: {', '.join(request.get('jobs', []))}"
+              + (" (forced)" if request.get('force') else ""))
+        started = time.monotonic()
+        try:
+            failures = [f"{stage}: {error}" for stage, item, error in self.run_request(copy.deepcopy(self.jobs), request)]
+        except Exception as e:
+            failures = [f"request: {e!r}"]
+        result = dict(request, host=self.host, failures=failures, seconds=round(time.monotonic() - started, 1))
+        with open(path + ".done.tmp", "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+        os.replace(path + ".done.tmp", os.path.splitext(path)[0] + ".done")
+        os.remove(path)
+        return failures
+
+    def run_once(self):
+        # One pass of the loop; True when it did any work.
+        self.check_job_file()
+        if self.jobs is None:
+            return False
+        now = self.clock()
+        if self.nightly_due(now):
+            self.nightly(now)
+            return True
+        path, request = self.claim_request()
+        if request is not None:
+            self.serve_request(path, request)
+            return True
+        return False
+
+    def run_forever(self):
+        print(f"Daemon: host {self.host}, nightly at {self.nightly_at:%H:%M}, watching {self.job_file.path}"
+              + (f" and {self.request_dir}" if self.request_dir else ""))
+        while not self._stop_event.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                # A failed run must not take the service down; the next one may work.
+                print(f"Daemon: {e!r}")
+            self._stop_event.wait(self.poll_interval)
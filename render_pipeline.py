@@ -0,0 +1,99 @@
+import queue
+import threading
+import traceback
+
+# Small staged pipeline used by DailyRender_v2.
+#
+# Each stage has its own pool of worker threads (the stage limit) and a queue in
+# front of it. A stage function receives the item handed over by the previous
+# stage and returns the item for the next stage, or None to drop it. An
+# exception in a stage only drops that item; the rest of the queue keeps going.
+# A stage added with split=True returns a list, and every element of it is
+# handed to the next stage on its own (e.g. render a group, encode per job).
+# on_failure(stage name, item, exception) is called for every failed item.
+#
+#   pipeline = StagedPipeline()
+#   pipeline.add_stage("sync", sync_job, workers=1, backlog=1)
+#   pipeline.add_stage("render", render_job, workers=1)
+#   pipeline.run(jobs)
+
+_DONE = object()
+
+
+class StagedPipeline:
+
+    def __init__(self, label=None, on_failure=None):
+        self.stages = []
+        self.label = label or str
+        self.on_failure = on_failure
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, func, workers=1, backlog=0, split=False):
+        # backlog limits how many finished items may wait in front of this
+        # stage. 0 means unbounded. A bounded backlog keeps an earlier stage
+        # from running too far ahead (e.g. syncing every project up front).
+        self.stages.append({
+            "name": name,
+            "func": func,
+            "workers": max(1, int(workers)),
+            "queue": queue.Queue(maxsize=max(0, int(backlog))),
+            "remaining": max(1, int(workers)),
+            "split": split,
+        })
+        return self
+
+    def run(self, items):
+        if not self.stages:
+            return []
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage["workers"]):
+                t = threading.Thread(target=self._worker, args=(index,), name=f"{stage['name']}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        first = self.stages[0]["queue"]
+        for item in items:
+            first.put(item)
+        for _ in range(self.stages[0]["workers"]):
+            first.put(_DONE)
+
+        for t in threads:
+            t.join()
+        return self.failures
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            item = stage["queue"].get()
+            if item is _DONE:
+                break
+            try:
+                result = stage["func"](item)
+            except Exception as e:
+                result = None
+                print(f"[{stage['name']}] {self.label(item)} failed: {e!r}")
+                traceback.print_exc()
+                with self._lock:
+                    self.failures.append((stage["name"], item, e))
+                if self.on_failure is not None:
+                    try:
+                        self.on_failure(stage["name"], item, e)
+                    except Exception as hook_error:
+                        print(f"[{stage['name']}] on_failure for {self.label(item)} failed: {hook_error!r}")
+            if result is None or next_stage is None:
+                continue
+            for out in (result if stage["split"] else [result]):
+                next_stage["queue"].put(out)
+
+        # The last worker of a stage to finish closes the next stage.
+        with self._lock:
+            stage["remaining"] -= 1
+            last = stage["remaining"] == 0
+        if last and next_stage is not None:
+            for _ in range(next_stage["workers"]):
+                next_stage["queue"].put(_DONE)
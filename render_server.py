@@ -0,0 +1,317 @@
+import json
+import queue
+import socket
+import subprocess
+import threading
+import time
+
+from progress import encode_message, read_messages
+from stall_watchdog import Stalled, kill_tree, sample_probes
+
+# Warm render workers: editors that stay up between renders.
+#
+# The editor is started with -RenderServerPort=<port> and CinemaMPRExecutor
+# connects back to that port instead of rendering a command line or manifest.
+# Both directions carry the host executor's size-prefixed JSON messages
+# (progress.encode_message / read_messages).
+#
+#   to the editor    {"type": "render", "batch": "1", "jobs": [<manifest job>, ...],
+#                     "quality_profile_file": "..."}
+#                    {"type": "ping"}, {"type": "quit"}
+#   from the editor  {"type": "worker_ready"} once, then for every batch the
+#                    usual progress / job_finished records and one
+#                    {"type": "batch_finished", "batch": "1", "failed": 0, "jobs": 2}
+#                    ({"type": "batch_rejected"} while another batch runs).
+#
+# Manifest jobs are the same dicts as in a -JobManifest file. The map, loaded
+# shaders and streamed textures stay in the editor, so the next batch for the
+# same project skips the editor start-up.
+#
+# WarmWorkerPool keeps at most one worker per (uproject, engine), restarts it
+# when the project was synced to another changelist and stops workers that
+# have been idle for idle_timeout seconds.
+#
+# Run as a script this is a stand-in server for trying the protocol against
+# an editor (or bench/fake_editor.py) by hand:
+#
+#   python render_server.py --port 6790 jobs.json [more_jobs.json ...]
+#   UnrealEditor.exe Project.uproject /Game/Maps/Foo_P -game ... -RenderServerPort=6790
+#
+# Every manifest is sent as one batch; the records the editor sends back are
+# printed and the editor is told to quit after the last batch.
+
+# Records that answer a command; everything else is render progress.
+REPLY_TYPES = ("worker_ready", "batch_finished", "batch_rejected", "pong", "closed")
+
+# serve(): how often a manifest may be turned down before it counts as failed.
+MAX_REJECTED = 3
+
+
+class WorkerLost(RuntimeError):
+    pass
+
+
+class WarmWorker:
+
+    def __init__(self, key, change=None, log_file=None, on_record=None, host="127.0.0.1"):
+        self.key = key
+        self.change = change
+        self.log_file = log_file
+        self.on_record = on_record
+        self.proc = None
+        self.started = None
+        self.last_used = time.monotonic()
+        self.batches = 0
+        self.busy = False
+        self._conn = None
+        self._replies = queue.Queue()
+        self._send_lock = threading.Lock()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind((host, 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+
+    def __repr__(self):
+        return f"WarmWorker({self.key}, change {self.change}, {self.batches} batches)"
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self, launch, probes=(), stall_timeout=0, poll_interval=10):
+        # launch(port) -> Popen. Returns once the executor reports worker_ready;
+        # Stalled when the probes (the editor log, say) stop changing first.
+        self.started = time.monotonic()
+        self.proc = launch(self.port)
+        threading.Thread(target=self._serve, name=f"warm-{self.port}", daemon=True).start()
+        self.wait_for(("worker_ready",), probes, stall_timeout, poll_interval, label=f"start {self.key}")
+        self.last_used = time.monotonic()
+
+    def _serve(self):
+        try:
+            conn, _ = self._server.accept()
+        except OSError:
+            self._replies.put({"type": "closed"})
+            return
+        finally:
+            self._server.close()
+        self._conn = conn
+        try:
+            for record in read_messages(conn):
+                if record.get('type') in REPLY_TYPES:
+                    self._replies.put(record)
+                elif self.on_record is not None:
+                    self.on_record(record)
+        except OSError:
+            pass
+        self._replies.put({"type": "closed"})
+
+    def send(self, command):
+        if self._conn is None:
+            raise WorkerLost(f"{self.key}: not connected")
+        try:
+            with self._send_lock:
+                self._conn.sendall(encode_message(command))
+        except OSError as e:
+            raise WorkerLost(f"{self.key}: {e}")
+
+    def wait_for(self, types, probes=(), stall_timeout=0, poll_interval=10, label="warm worker"):
+        # Waits for a reply of one of `types`. While waiting the editor has to
+        # stay up and, with a stall_timeout, keep changing one of the probes.
+        started = last_change = time.monotonic()
+        last = sample_probes(probes)
+        while True:
+            try:
+                record = self._replies.get(timeout=poll_interval)
+            except queue.Empty:
+                record = None
+            if record is not None:
+                if record['type'] in types:
+                    return record
+                if record['type'] == "closed":
+                    self.proc.wait()
+                    raise WorkerLost(f"{self.key}: editor exited with {self.proc.returncode}")
+                continue
+            if self.proc.poll() is not None:
+                raise WorkerLost(f"{self.key}: editor exited with {self.proc.returncode}")
+            now = time.monotonic()
+            current = sample_probes(probes)
+            if current != last:
+                last, last_change = current, now
+            elif stall_timeout and now - last_change >= stall_timeout:
+                print(f"Watchdog: {label} made no progress for {now - last_change:.0f}s, killed the warm editor")
+                self.kill()
+                raise Stalled(label, 1, now - started)
+
+    def render(self, jobs, probes=(), stall_timeout=0, poll_interval=10, quality_profile_file=None):
+        # One batch of manifest jobs; returns the batch_finished record.
+        self.batches += 1
+        batch = str(self.batches)
+        self.send({"type": "render", "batch": batch, "jobs": jobs, "quality_profile_file": quality_profile_file})
+        try:
+            record = self.wait_for(("batch_finished", "batch_rejected"), probes, stall_timeout, poll_interval,
+                                   label=f"render {self.key} batch {batch}")
+        finally:
+            self.last_used = time.monotonic()
+        if record['type'] == "batch_rejected":
+            raise WorkerLost(f"{self.key}: batch {batch} rejected ({record.get('reason')})")
+        return record
+
+    def stop(self, timeout=30):
+        # Asks the editor to quit and kills it if it doesn't.
+        if self.alive():
+            try:
+                self.send({"type": "quit"})
+                self.proc.wait(timeout)
+            except (WorkerLost, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+    def kill(self):
+        if self.proc is not None:
+            kill_tree(self.proc)
+            self.proc.wait()
+        for sock in (self._conn, self._server):
+            if sock is not None:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+
+
+class WarmWorkerPool:
+
+    def __init__(self, idle_timeout=1800, max_workers=1, poll_interval=30):
+        self.idle_timeout = idle_timeout
+        self.max_workers = max(1, max_workers)
+        self.poll_interval = poll_interval
+        self.workers = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._reaper = None
+
+    def start(self):
+        self._reaper = threading.Thread(target=self._reap_loop, name="warm-reaper", daemon=True)
+        self._reaper.start()
+        return self
+
+    def checkout(self, key, change, create):
+        # The idle worker for `key`, marked busy; create() makes an unstarted
+        # one when there is none yet. None when the worker is busy or the pool
+        # is full of busy workers, so the caller renders in a new editor.
+        retired = []
+        with self._lock:
+            worker = self.workers.get(key)
+            if worker is not None and worker.busy:
+                return None
+            if worker is not None and (worker.change != change or (worker.proc is not None and not worker.alive())):
+                retired.append(self.workers.pop(key))
+                worker = None
+            if worker is None:
+                idle = sorted((w for w in self.workers.values() if not w.busy), key=lambda w: w.last_used)
+                while len(self.workers) >= self.max_workers and idle:
+                    retired.append(self.workers.pop(idle.pop(0).key))
+                if len(self.workers) >= self.max_workers:
+                    worker = None
+                else:
+                    worker = self.workers[key] = create()
+            if worker is not None:
+                worker.busy = True
+        for old in retired:
+            print(f"Warm worker: stopping {old}")
+            old.stop()
+        return worker
+
+    def checkin(self, worker):
+        with self._lock:
+            worker.busy = False
+            worker.last_used = time.monotonic()
+
+    def discard(self, worker):
+        with self._lock:
+            if self.workers.get(worker.key) is worker:
+                del self.workers[worker.key]
+        worker.kill()
+
+    def keys(self):
+        with self._lock:
+            return list(self.workers)
+
+    def stop_where(self, match):
+        # Stops the idle workers whose key matches (the project is about to be synced).
+        with self._lock:
+            retired = [self.workers.pop(key) for key, worker in list(self.workers.items())
+                       if match(key) and not worker.busy]
+        for worker in retired:
+            print(f"Warm worker: stopping {worker}")
+            worker.stop()
+
+    def stop_all(self):
+        self._stop_event.set()
+        self.stop_where(lambda key: True)
+
+    def _reap_loop(self):
+        while not self._stop_event.wait(min(self.poll_interval, self.idle_timeout)):
+            now = time.monotonic()
+            with self._lock:
+                retired = [self.workers.pop(key) for key, worker in list(self.workers.items())
+                           if not worker.busy and now - worker.last_used >= self.idle_timeout]
+            for worker in retired:
+                print(f"Warm worker: idle for {now - worker.last_used:.0f}s, stopping {worker}")
+                worker.stop()
+
+
+def serve(port, manifests, launch=None, host="127.0.0.1"):
+    # Stand-in server: sends every manifest as a batch and prints what comes back.
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(1)
+    print(f"Render server on {host}:{server.getsockname()[1]}, waiting for the editor")
+    proc = subprocess.Popen(launch.replace("{port}", str(server.getsockname()[1])), shell=True) if launch else None
+    conn, _ = server.accept()
+    server.close()
+    failed = 0
+    pending = list(manifests)
+    rejected = {}
+    with conn:
+        for record in read_messages(conn):
+            print(json.dumps(record))
+            kind = record.get('type')
+            if kind == "batch_finished":
+                failed += record.get('failed', 0)
+            elif kind == "batch_rejected":
+                # The editor was still busy with a batch: send this one again
+                # once that finishes, unless it keeps being turned down.
+                manifest = record.get('batch')
+                rejected[manifest] = rejected.get(manifest, 0) + 1
+                if rejected[manifest] <= MAX_REJECTED:
+                    pending.insert(0, manifest)
+                else:
+                    with open(manifest, "r", encoding="utf-8") as f:
+                        failed += len(json.load(f)['jobs'])
+                    print(f"Render server: {manifest} rejected {rejected[manifest]} times, counted as failed")
+                continue
+            if kind in ("worker_ready", "batch_finished"):
+                if not pending:
+                    conn.sendall(encode_message({"type": "quit"}))
+                    continue
+                manifest = pending.pop(0)
+                with open(manifest, "r", encoding="utf-8") as f:
+                    batch = json.load(f)
+                command = {"type": "render", "batch": manifest, "jobs": batch['jobs'],
+                           "quality_profile_file": batch.get('quality_profile_file')}
+                conn.sendall(encode_message(command))
+    if proc is not None:
+        proc.wait()
+    return failed
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Stand-in render server for CinemaMPRExecutor's -RenderServerPort mode")
+    parser.add_argument("manifests", nargs="+", help="job manifest files ({\"jobs\": [...]}), one batch each")
+    parser.add_argument("--port", type=int, default=6790)
+    parser.add_argument("--launch", help="editor command to start, {port} is replaced with the port")
+    args = parser.parse_args()
+    sys.exit(1 if serve(args.port, args.manifests, args.launch) else 0)
@@ -0,0 +1,192 @@
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+
+from frames import resume_stamp_path
+from preflight import sequence_bytes
+
+# Retention of the render scratch drive.
+#
+# Every frame sequence (the `{render_name}.*` files in a render path) and every
+# MP4 in the movie path is entered in a ledger next to the scratch data,
+# together with the daily_path copy that fanout_copy verified. Before each
+# render make_room() evicts entries until the scratch fits the budget and the
+# drive has room for the upcoming frames: verified frame sequences first,
+# least recently used first, then MP4s older than movie_keep_days. Nothing is
+# evicted unless its daily copy is still there with the verified size, and
+# files that are not in the ledger are never touched.
+#
+#   {"frames|E:/DAILYRENDER/P0/20240101|foo_20240101": {"kind": "frames",
+#     "path": ..., "name": ..., "bytes": ..., "date": "20240101",
+#     "used": <time>, "copied_to": "Z:\\...\\foo_20240101.mp4", "copied_bytes": ...}}
+
+
+def days_old(date, today):
+    try:
+        then = datetime.datetime.strptime(date, "%Y%m%d").date()
+        now = datetime.datetime.strptime(today, "%Y%m%d").date()
+    except (TypeError, ValueError):
+        return 0
+    return (now - then).days
+
+
+def same_device(path, root):
+    try:
+        return os.stat(path).st_dev == os.stat(root).st_dev
+    except OSError:
+        return False
+
+
+class ScratchRetention:
+
+    def __init__(self, ledger_path, budget_bytes, min_free_bytes, frames_keep_days=0, movies_keep_days=14):
+        self.ledger_path = ledger_path
+        self.budget_bytes = budget_bytes
+        self.min_free_bytes = min_free_bytes
+        self.frames_keep_days = frames_keep_days
+        self.movies_keep_days = movies_keep_days
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.isfile(ledger_path):
+            try:
+                with open(ledger_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"scratch ledger ignored ({ledger_path}): {e}")
+                self.entries = {}
+
+    def add_frames(self, render_path, render_name, date):
+        # A (re)rendered sequence is not copied yet, whatever the ledger said.
+        total_bytes, _ = sequence_bytes(render_path, render_name)
+        with self._lock:
+            self.entries[f"frames|{render_path}|{render_name}"] = {
+                'kind': "frames", 'path': render_path, 'name': render_name, 'bytes': total_bytes,
+                'date': date, 'used': time.time(), 'copied_to': None, 'copied_bytes': None,
+            }
+            self._save()
+
+    def mark_copied(self, render_path, render_name, movie_file, copied_to, date):
+        # copied_to is the verified daily_path copy of movie_file.
+        movie_bytes = os.path.getsize(movie_file)
+        with self._lock:
+            frames = self.entries.get(f"frames|{render_path}|{render_name}")
+            if frames is not None:
+                frames['copied_to'] = copied_to
+                frames['copied_bytes'] = movie_bytes
+            self.entries[f"movie|{movie_file}"] = {
+                'kind': "movie", 'path': movie_file, 'bytes': movie_bytes,
+                'date': date, 'used': time.time(), 'copied_to': copied_to, 'copied_bytes': movie_bytes,
+            }
+            self._save()
+
+    def mark_files_copied(self, copies, date):
+        # Other deliverables of a job (proxy, thumbnails, contact sheets) as
+        # [(scratch file, verified copy)]. They are evicted like the MP4s.
+        with self._lock:
+            for path, copied_to in copies:
+                size = os.path.getsize(path)
+                self.entries[f"movie|{path}"] = {
+                    'kind': "movie", 'path': path, 'bytes': size,
+                    'date': date, 'used': time.time(), 'copied_to': copied_to, 'copied_bytes': size,
+                }
+            self._save()
+
+    def usage(self):
+        with self._lock:
+            return sum(entry['bytes'] for entry in self.entries.values())
+
+    def _verified(self, entry):
+        copied_to = entry.get('copied_to')
+        try:
+            return bool(copied_to) and os.path.getsize(copied_to) == entry['copied_bytes']
+        except OSError:
+            return False
+
+    def _candidates(self, today):
+        frames = [e for e in self.entries.values()
+                  if e['kind'] == "frames" and days_old(e['date'], today) >= self.frames_keep_days]
+        movies = [e for e in self.entries.values()
+                  if e['kind'] == "movie" and days_old(e['date'], today) >= self.movies_keep_days]
+        return sorted(frames, key=lambda e: e['used']) + sorted(movies, key=lambda e: (e['date'], e['used']))
+
+    def _evict(self, entry):
+        if entry['kind'] == "movie":
+            if os.path.isfile(entry['path']):
+                os.remove(entry['path'])
+            return
+        prefix = entry['name'] + "."
+        for item in os.scandir(entry['path']):
+            if item.name.startswith(prefix) and item.is_file():
+                os.remove(item.path)
+        stamp = resume_stamp_path(entry['path'], entry['name'])
+        if os.path.isfile(stamp):
+            os.remove(stamp)
+        try:
+            os.rmdir(entry['path'])
+        except OSError:
+            pass
+
+    def evictable_bytes(self, root, today):
+        # What make_room could free on root's drive right now: verified
+        # entries past their keep days. Preflight counts it as free space.
+        with self._lock:
+            return sum(entry['bytes'] for entry in self._candidates(today)
+                       if same_device(entry['path'], root) and self._verified(entry))
+
+    def make_room(self, root, needed_bytes, today):
+        # Evicts until the ledger fits the budget with needed_bytes more and
+        # root has needed_bytes plus min_free_bytes free. Returns counts.
+        stats = {'evicted': 0, 'bytes': 0, 'unverified': 0, 'short': False}
+        with self._lock:
+            usage = sum(entry['bytes'] for entry in self.entries.values())
+            try:
+                os.makedirs(root, exist_ok=True)
+                free = shutil.disk_usage(root).free
+            except OSError as e:
+                print(f"Scratch GC: can't read free space of {root}: {e}")
+                free = None
+
+            def over_budget():
+                return usage + needed_bytes > self.budget_bytes
+
+            def low_space():
+                return free is not None and free - needed_bytes < self.min_free_bytes
+
+            if not over_budget() and not low_space():
+                return stats
+
+            for entry in self._candidates(today):
+                if not over_budget() and not low_space():
+                    break
+                on_root = same_device(entry['path'], root)
+                if not over_budget() and not on_root:
+                    continue
+                if not self._verified(entry):
+                    stats['unverified'] += 1
+                    continue
+                try:
+                    self._evict(entry)
+                except OSError as e:
+                    print(f"Scratch GC: could not remove {entry['path']}: {e}")
+                    continue
+                key = f"movie|{entry['path']}" if entry['kind'] == "movie" else f"frames|{entry['path']}|{entry['name']}"
+                del self.entries[key]
+                usage -= entry['bytes']
+                if on_root and free is not None:
+                    free += entry['bytes']
+                stats['evicted'] += 1
+                stats['bytes'] += entry['bytes']
+
+            stats['short'] = over_budget() or low_space()
+            self._save()
+        return stats
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.ledger_path) or ".", exist_ok=True)
+        tmp = self.ledger_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.ledger_path)
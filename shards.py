@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+
+from frame_scan import scan_sequence
+
+# Frame-range sharding of one long sequence.
+#
+# A job with "shards": K and "frame_count": N is split into K contiguous frame
+# ranges. Shards are given to the hosts named by the job's "host" field in
+# turn (a single host means every shard runs locally). Shards for other hosts
+# are published as small ticket files in a shared directory; a host picks up
+# the tickets addressed to it by renaming them (the rename is the claim, so a
+# shard is never rendered twice). All shards write into the same render_path,
+# and the owner waits until every frame is on disk before encoding.
+#
+# Ranges are 0 based offsets from the start of the sequence, end exclusive,
+# which is what CinemaMPRExecutor takes as -StartFrame/-EndFrame.
+
+
+def job_hosts(job):
+    hosts = job['host']
+    return list(hosts) if isinstance(hosts, (list, tuple)) else [hosts]
+
+
+def plan_shards(frame_count, shards, hosts):
+    shards = max(1, min(int(shards), frame_count))
+    plan = []
+    first = 0
+    for index in range(shards):
+        size = frame_count // shards + (1 if index < frame_count % shards else 0)
+        plan.append({'index': index, 'start': first, 'end': first + size, 'host': hosts[index % len(hosts)]})
+        first += size
+    return plan
+
+
+def missing_ranges(render_path, render_name, custom_start, frame_count, ext="png"):
+    # Offsets [start, end) of frames that are not (completely) on disk yet.
+    return [tuple(r) for r in scan_sequence(render_path, render_name, custom_start, frame_count, ext)['broken']]
+
+
+class ShardTickets:
+
+    def __init__(self, ticket_dir):
+        self.ticket_dir = ticket_dir
+
+    def _name(self, render_name, index):
+        return os.path.join(self.ticket_dir, f"{render_name}.shard{index:02d}.json")
+
+    def publish(self, render_name, shard, job):
+        os.makedirs(self.ticket_dir, exist_ok=True)
+        ticket = dict(shard, render_name=render_name, job=job)
+        path = self._name(render_name, shard['index'])
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(ticket, f)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def claim(self, path, host):
+        # Returns the ticket if this host won it, None if somebody else did.
+        claimed = f"{path}.{host}"
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            return None
+        with open(claimed, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def claim_next(self, host):
+        try:
+            names = sorted(os.listdir(self.ticket_dir))
+        except OSError:
+            return None
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.ticket_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    if json.load(f).get('host') != host:
+                        continue
+            except (OSError, ValueError):
+                continue
+            ticket = self.claim(path, host)
+            if ticket:
+                return ticket
+        return None
+
+    def pending(self, render_name, index):
+        # True while nobody has claimed the ticket.
+        return os.path.exists(self._name(render_name, index))
+
+    def wait_claimed(self, render_name, shards, timeout, poll_interval=10):
+        # Waits until every shard's ticket has been claimed. Returns False if
+        # some are still pending when the timeout ran out.
+        deadline = time.monotonic() + timeout
+        while any(self.pending(render_name, shard['index']) for shard in shards):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def reclaim(self, render_name, index, host):
+        # The owner takes back a ticket nobody has claimed yet.
+        return self.claim(self._name(render_name, index), host)
+
+
+class ShardTicketWorker(threading.Thread):
+    # Renders the shard tickets addressed to this host while the local run is
+    # going on. Stops once stop() has been called and no ticket is waiting.
+
+    def __init__(self, tickets, host, render_ticket, poll_interval=30):
+        super().__init__(name="shard-tickets", daemon=True)
+        self.tickets = tickets
+        self.host = host
+        self.render_ticket = render_ticket
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while True:
+            ticket = self.tickets.claim_next(self.host)
+            if ticket is None:
+                if self._stop_event.wait(self.poll_interval):
+                    return
+                continue
+            print(f"Shard ticket: {ticket['render_name']} frames {ticket['start']}-{ticket['end']}")
+            try:
+                self.render_ticket(ticket)
+            except Exception as e:
+                print(f"Shard ticket {ticket['render_name']}#{ticket['index']} failed: {e!r}")
+
+
+def wait_for_frames(render_path, render_name, custom_start, frame_count, timeout, poll_interval=30, ext="png"):
+    # Waits until every frame of the job is on disk. Returns the ranges still
+    # missing when the timeout ran out (empty when complete).
+    deadline = time.monotonic() + timeout
+    while True:
+        missing = missing_ranges(render_path, render_name, custom_start, frame_count, ext)
+        if not missing or time.monotonic() >= deadline:
+            return missing
+        time.sleep(poll_interval)
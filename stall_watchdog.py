@@ -0,0 +1,120 @@
+import asyncio
+import os
+import subprocess
+import time
+
+# Stall watchdog for the editor and ffmpeg processes.
+#
+# A process is started by `launch()` (anything returning a Popen) and watched
+# by an asyncio supervisor: one task waits for the process to exit, another
+# samples the progress probes (frame count, log size, output size, ...) every
+# poll_interval seconds. Whenever any probe changes the process counts as
+# alive. After stall_timeout seconds without any change the process tree is
+# killed and, up to `retries` times, launched again. on_stall(attempt,
+# lost_seconds, idle_seconds) is called for every killed attempt; when the
+# last attempt stalls too, Stalled is raised so the caller can skip the job.
+#
+#   returncode = run_supervised(lambda: subprocess.Popen(command),
+#                               [file_size(log_file), frame_count(render_path, name)],
+#                               stall_timeout=1800, retries=1)
+
+
+class Stalled(RuntimeError):
+
+    def __init__(self, label, attempts, lost_seconds):
+        self.label = label
+        self.attempts = attempts
+        self.lost_seconds = lost_seconds
+        super().__init__(f"{label}: no progress, killed {attempts} time(s), {lost_seconds:.0f}s lost")
+
+
+def file_size(path):
+    def probe():
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return None
+    return probe
+
+
+def file_count(directory, prefix):
+    def probe():
+        try:
+            return sum(1 for entry in os.scandir(directory) if entry.name.startswith(prefix))
+        except OSError:
+            return None
+    return probe
+
+
+def kill_tree(proc):
+    # The editor starts ShaderCompileWorkers and the crash reporter; on
+    # Windows those have to go with it or they keep files open.
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.call(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+def sample_probes(probes):
+    values = []
+    for probe in probes:
+        try:
+            values.append(probe())
+        except Exception as e:
+            values.append(repr(e))
+    return values
+
+
+async def _watch(probes, stall_timeout, poll_interval):
+    # Returns the idle seconds once nothing has changed for stall_timeout.
+    loop = asyncio.get_running_loop()
+    last = await loop.run_in_executor(None, sample_probes, probes)
+    last_change = time.monotonic()
+    while True:
+        await asyncio.sleep(poll_interval)
+        current = await loop.run_in_executor(None, sample_probes, probes)
+        now = time.monotonic()
+        if current != last:
+            last, last_change = current, now
+        elif now - last_change >= stall_timeout:
+            return now - last_change
+
+
+async def supervise(launch, probes, stall_timeout, poll_interval=10):
+    # One attempt: {'returncode', 'stalled', 'seconds', 'idle'}.
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    proc = launch()
+    exited = loop.run_in_executor(None, proc.wait)
+    watcher = asyncio.ensure_future(_watch(probes, stall_timeout, min(poll_interval, stall_timeout)))
+    await asyncio.wait({exited, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    if exited.done():
+        watcher.cancel()
+        return {'returncode': exited.result(), 'stalled': False, 'seconds': time.monotonic() - started, 'idle': 0.0}
+    idle = watcher.result()
+    kill_tree(proc)
+    returncode = await exited
+    return {'returncode': returncode, 'stalled': True, 'seconds': time.monotonic() - started, 'idle': idle}
+
+
+def run_supervised(launch, probes, stall_timeout, retries=0, poll_interval=10, on_stall=None, label="process"):
+    # Blocking; safe to call from any worker thread (each call has its own
+    # event loop). stall_timeout of 0/None disables the watchdog.
+    if not stall_timeout:
+        return launch().wait()
+    lost = 0.0
+    for attempt in range(1, retries + 2):
+        result = asyncio.run(supervise(launch, probes, stall_timeout, poll_interval))
+        if not result['stalled']:
+            return result['returncode']
+        lost += result['seconds']
+        print(f"Watchdog: {label} made no progress for {result['idle']:.0f}s, killed "
+              f"(attempt {attempt}/{retries + 1}, {result['seconds']:.0f}s lost)")
+        if on_stall is not None:
+            on_stall(attempt, result['seconds'], result['idle'])
+    raise Stalled(label, retries + 1, lost)
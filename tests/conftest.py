@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# The modules live flat at the top of the repository.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+JOB = {'render_name': "Shot010", 'project_name': "Test", 'engine_version': "UE_5.5",
+       'ue_project': "//depot/Test/Test.uproject", 'ue_umap': "/Game/Maps/Test_P", 'ue_sequence': "/Game/Seq/Shot010",
+       'output_directory': "Test", 'res_x': 1920, 'res_y': 1080}
+
+
+@pytest.fixture
+def daily(tmp_path, monkeypatch):
+    # DailyRender_v2 with its files in tmp_path. Without P4Python the bench's
+    # P4 module stands in; nothing here talks to a server.
+    try:
+        import P4  # noqa: F401
+    except ImportError:
+        monkeypatch.syspath_prepend(os.path.join(REPO_DIR, "bench", "stubs"))
+    import DailyRender_v2 as d
+    from perf_db import PerfDB
+    from preflight import FrameSizeHistory
+    from progress import ProgressListener
+    from render_cache import RenderCache
+    from scratch_gc import ScratchRetention
+
+    monkeypatch.setattr(d, "today", "20260101")
+    monkeypatch.setattr(d, "scratch_root", str(tmp_path / "scratch"))
+    monkeypatch.setattr(d, "render_log_dir", str(tmp_path / "logs"))
+    monkeypatch.setattr(d, "perf", PerfDB(str(tmp_path / "perf.db"), run_date="20260101"))
+    monkeypatch.setattr(d, "render_cache", RenderCache(str(tmp_path / "render_cache.json")))
+    monkeypatch.setattr(d, "frame_sizes", FrameSizeHistory(str(tmp_path / "frame_sizes.json")))
+    monkeypatch.setattr(d, "retention", ScratchRetention(str(tmp_path / "scratch" / "ledger.json"), 0, 0))
+    monkeypatch.setattr(d, "progress_listener", ProgressListener())
+    monkeypatch.setattr(d, "warm_pool", None)
+    monkeypatch.setattr(d, "render_slots", threading.BoundedSemaphore(1))
+    for name, value in list(d.default_pipeline_settings.items()):
+        monkeypatch.setitem(d.pipeline_settings, name, value)
+    yield d
+    d.perf.close()
+
+
+@pytest.fixture
+def make_ctx(daily, tmp_path):
+    # A ctx like sync_job makes, without P4 or the editor.
+    def make(name="Shot010", **overrides):
+        job = dict(JOB, render_name=name, **overrides.pop('job', {}))
+        render_name = f"{name}_20260101"
+        ctx = {
+            'job': job,
+            'render_name': render_name,
+            'project_name': job['project_name'],
+            'custom_start': job.get('custom_start', 1),
+            'daily_path': str(tmp_path / "daily"),
+            'onedrive_daily_path': str(tmp_path / "onedrive"),
+            'movie_path': str(tmp_path / "movies"),
+            'movie_file': str(tmp_path / "movies" / f"{render_name}.mp4"),
+            'render_path': str(tmp_path / "frames"),
+            'synced_change': 100,
+            'cached_movie': None,
+            'encode_mode': "batch",
+            'encoded': False,
+            'frame_count': job.get('frame_count'),
+            'shards': 1,
+            'output_format': "png",
+            'output_kind': "sequence",
+            'output_ext': "png",
+            'warmup_mode': "fixed",
+            'warmup': 8,
+            'quality': "final",
+            'encode_targets': [],
+        }
+        ctx.update(overrides)
+        for key in ('daily_path', 'onedrive_daily_path', 'movie_path', 'render_path'):
+            os.makedirs(ctx[key], exist_ok=True)
+        return ctx
+    return make
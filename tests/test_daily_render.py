@@ -0,0 +1,300 @@
+import os
+import time
+
+import pytest
+
+
+def write_partial_movie(returncode):
+    def encode(ffmpeg, render_path, render_name, start, movie_file, **kwargs):
+        with open(movie_file, "wb") as f:
+            f.write(b"half an mp4")
+        return returncode
+    return encode
+
+
+def test_failed_encode_fails_the_job_and_removes_the_movie(daily, make_ctx, monkeypatch):
+    monkeypatch.setattr(daily, "encode_sequence", write_partial_movie(1))
+    ctx = make_ctx()
+    with pytest.raises(RuntimeError, match="exit code 1"):
+        daily.encode_job(ctx)
+    assert not ctx['encoded']
+    assert not daily.os.path.exists(ctx["movie_file"])
+
+
+def test_successful_encode_is_marked_encoded(daily, make_ctx, monkeypatch):
+    monkeypatch.setattr(daily, "encode_sequence", write_partial_movie(0))
+    ctx = make_ctx()
+    daily.encode_job(ctx)
+    assert ctx['encoded']
+    assert daily.os.path.isfile(ctx['movie_file'])
+
+
+def test_failed_targets_of_a_cached_movie_keep_the_movie(daily, make_ctx, monkeypatch, tmp_path):
+    cached = tmp_path / "cached.mp4"
+    cached.write_bytes(b"good mp4")
+
+    def encode_targets(ffmpeg, source_args, movie_file, targets, call=None):
+        with open(movie_file.replace(".mp4", "_proxy.mp4"), "wb") as f:
+            f.write(b"half a proxy")
+        return 1
+
+    monkeypatch.setattr(daily, "encode_targets", encode_targets)
+    ctx = make_ctx(cached_movie=str(cached), encode_targets=[{'kind': "proxy"}])
+    with pytest.raises(RuntimeError, match="encode_targets"):
+        daily.encode_job(ctx)
+    assert daily.os.path.isfile(ctx['movie_file'])
+    assert not daily.os.path.exists(ctx['movie_file'].replace(".mp4", "_proxy.mp4"))
+
+
+def test_failed_stream_encode_falls_back_to_batch(daily, make_ctx, monkeypatch):
+    class FailingEncoder:
+        frames_written = 0
+        gaps = []
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def run(self, is_rendering):
+            return 1
+
+    monkeypatch.setattr(daily, "StreamingEncoder", FailingEncoder)
+    ctx = make_ctx(encode_mode="stream")
+    assert daily.stream_encode([ctx], lambda: 0) == 0
+    assert ctx['encoded'] is False
+
+
+def test_only_an_encoded_and_copied_movie_is_cached(daily, make_ctx):
+    ctx = make_ctx()
+    with open(ctx['movie_file'], "wb") as f:
+        f.write(b"stale mp4")
+    daily.copy_job(ctx)
+    assert daily.render_cache.lookup(ctx['job'], 100) is None
+    ctx['encoded'] = True
+    daily.copy_job(ctx)
+    assert daily.render_cache.lookup(ctx['job'], 100) is not None
+
+
+def write_frames(ctx, count):
+    from frames import PNG_SIGNATURE, PNG_TRAILER, frame_path
+    for frame in range(ctx['custom_start'], ctx['custom_start'] + count):
+        with open(frame_path(ctx['render_path'], ctx['render_name'], frame), "wb") as f:
+            f.write(PNG_SIGNATURE + b"\0" * 16 + PNG_TRAILER)
+
+
+def test_stall_in_a_group_only_fails_the_stalled_job(daily, make_ctx, monkeypatch):
+    done = make_ctx("Shot010", job={'frame_count': 10})
+    stalled = make_ctx("Shot020", job={'frame_count': 10})
+    sessions = []
+
+    def render_session(ctxs, log_name, wrap=None):
+        sessions.append([ctx['render_name'] for ctx in ctxs])
+        if len(sessions) == 1:
+            write_frames(done, 10)
+            write_frames(stalled, 4)
+        raise daily.Stalled(f"render {log_name}", 2, 60)
+
+    monkeypatch.setattr(daily, "render_session", render_session)
+    daily.render_group([done, stalled])
+    assert 'render_error' not in done
+    assert "broken frames" in stalled['render_error']
+    # Only the stalled job is rendered again, and only its missing frames.
+    assert sessions[1:] == [[stalled['render_name']]]
+    assert stalled['resume_ranges'] == [[4, 10]]
+
+
+def test_forced_rerender_does_not_resume(daily, make_ctx):
+    ctx = make_ctx(job={'frame_count': 10})
+    write_frames(ctx, 10)
+    daily.plan_resume(ctx)
+    assert daily.resume_renders([ctx]) == []
+    forced = make_ctx(job={'frame_count': 10, 'force_render': True, 'resume_frames': False})
+    assert daily.resume_renders([forced]) == [forced]
+    assert forced['resume_ranges'] is None
+    assert daily.existing_frames(forced['render_path'], forced['render_name']) == []
+
+
+def sharded_ctx(daily, make_ctx, monkeypatch, tmp_path, hosts, claim_timeout):
+    from shards import ShardTickets
+    monkeypatch.setattr(daily, "shard_tickets", ShardTickets(str(tmp_path / "tickets")))
+    monkeypatch.setattr(daily, "render_host", 1)
+    monkeypatch.setitem(daily.pipeline_settings, "shard_claim_timeout", claim_timeout)
+    rendered = []
+    monkeypatch.setattr(daily, "render_ranges", lambda ctx, ranges: rendered.extend(ranges))
+    monkeypatch.setattr(daily, "wait_for_frames", lambda *args, **kwargs: [])
+    return make_ctx(job={'frame_count': 10, 'host': hosts}, frame_count=10, shards=2), rendered
+
+
+def test_unclaimed_shards_render_as_soon_as_local_shards_finish(daily, make_ctx, monkeypatch, tmp_path):
+    ctx, rendered = sharded_ctx(daily, make_ctx, monkeypatch, tmp_path, [1, 2], claim_timeout=600)
+    started = time.monotonic()
+    daily.render_sharded(ctx)
+    assert time.monotonic() - started < 5
+    assert rendered == [(0, 5), (5, 10)]
+    assert os.listdir(tmp_path / "tickets") == ["Shot010_20260101.shard01.json.1"]
+
+
+def test_claimed_shards_are_left_to_their_host(daily, make_ctx, monkeypatch, tmp_path):
+    ctx, rendered = sharded_ctx(daily, make_ctx, monkeypatch, tmp_path, [2, 3], claim_timeout=0)
+    publish = daily.shard_tickets.publish
+
+    def publish_and_claim(render_name, shard, job):
+        path = publish(render_name, shard, job)
+        if shard['host'] == 2:
+            daily.shard_tickets.claim(path, 2)
+        return path
+
+    monkeypatch.setattr(daily.shard_tickets, "publish", publish_and_claim)
+    daily.render_sharded(ctx)
+    # Host 3 never showed up; its shard is rendered here after the claim timeout.
+    assert rendered == [(5, 10)]
+
+
+def test_profile_settings_resolve_like_the_editor(daily):
+    profiles = {'final': {'config': "final"}, 'preview': {'config': "preview"}}
+    assert daily.profile_settings(profiles, "preview") == {'config': "preview"}
+    assert daily.profile_settings(profiles, "final") == {'config': "final"}
+    assert daily.profile_settings(profiles, "draft") == {'config': "final"}
+    assert daily.profile_settings(None, "preview") is None
+    assert daily.profile_settings({}, "final") is None
+
+
+class FakeWarmPool:
+
+    def __init__(self, worker):
+        self.worker = worker
+        self.discarded = []
+
+    def checkout(self, key, change, make):
+        return self.worker
+
+    def checkin(self, worker):
+        pass
+
+    def discard(self, worker):
+        self.discarded.append(worker)
+
+
+class LostWorker:
+    # A warm editor that dies during the batch, after reporting `frames` frames.
+
+    def __init__(self, log_file, frames, feed):
+        self.log_file = log_file
+        self.frames = frames
+        self.feed = feed
+        self.proc = type("Proc", (), {'returncode': 3})()
+        self.up = True
+
+    def alive(self):
+        return self.up
+
+    def render(self, jobs, probes, stall_timeout, poll_interval, profile_file):
+        from render_server import WorkerLost
+        for frame in range(1, self.frames + 1):
+            self.feed({'type': "progress", 'job': "Shot010_20260101", 'frame': frame, 'total': 10})
+        self.up = False
+        raise WorkerLost("editor exited with 3")
+
+
+def warm_session(daily, make_ctx, monkeypatch, tmp_path, frames):
+    ctx = make_ctx(job={'frame_count': 10})
+    log_file = tmp_path / "warm.log"
+    log_file.write_text("")
+    worker = LostWorker(str(log_file), frames, daily.progress_listener.feed)
+    monkeypatch.setattr(daily, "warm_pool", FakeWarmPool(worker))
+    monkeypatch.setattr(daily, "archive_log", lambda *args: None)
+    monkeypatch.setattr(daily, "manifest_jobs", lambda ctxs: [])
+    editors = []
+    monkeypatch.setattr(daily, "run_editor", lambda ctxs, log_name, wrap=None: editors.append(log_name) or 0)
+    return daily.render_session([ctx], ctx['render_name']), editors, daily.warm_pool
+
+
+def test_warm_worker_lost_before_any_frame_renders_in_a_new_editor(daily, make_ctx, monkeypatch, tmp_path):
+    returncode, editors, pool = warm_session(daily, make_ctx, monkeypatch, tmp_path, frames=0)
+    assert returncode == 0
+    assert editors == ["Shot010_20260101"]
+    assert len(pool.discarded) == 1
+
+
+def test_warm_worker_lost_mid_render_leaves_the_rest_to_verify(daily, make_ctx, monkeypatch, tmp_path):
+    returncode, editors, pool = warm_session(daily, make_ctx, monkeypatch, tmp_path, frames=4)
+    assert returncode == 3
+    assert editors == []
+    assert len(pool.discarded) == 1
+
+
+def test_broken_frames_are_rendered_again(daily, make_ctx, monkeypatch):
+    ctx = make_ctx(job={'frame_count': 10}, encoded=True, encode_mode="stream")
+    write_frames(ctx, 10)
+    os.remove(os.path.join(ctx['render_path'], "Shot010_20260101.0004.png"))
+    repairs = []
+
+    def render_session(ctxs, log_name, wrap=None):
+        repairs.append((log_name, ctxs[0]['resume_ranges']))
+        write_frames(ctxs[0], 10)
+        return 0
+
+    monkeypatch.setattr(daily, "render_session", render_session)
+    daily.verify_frames([ctx], 0)
+    assert repairs == [("Shot010_20260101_repair1", [[3, 4]])]
+    assert 'render_error' not in ctx
+    # The streamed movie has a hole; it is encoded again from the frames.
+    assert (ctx['encoded'], ctx['encode_mode']) == (False, "batch")
+
+
+def test_frames_still_broken_after_the_repairs_fail_the_job(daily, make_ctx, monkeypatch):
+    monkeypatch.setitem(daily.pipeline_settings, "frame_repair_attempts", 2)
+    ctx = make_ctx(job={'frame_count': 10})
+    write_frames(ctx, 6)
+    empty = make_ctx("Shot020", job={'frame_count': 10})
+    attempts = []
+    monkeypatch.setattr(daily, "render_session", lambda ctxs, log_name, wrap=None: attempts.append(log_name) or 1)
+    daily.verify_frames([ctx, empty], 1)
+    assert attempts == ["Shot010_20260101_repair1", "Shot010_20260101_repair2"]
+    assert ctx['render_error'].startswith("broken frames after the render (editor exit code 1): ")
+    assert empty['render_error'] == "no frames rendered (editor exit code 1)"
+
+
+def test_first_attempt_renders_everything_and_stamps(daily, make_ctx):
+    ctx = make_ctx(job={'frame_count': 10})
+    assert daily.plan_resume(ctx) is None
+    stamp = daily.read_resume_stamp(ctx)
+    assert stamp == {'change': 100, 'params': daily.params_hash(ctx['job']), 'format': "png", 'frame_count': 10}
+
+
+def test_interrupted_render_resumes_the_missing_frames(daily, make_ctx):
+    ctx = make_ctx(job={'frame_count': 10}, encode_mode="stream")
+    daily.plan_resume(ctx)
+    write_frames(ctx, 6)
+    os.remove(os.path.join(ctx['render_path'], "Shot010_20260101.0002.png"))
+    assert daily.resume_renders([ctx]) == [ctx]
+    assert ctx['resume_ranges'] == [(1, 2), (6, 10)]
+    assert ctx['encode_mode'] == "batch"
+
+
+def test_frames_of_another_change_or_format_are_not_resumed(daily, make_ctx):
+    ctx = make_ctx(job={'frame_count': 10})
+    daily.plan_resume(ctx)
+    write_frames(ctx, 6)
+    assert daily.plan_resume(make_ctx(job={'frame_count': 10}, synced_change=101)) is None
+    # The stamp now holds change 101; the frames on disk are from 100.
+    assert daily.plan_resume(make_ctx(job={'frame_count': 10}, synced_change=100)) is None
+    daily.plan_resume(ctx)
+    assert daily.plan_resume(make_ctx(job={'frame_count': 10}, output_format="exr", output_ext="exr")) is None
+
+
+def test_frame_count_reported_by_the_editor_is_kept_for_the_next_attempt(daily, make_ctx):
+    ctx = make_ctx()
+    assert daily.plan_resume(ctx) is None
+    assert daily.read_resume_stamp(ctx)['frame_count'] is None
+    daily.progress_listener.feed({'type': "progress", 'job': ctx['render_name'], 'frame': 3, 'total': 10})
+    daily.remember_frame_count([ctx])
+    assert daily.read_resume_stamp(ctx)['frame_count'] == 10
+    write_frames(ctx, 3)
+    assert daily.plan_resume(make_ctx()) == [(3, 10)]
+
+
+def test_sharded_and_movie_jobs_are_not_resumed(daily, make_ctx):
+    sharded = make_ctx("Shot010", job={'frame_count': 10}, shards=2)
+    movie = make_ctx("Shot020", job={'frame_count': 10}, output_kind="video")
+    assert daily.resume_renders([sharded, movie]) == [sharded, movie]
+    assert 'resume_ranges' not in sharded and 'resume_ranges' not in movie
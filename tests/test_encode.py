@@ -0,0 +1,71 @@
+from encode import (JPEG_ARGS, PROXY_X264_ARGS, X264_ARGS, encode_sequence, encode_targets, output_args, split_range,
+                    target_files, target_outputs)
+
+
+def test_split_range_covers_the_range_in_order():
+    assert split_range(1, 11, 3) == [(1, 5), (5, 8), (8, 11)]
+    assert split_range(0, 8, 4) == [(0, 2), (2, 4), (4, 6), (6, 8)]
+
+
+def test_split_range_never_makes_empty_segments():
+    assert split_range(10, 12, 8) == [(10, 11), (11, 12)]
+    assert split_range(5, 6, 0) == [(5, 6)]
+
+
+def test_review_only_is_the_plain_encode():
+    assert output_args(target_outputs([], "D:/out/Shot010.mp4")) == [*X264_ARGS, "D:/out/Shot010.mp4"]
+
+
+def test_targets_share_one_filter_graph():
+    targets = [{'kind': "proxy", 'scale': 0.5}, {'kind': "thumbnails", 'every': 24, 'width': 480}, {'kind': "bogus"}]
+    args = output_args(target_outputs(targets, "D:/out/Shot010.mp4"))
+    graph = args[args.index("-filter_complex") + 1].split(";")
+    assert graph[0] == "[0:v]split=3[s0][s1][s2]"
+    assert graph[1].startswith("[s0]select=") and graph[1].endswith("scale=480:-2[o0]")
+    assert graph[2] == "[s1]scale=trunc(iw*0.5/2)*2:-2[o1]"
+    assert graph[3] == "[s2]null[o2]"
+    # Thumbnails, proxy, then the review MP4 last for the watchdog.
+    assert args[-1] == "D:/out/Shot010.mp4"
+    maps = [args[i + 1] for i, arg in enumerate(args) if arg == "-map"]
+    assert maps == ["[o0]", "[o1]", "[o2]"]
+    thumb = args.index("[o0]")
+    assert args[thumb + 1:thumb + 1 + len(JPEG_ARGS) + 1] == [*JPEG_ARGS, "D:/out/Shot010_thumb.%04d.jpg"]
+    proxy = args.index("[o1]")
+    assert args[proxy + 1:proxy + 1 + len(PROXY_X264_ARGS) + 1] == [*PROXY_X264_ARGS, "D:/out/Shot010_proxy.mp4"]
+
+
+def test_single_extra_target_needs_no_split():
+    args = output_args(target_outputs([{'kind': "contact_sheet"}], "D:/out/Shot010.mp4", review=False))
+    assert args[:2] == ["-filter_complex", "[0:v]select='not(mod(n\\,48))',setpts=N/FRAME_RATE/TB,scale=320:-2,tile=8x6[o0]"]
+    assert args[-1] == "D:/out/Shot010_contact.%02d.jpg"
+
+
+def test_encode_clears_old_images_and_lists_what_it_wrote(tmp_path):
+    movie = str(tmp_path / "Shot010.mp4")
+    targets = [{'kind': "proxy"}, {'kind': "thumbnails"}]
+    for name in ("Shot010_thumb.0001.jpg", "Shot010_thumb.0002.jpg", "Shot020_thumb.0001.jpg"):
+        (tmp_path / name).write_bytes(b"old")
+    commands = []
+
+    def call(command):
+        commands.append(command)
+        (tmp_path / "Shot010_thumb.0001.jpg").write_bytes(b"jpg")
+        (tmp_path / "Shot010_proxy.mp4").write_bytes(b"mp4")
+        (tmp_path / "Shot010.mp4").write_bytes(b"mp4")
+        return 0
+
+    assert encode_sequence("ffmpeg", str(tmp_path), "Shot010", 1001, movie, call=call, targets=targets) == 0
+    assert commands[0][commands[0].index("-start_number") + 1] == "1001"
+    assert commands[0][-1] == movie
+    assert target_files(targets, movie) == [str(tmp_path / "Shot010_thumb.0001.jpg"), str(tmp_path / "Shot010_proxy.mp4")]
+    assert (tmp_path / "Shot020_thumb.0001.jpg").read_bytes() == b"old"
+
+
+def test_targets_only_encode_reads_the_movie(tmp_path):
+    movie = str(tmp_path / "Shot010.mp4")
+    commands = []
+    assert encode_targets("ffmpeg", ["-i", movie], movie, [], call=commands.append) == 0
+    assert commands == []
+    encode_targets("ffmpeg", ["-i", movie], movie, [{'kind': "proxy"}], call=lambda c: commands.append(c) or 0)
+    assert commands[0][:4] == ["ffmpeg", "-i", movie, "-y"]
+    assert commands[0][-1] == str(tmp_path / "Shot010_proxy.mp4")
@@ -0,0 +1,94 @@
+import builtins
+import os
+
+import pytest
+
+import fanout_copy
+from fanout_copy import fanout_copy as copy
+
+
+class FailingSource:
+    # Reads one chunk of the real file, then fails like a dropped share.
+
+    def __init__(self, path):
+        self.f = builtins.open(path, "rb")
+        self.reads = 0
+
+    def read(self, size):
+        self.reads += 1
+        if self.reads > 1:
+            raise OSError("network name no longer available")
+        return self.f.read(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+
+def test_source_read_error_stops_the_writers(tmp_path, monkeypatch):
+    source = tmp_path / "movie.mov"
+    source.write_bytes(os.urandom(4096))
+    targets = [str(tmp_path / "a" / "movie.mov"), str(tmp_path / "b" / "movie.mov")]
+
+    def failing_open(path, mode="r", *args, **kwargs):
+        if path == str(source):
+            return FailingSource(path)
+        return builtins.open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(fanout_copy, "open", failing_open, raising=False)
+    with pytest.raises(OSError, match="no longer available"):
+        copy(str(source), targets, chunk_size=1024)
+    for target in targets:
+        assert not os.path.exists(target)
+        assert not os.path.exists(target + ".part")
+
+
+def test_copies_to_every_target(tmp_path):
+    source = tmp_path / "movie.mov"
+    data = os.urandom(10000)
+    source.write_bytes(data)
+    targets = [str(tmp_path / "a" / "movie.mov"), str(tmp_path / "b" / "movie.mov")]
+    results = copy(str(source), targets, chunk_size=1024)
+    assert [r['ok'] for r in results] == [True, True]
+    assert [r['resumed'] for r in results] == [False, False]
+    for target in targets:
+        assert open(target, "rb").read() == data
+        assert not os.path.exists(target + ".part")
+
+
+def test_resumed_copy_that_does_not_verify_is_copied_again(tmp_path):
+    source = tmp_path / "movie.mov"
+    data = os.urandom(10000)
+    source.write_bytes(data)
+    good, bad_part, bad_target = (str(tmp_path / name / "movie.mov") for name in ("good", "part", "target"))
+    os.makedirs(os.path.dirname(bad_part))
+    os.makedirs(os.path.dirname(bad_target))
+    # A .part whose first half doesn't match the source, and a complete target of the right size with other content.
+    with open(bad_part + ".part", "wb") as f:
+        f.write(b"\x00" * 5000)
+    with open(bad_target, "wb") as f:
+        f.write(b"\x00" * 10000)
+
+    results = copy(str(source), [good, bad_part, bad_target], chunk_size=1024)
+    assert [r['ok'] for r in results] == [True, True, True]
+    # The retried targets were written from scratch.
+    assert results[0]['written'] == 10000
+    assert [r['resumed'] for r in results[1:]] == [False, False]
+    for target in (good, bad_part, bad_target):
+        assert open(target, "rb").read() == data
+
+
+def test_resumed_part_that_matches_is_only_finished(tmp_path):
+    source = tmp_path / "movie.mov"
+    data = os.urandom(10000)
+    source.write_bytes(data)
+    target = str(tmp_path / "a" / "movie.mov")
+    os.makedirs(os.path.dirname(target))
+    with open(target + ".part", "wb") as f:
+        f.write(data[:6000])
+    result, = copy(str(source), [target], chunk_size=1024)
+    assert result['ok'] and result['resumed']
+    assert result['written'] == 4000
+    assert open(target, "rb").read() == data
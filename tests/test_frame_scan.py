@@ -0,0 +1,64 @@
+from frame_scan import frames_in, scan_sequence, scan_summary
+from frames import PNG_SIGNATURE, PNG_TRAILER, frame_path
+from shards import missing_ranges
+
+GOOD_PNG = PNG_SIGNATURE + b"\x00" * 32 + PNG_TRAILER
+
+
+def write_sequence(path, name, start, count, ext="png", data=GOOD_PNG):
+    path.mkdir(exist_ok=True)
+    for frame in range(start, start + count):
+        with open(frame_path(str(path), name, frame, ext), "wb") as f:
+            f.write(data)
+
+
+def test_complete_sequence(tmp_path):
+    write_sequence(tmp_path, "Shot010", 1001, 20)
+    report = scan_sequence(str(tmp_path), "Shot010", 1001, 20)
+    assert report['expected'] == report['present'] == 20
+    assert report['broken'] == []
+    assert report['bytes'] == 20 * len(GOOD_PNG)
+
+
+def test_gaps_zero_and_truncated_frames(tmp_path):
+    write_sequence(tmp_path, "Shot010", 1001, 100)
+    for frame in (1005, 1006, 1007):
+        (tmp_path / f"Shot010.{frame}.png").unlink()
+    (tmp_path / "Shot010.1050.png").write_bytes(b"")
+    (tmp_path / "Shot010.1051.png").write_bytes(GOOD_PNG[:-4])
+    (tmp_path / "Shot010.1099.png").write_bytes(b"garbage" * 10)
+    report = scan_sequence(str(tmp_path), "Shot010", 1001, 100, workers=4)
+    assert report['missing'] == [[4, 7]]
+    assert report['zero'] == [[49, 50]]
+    assert report['truncated'] == [[50, 51], [98, 99]]
+    assert report['broken'] == [[4, 7], [49, 51], [98, 99]]
+    assert report['present'] == 97
+    assert frames_in(report['broken']) == 6
+    assert "missing 3 (4-7)" in scan_summary(report)
+
+
+def test_frames_missing_at_the_end_need_the_count(tmp_path):
+    write_sequence(tmp_path, "Shot010", 1, 10)
+    assert scan_sequence(str(tmp_path), "Shot010", 1)['broken'] == []
+    assert scan_sequence(str(tmp_path), "Shot010", 1, 12)['missing'] == [[10, 12]]
+
+
+def test_other_formats(tmp_path):
+    write_sequence(tmp_path, "Shot010", 1, 3, ext="exr", data=b"\x76\x2f\x31\x01" + b"\x00" * 16)
+    (tmp_path / "Shot010.0002.exr").write_bytes(b"\x00" * 20)
+    assert scan_sequence(str(tmp_path), "Shot010", 1, 3, ext="exr")['truncated'] == [[1, 2]]
+    bmp = b"BM" + (40).to_bytes(4, "little") + b"\x00" * 34
+    write_sequence(tmp_path, "Shot020", 1, 3, ext="bmp", data=bmp)
+    (tmp_path / "Shot020.0003.bmp").write_bytes(bmp[:20])
+    assert scan_sequence(str(tmp_path), "Shot020", 1, 3, ext="bmp")['truncated'] == [[2, 3]]
+
+
+def test_repair_ranges_are_the_broken_ranges(tmp_path):
+    write_sequence(tmp_path, "Shot010", 1001, 30)
+    (tmp_path / "Shot010.1010.png").unlink()
+    (tmp_path / "Shot010.1011.png").write_bytes(GOOD_PNG[:10])
+    assert missing_ranges(str(tmp_path), "Shot010", 1001, 32) == [(9, 11), (30, 32)]
+    # Once the frames are rendered again nothing is left to repair.
+    write_sequence(tmp_path, "Shot010", 1010, 2)
+    write_sequence(tmp_path, "Shot010", 1031, 2)
+    assert missing_ranges(str(tmp_path), "Shot010", 1001, 32) == []
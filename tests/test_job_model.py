@@ -0,0 +1,60 @@
+from job_model import JobError, check_job, parse_jobs
+
+JOB = {'render_name': "Shot010", 'project_name': "Test", 'engine_version': "UE_5.5",
+       'ue_project': "//depot/Test/Test.uproject", 'ue_umap': "/Game/Maps/Test_P", 'ue_sequence': "/Game/Seq/Shot010",
+       'output_directory': "Test", 'res_x': 1920, 'res_y': 1080}
+
+
+def test_valid_job_has_no_problems():
+    assert check_job(JOB, engines={"UE_5.5": "x"}, profiles={"final": {}}) == []
+    assert check_job(dict(JOB, host=[1, 2], quality="final", encode_targets=[{'kind': "proxy"}]),
+                     profiles={"final": {}}) == []
+
+
+def test_missing_and_mistyped_fields():
+    job = dict(JOB, res_x="1920", activate="yes")
+    del job['ue_umap']
+    assert check_job(job) == ["missing 'ue_umap'", "'res_x' must be int, got '1920'", "'activate' must be bool, got 'yes'"]
+    assert check_job([JOB]) == ["job entry is not an object"]
+
+
+def test_bool_is_not_an_int():
+    assert check_job(dict(JOB, res_y=True)) == ["'res_y' must be int, got True"]
+
+
+def test_values_out_of_range():
+    problems = check_job(dict(JOB, shards=0, encode_mode="fast", output_format="tiff", host=[], ue_project="Test/Test.uproject"))
+    assert problems == [
+        "'shards' must be positive, got 0",
+        "'encode_mode' must be one of batch, stream, segmented, got 'fast'",
+        "'output_format' must be one of png, bmp, exr, prores, dnx, cmdline, got 'tiff'",
+        "'host' must be a host number or a non-empty list of them, got []",
+        "'ue_project' must be a depot path or an absolute workspace path, got 'Test/Test.uproject'",
+    ]
+
+
+def test_local_workspace_project_is_accepted():
+    assert check_job(dict(JOB, ue_project="D:/Workspace/Test/Test.uproject")) == []
+    assert check_job(dict(JOB, ue_project=r"D:\Workspace\Test\Test.uproject")) == []
+
+
+def test_bad_encode_target():
+    problems = check_job(dict(JOB, encode_targets=[{'kind': "gif"}]))
+    assert problems == ["'encode_targets' entries need a 'kind' of proxy, thumbnails, contact_sheet, got {'kind': 'gif'}"]
+
+
+def test_unknown_engine_and_quality():
+    problems = check_job(dict(JOB, quality="draft"), engines={"UE_5.3": "x"}, profiles={"final": {}, "preview": {}})
+    assert problems == ["unknown engine_version 'UE_5.5' (known: UE_5.3)", "unknown quality 'draft' (known: final, preview)"]
+
+
+def test_parse_jobs_rejects_duplicates_and_keeps_the_rest():
+    bad = dict(JOB, render_name="Shot020", res_x=-1)
+    valid, invalid = parse_jobs([JOB, bad, dict(JOB), "oops"])
+    assert valid == [JOB]
+    assert [type(e) for e in invalid] == [JobError] * 3
+    assert [str(e) for e in invalid] == [
+        "Shot020: 'res_x' must be positive, got -1",
+        "Shot010: duplicate job Test/Shot010",
+        "<not an object>: job entry is not an object",
+    ]
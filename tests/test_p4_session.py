@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from conftest import REPO_DIR
+
+
+class FakeP4:
+
+    def __init__(self):
+        self.calls = []
+
+    def connected(self):
+        return True
+
+    def run(self, cmd, *args):
+        self.calls.append((cmd, args))
+        paths = args[0]
+        records = []
+        for path in paths:
+            name = path.replace("\\", "/").rsplit("/", 1)[-1]
+            if name == "Unmapped.uproject":
+                records.append({'unmap': path})
+                continue
+            records.append({'depotFile': f"//depot/{name[:-9]}/{name}", 'clientFile': f"//ws/{name[:-9]}/{name}",
+                            'path': f"D:\\Workspace\\{name[:-9]}\\{name}"})
+        return records
+
+
+@pytest.fixture
+def session(monkeypatch):
+    try:
+        import P4  # noqa: F401
+    except ImportError:
+        monkeypatch.syspath_prepend(os.path.join(REPO_DIR, "bench", "stubs"))
+    from p4_session import P4Session
+    session = P4Session("ssl:p4:1666", "user", "")
+    session.p4 = FakeP4()
+    return session
+
+
+def test_where_resolves_depot_and_local_paths_in_one_call(session):
+    paths = ["//depot/A/A.uproject", "d:/workspace/B/B.uproject", r"D:\Workspace\C\C.uproject", "D:/Unmapped.uproject"]
+    resolved = session.where(paths)
+    assert sorted(resolved) == sorted(paths[:3])
+    assert resolved["d:/workspace/B/B.uproject"]['depotFile'] == "//depot/B/B.uproject"
+    assert len(session.p4.calls) == 1
+    # Cached from now on.
+    assert session.where_one("d:/workspace/B/B.uproject")['depotFile'] == "//depot/B/B.uproject"
+    assert len(session.p4.calls) == 1
@@ -0,0 +1,31 @@
+import io
+
+from perf_db import PerfDB, report, slowest, stage_trends
+
+
+def night(db, job, session, render, frame_ms):
+    db.record(job, "sync", 10)
+    db.record(job, "editor_session", session)
+    db.record(job, "first_frame", session - render)
+    db.record(job, "render", render)
+    db.record(job, "render_stall", 30, ok=False)
+    db.record(job, "frame_time", frame_ms / 1000.0)
+    db.record(job, "shader_compile", 40)
+    db.record(job, "encode", 20)
+
+
+def test_job_totals_skip_nested_and_derived_stages(tmp_path):
+    db = PerfDB(str(tmp_path / "perf.db"), run_date="20260101", host="host1")
+    night(db, "Shot010", 300, 250, 400)
+    rows = db.rows()
+    job_avg, stage_avg = slowest(rows, 10)
+    assert job_avg == [(330.0, "Shot010")]
+    assert "frame_time" not in {stage for _, _, stage in stage_avg}
+    assert (250.0, "Shot010", "render") in stage_avg
+    trends = stage_trends(rows)
+    assert "shader_compile" not in trends
+    assert trends["editor_session"] == {"20260101": 300.0}
+    out = io.StringIO()
+    report(db, out=out)
+    assert "(night)" in out.getvalue() and "0:05:30" in out.getvalue()
+    db.close()
@@ -0,0 +1,68 @@
+import json
+import os
+
+from persistent_mirror import MirrorJob, mirror, previous_day_dir
+
+
+def write(path, data, mtime=1767225600):
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def run_day(tmp_path, today):
+    job = MirrorJob("Test", str(tmp_path / "_PERSISTENT"), str(tmp_path / "daily"), today,
+                    str(tmp_path / "manifest.json"))
+    job.run()
+    assert job.error is None
+    return job.stats
+
+
+def test_previous_day_dir_ignores_other_folders(tmp_path):
+    for name in ("20251230", "20251231", "20260101", "_PERSISTENT", "2025123"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "20251229").write_text("not a folder")
+    assert previous_day_dir(str(tmp_path), "20260101") == str(tmp_path / "20251231")
+    assert previous_day_dir(str(tmp_path), "20251230") is None
+    assert previous_day_dir(str(tmp_path / "missing"), "20260101") is None
+
+
+def test_unchanged_files_are_linked_and_changed_ones_copied(tmp_path):
+    source = tmp_path / "_PERSISTENT"
+    source.mkdir()
+    write(source / "a.mp4", b"a" * 100)
+    write(source / "b.mp4", b"b" * 100)
+    (source / "sub").mkdir()
+    assert run_day(tmp_path, "20260101") == {'skipped': 0, 'linked': 0, 'copied': 2, 'failed': 0}
+    # Running again the same day finds everything in place.
+    assert run_day(tmp_path, "20260101") == {'skipped': 2, 'linked': 0, 'copied': 0, 'failed': 0}
+
+    write(source / "b.mp4", b"B" * 120, mtime=1767312000)
+    assert run_day(tmp_path, "20260102") == {'skipped': 0, 'linked': 1, 'copied': 1, 'failed': 0}
+    today = tmp_path / "daily" / "20260102"
+    assert os.path.samefile(today / "a.mp4", tmp_path / "daily" / "20260101" / "a.mp4")
+    assert (today / "b.mp4").read_bytes() == b"B" * 120
+    assert sorted(os.listdir(today)) == ["a.mp4", "b.mp4"]
+
+
+def test_deleted_files_leave_the_manifest_and_the_next_day(tmp_path):
+    source = tmp_path / "_PERSISTENT"
+    source.mkdir()
+    write(source / "a.mp4", b"a")
+    write(source / "gone.mp4", b"g")
+    run_day(tmp_path, "20260101")
+    (source / "gone.mp4").unlink()
+    assert run_day(tmp_path, "20260102") == {'skipped': 0, 'linked': 1, 'copied': 0, 'failed': 0}
+    assert os.listdir(tmp_path / "daily" / "20260102") == ["a.mp4"]
+    with open(tmp_path / "manifest.json") as f:
+        assert sorted(json.load(f)) == ["a.mp4"]
+
+
+def test_without_links_unchanged_files_are_copied(tmp_path):
+    source = tmp_path / "_PERSISTENT"
+    source.mkdir()
+    write(source / "a.mp4", b"a")
+    manifest = str(tmp_path / "manifest.json")
+    mirror(str(source), str(tmp_path / "day1"), manifest)
+    stats = mirror(str(source), str(tmp_path / "day2"), manifest, link_from=str(tmp_path / "day1"), use_links=False)
+    assert stats == {'skipped': 0, 'linked': 0, 'copied': 1, 'failed': 0}
+    assert not os.path.samefile(tmp_path / "day1" / "a.mp4", tmp_path / "day2" / "a.mp4")
@@ -0,0 +1,64 @@
+from progress import ProgressListener, encode_message, read_messages
+
+
+class FakeConn:
+    # recv() hands out the given chunks one by one, then b"" (closed).
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def recv(self, size):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+def test_split_size_prefix():
+    data = encode_message({"type": "progress", "frame": 1})
+    assert list(read_messages(FakeConn([data[:2], data[2:]]))) == [{"type": "progress", "frame": 1}]
+
+
+def test_split_body():
+    data = encode_message({"type": "progress", "job": "Shot010", "frame": 12})
+    chunks = [data[:6], data[6:15], data[15:]]
+    assert list(read_messages(FakeConn(chunks))) == [{"type": "progress", "job": "Shot010", "frame": 12}]
+
+
+def test_several_messages_in_one_chunk():
+    records = [{"type": "progress", "frame": i} for i in range(3)]
+    data = b"".join(encode_message(r) for r in records)
+    # The third message straddles into a second chunk.
+    assert list(read_messages(FakeConn([data[:-3], data[-3:]]))) == records
+
+
+def test_truncated_stream_drops_the_partial_message():
+    first = encode_message({"type": "progress", "frame": 1})
+    second = encode_message({"type": "progress", "frame": 2})
+    assert list(read_messages(FakeConn([first + second[:-1]]))) == [{"type": "progress", "frame": 1}]
+
+
+def test_malformed_message_is_skipped():
+    bad = b"\x03\x00\x00\x00{x}"
+    data = bad + encode_message({"type": "ping"})
+    assert list(read_messages(FakeConn([data]))) == [{"type": "ping"}]
+
+
+def test_listener_feed_tracks_frames_and_finish():
+    now = [0.0]
+    listener = ProgressListener(report_interval=60, clock=lambda: now[0])
+    seen = []
+    listener.listeners.append(lambda record, progress: seen.append(record['type']))
+    records = [{"type": "progress", "job": "Shot010", "frame": 10 * i, "total": 100, "state": "RENDERING"}
+               for i in range(5)]
+    records.append({"type": "job_finished", "job": "Shot010", "success": True})
+    records.append({"type": "session_finished"})
+    data = b"".join(encode_message(r) for r in records)
+    for i, record in enumerate(read_messages(FakeConn([data[j:j + 7] for j in range(0, len(data), 7)]))):
+        now[0] = float(i)
+        listener.feed(record)
+    progress = listener.get("Shot010")
+    assert progress.frame == 40
+    assert progress.fps() == 10.0
+    assert progress.eta() == 6.0
+    assert progress.success is True
+    assert progress.finished == 5.0
+    assert progress.state_times == {"RENDERING": 0.0}
+    assert seen == ["progress"] * 5 + ["job_finished", "session_finished"]
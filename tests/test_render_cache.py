@@ -0,0 +1,53 @@
+import hashlib
+import json
+
+from render_cache import RenderCache, params_hash
+
+JOB = {'project_name': "Test", 'render_name': "Shot010", 'engine_version': "UE_5.5", 'ue_umap': "/Game/Maps/Test_P",
+       'ue_sequence': "/Game/Seq/Shot010", 'res_x': 1920, 'res_y': 1080, 'custom_start': None}
+
+
+def old_hash(job):
+    # params_hash before quality, output_format and encode_targets were part of it.
+    params = {name: job.get(name) for name in ('ue_umap', 'ue_sequence', 'res_x', 'res_y', 'custom_start')}
+    params['custom_start'] = params['custom_start'] or 1
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def test_defaults_keep_the_old_hash():
+    assert params_hash(JOB) == old_hash(JOB)
+    defaults = dict(JOB, quality="final", output_format="png", encode_targets=[])
+    assert params_hash(defaults) == old_hash(JOB)
+    assert params_hash(dict(JOB, output_format=None, encode_targets=None)) == old_hash(JOB)
+
+
+def test_format_and_targets_change_the_hash():
+    hashes = {
+        params_hash(JOB),
+        params_hash(dict(JOB, output_format="exr")),
+        params_hash(dict(JOB, encode_targets=[{'kind': "proxy", 'scale': 0.5}])),
+        params_hash(dict(JOB, encode_targets=[{'kind': "thumbnail"}])),
+        params_hash(dict(JOB, quality="preview")),
+    }
+    assert len(hashes) == 5
+
+
+def test_lookup_misses_after_a_format_change(tmp_path):
+    movie = tmp_path / "Shot010.mp4"
+    movie.write_bytes(b"mp4")
+    cache = RenderCache(str(tmp_path / "render_cache.json"))
+    cache.store(JOB, 100, "20260101", [str(movie)])
+    assert cache.lookup(JOB, 100) == str(movie)
+    assert cache.lookup(dict(JOB, output_format="png"), 100) == str(movie)
+    assert cache.lookup(dict(JOB, output_format="exr"), 100) is None
+    assert cache.lookup(dict(JOB, encode_targets=[{'kind': "proxy"}]), 100) is None
+
+
+def test_profile_settings_change_the_hash():
+    final = dict(JOB, quality="final", quality_settings={'settings': {'AA': {'spatial_sample_count': 8}}})
+    edited = dict(final, quality_settings={'settings': {'AA': {'spatial_sample_count': 4}}})
+    assert params_hash(final) != old_hash(JOB)
+    assert params_hash(final) == params_hash(dict(final))
+    assert params_hash(edited) != params_hash(final)
+    # Without the profile file only the name counts, as before.
+    assert params_hash(dict(JOB, quality="final", quality_settings=None)) == old_hash(JOB)
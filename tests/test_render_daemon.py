@@ -0,0 +1,103 @@
+import datetime
+import json
+import os
+
+from render_daemon import RenderDaemon, WatchedFile, write_request
+
+
+def test_watched_file_reports_content_changes_only(tmp_path):
+    path = tmp_path / "render_jobs.json"
+    watched = WatchedFile(str(path))
+    assert not watched.changed()  # still missing
+    path.write_text('{"daily_render": []}')
+    assert watched.changed()
+    assert not watched.changed()
+    # Touched but the same content.
+    os.utime(path, ns=(0, 0))
+    assert not watched.changed()
+    path.write_text('{"daily_render": [1]}')
+    assert watched.changed()
+    path.unlink()
+    assert watched.changed()
+
+
+class Clock:
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_daemon(tmp_path, host=1, clock=None, **kwargs):
+    calls = {'load': [], 'nightly': [], 'request': []}
+    job_file = tmp_path / "render_jobs.json"
+    if not job_file.exists():
+        job_file.write_text(json.dumps({"daily_render": [{"render_name": "Shot010"}]}))
+
+    def run_request(jobs, request):
+        calls['request'].append(request['jobs'])
+        return [("render", {}, "boom")] if "Bad" in request['jobs'] else []
+
+    daemon = RenderDaemon(str(job_file), calls['load'].append, lambda jobs: calls['nightly'].append(jobs) or [],
+                          run_request, host, str(tmp_path / "state.json"), request_dir=str(tmp_path / "requests"),
+                          nightly_at="01:00", nightly_window=6, clock=clock or Clock(datetime.datetime(2026, 1, 1, 12)),
+                          **kwargs)
+    return daemon, calls
+
+
+def test_nightly_runs_once_inside_its_window(tmp_path):
+    clock = Clock(datetime.datetime(2026, 1, 1, 0, 59))
+    daemon, calls = make_daemon(tmp_path, clock=clock)
+    assert not daemon.run_once()
+    assert len(calls['load']) == 1
+    clock.now = datetime.datetime(2026, 1, 1, 1, 0)
+    assert daemon.run_once()
+    assert len(calls['nightly']) == 1
+    assert not daemon.run_once()
+    # Caught up after a restart within the window, not after it.
+    clock.now = datetime.datetime(2026, 1, 2, 6, 30)
+    assert daemon.nightly_due(clock.now)
+    assert not daemon.nightly_due(datetime.datetime(2026, 1, 2, 7, 1))
+    # The date is kept across restarts.
+    again, _ = make_daemon(tmp_path, clock=Clock(datetime.datetime(2026, 1, 1, 3)))
+    assert not again.nightly_due(datetime.datetime(2026, 1, 1, 3))
+
+
+def test_requests_are_claimed_by_their_host_only(tmp_path):
+    daemon1, calls1 = make_daemon(tmp_path, host=1)
+    daemon2, calls2 = make_daemon(tmp_path, host=2)
+    request_dir = str(tmp_path / "requests")
+    write_request(request_dir, ["Shot010"], host=2)
+    daemon1.check_job_file()
+    daemon2.check_job_file()
+    assert daemon1.claim_request() == (None, None)
+    path, request = daemon2.claim_request()
+    assert path.endswith(".json.2")
+    assert request['jobs'] == ["Shot010"]
+    assert daemon1.claim_request() == (None, None)
+
+
+def test_request_result_is_written_next_to_it(tmp_path):
+    daemon, calls = make_daemon(tmp_path, host=1)
+    request_dir = str(tmp_path / "requests")
+    write_request(request_dir, ["Bad"], force=True)
+    assert daemon.run_once()
+    assert calls['request'] == [["Bad"]]
+    names = os.listdir(request_dir)
+    assert len(names) == 1 and names[0].endswith(".done")
+    with open(os.path.join(request_dir, names[0])) as f:
+        result = json.load(f)
+    assert result['failures'] == ["render: boom"]
+    assert result['force'] is True and result['host'] == 1
+    assert not daemon.run_once()
+
+
+def test_broken_job_file_keeps_the_previous_jobs(tmp_path):
+    daemon, calls = make_daemon(tmp_path)
+    assert daemon.check_job_file()
+    (tmp_path / "render_jobs.json").write_text("{not json")
+    assert not daemon.check_job_file()
+    assert daemon.jobs == {"daily_render": [{"render_name": "Shot010"}]}
+    assert len(calls['load']) == 1
@@ -0,0 +1,206 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import render_server
+from progress import encode_message, read_messages
+from render_server import WarmWorker, WarmWorkerPool, WorkerLost
+from stall_watchdog import Stalled
+
+
+class FakeEditor:
+    # Stands in for the editor process: connects back to the worker's port
+    # and plays `script(editor, command)` for every command it receives.
+
+    pid = 0
+
+    def __init__(self, port, script, ready=True):
+        self.returncode = None
+        self.commands = []
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        if ready:
+            self.send({"type": "worker_ready"})
+        self.thread = threading.Thread(target=self._run, args=(script,), daemon=True)
+        self.thread.start()
+
+    def send(self, record):
+        self.sock.sendall(encode_message(record))
+
+    def exit(self, code):
+        self.returncode = code
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _run(self, script):
+        try:
+            for command in read_messages(self.sock):
+                self.commands.append(command)
+                if command['type'] == "quit":
+                    self.exit(0)
+                    return
+                script(self, command)
+        except OSError:
+            pass
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = time.monotonic() + (timeout or 10)
+        while self.returncode is None:
+            if time.monotonic() > deadline:
+                raise TimeoutError("fake editor still running")
+            time.sleep(0.01)
+        return self.returncode
+
+    def kill(self):
+        self.exit(-9)
+
+
+def finish_batches(editor, command):
+    for job in command['jobs']:
+        editor.send({"type": "job_finished", "render_name": job['render_name']})
+    editor.send({"type": "batch_finished", "batch": command['batch'], "failed": 0, "jobs": len(command['jobs'])})
+
+
+def started_worker(script, **kwargs):
+    records = []
+    worker = WarmWorker(("Test.uproject", "5.3"), change=100, on_record=records.append)
+    editors = []
+
+    def launch(port):
+        editors.append(FakeEditor(port, script, **kwargs))
+        return editors[0]
+
+    worker.start(launch, poll_interval=0.05)
+    return worker, editors[0], records
+
+
+def test_render_returns_batch_finished_and_passes_progress_on():
+    worker, editor, records = started_worker(finish_batches)
+    jobs = [{'render_name': "Shot010"}, {'render_name': "Shot020"}]
+    record = worker.render(jobs, poll_interval=0.05)
+    assert record == {"type": "batch_finished", "batch": "1", "failed": 0, "jobs": 2}
+    assert worker.render(jobs[:1], poll_interval=0.05)['batch'] == "2"
+    assert [r['render_name'] for r in records] == ["Shot010", "Shot020", "Shot010"]
+    worker.stop()
+    assert editor.commands[-1] == {"type": "quit"}
+
+
+def test_rejected_batch_raises_worker_lost():
+    def reject(editor, command):
+        editor.send({"type": "batch_rejected", "batch": command['batch'], "reason": "busy"})
+
+    worker, editor, records = started_worker(reject)
+    with pytest.raises(WorkerLost, match="rejected"):
+        worker.render([{'render_name': "Shot010"}], poll_interval=0.05)
+    worker.kill()
+
+
+def test_editor_exiting_mid_batch_raises_worker_lost():
+    def crash(editor, command):
+        editor.send({"type": "progress", "frame": 1})
+        editor.exit(3)
+
+    worker, editor, records = started_worker(crash)
+    with pytest.raises(WorkerLost, match="exited with 3"):
+        worker.render([{'render_name': "Shot010"}], poll_interval=0.05)
+    worker.kill()
+
+
+def test_stalled_batch_kills_the_editor():
+    worker, editor, records = started_worker(lambda editor, command: None)
+    with pytest.raises(Stalled):
+        worker.render([{'render_name': "Shot010"}], probes=[lambda: 0], stall_timeout=0.2, poll_interval=0.05)
+    assert editor.returncode == -9
+    assert not worker.alive()
+
+
+def test_editor_that_never_gets_ready():
+    worker = WarmWorker(("Test.uproject", "5.3"))
+    editor = []
+
+    def launch(port):
+        editor.append(FakeEditor(port, finish_batches, ready=False))
+        editor[0].exit(1)
+        return editor[0]
+
+    with pytest.raises(WorkerLost):
+        worker.start(launch, poll_interval=0.05)
+    worker.kill()
+
+
+def test_checkout_retires_the_worker_when_the_changelist_changes():
+    pool = WarmWorkerPool(max_workers=2)
+    created = []
+
+    def create(change):
+        def make():
+            worker = WarmWorker(("Test.uproject", "5.3"), change=change)
+            worker.start(lambda port: FakeEditor(port, finish_batches), poll_interval=0.05)
+            created.append(worker)
+            return worker
+        return make
+
+    key = ("Test.uproject", "5.3")
+    first = pool.checkout(key, 100, create(100))
+    assert pool.checkout(key, 100, create(100)) is None  # busy
+    pool.checkin(first)
+    assert pool.checkout(key, 100, create(100)) is first
+    pool.checkin(first)
+
+    second = pool.checkout(key, 101, create(101))
+    assert second is not first
+    assert second.change == 101
+    assert not first.alive()
+    assert pool.keys() == [key]
+    pool.checkin(second)
+    pool.stop_all()
+    assert not second.alive()
+
+
+def test_serve_resends_a_rejected_manifest(tmp_path, capsys):
+    manifests = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({"jobs": [{'render_name': f"Shot_{name}"}]}), encoding="utf-8")
+        manifests.append(str(path))
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    received = []
+
+    def editor():
+        for _ in range(100):
+            try:
+                sock = socket.create_connection(("127.0.0.1", port))
+                break
+            except OSError:
+                time.sleep(0.02)
+        with sock:
+            sock.sendall(encode_message({"type": "worker_ready"}))
+            rejected = False
+            for command in read_messages(sock):
+                received.append(command)
+                if command['type'] == "quit":
+                    return
+                if not rejected:
+                    # Turned down once, as if a batch were still running.
+                    rejected = True
+                    sock.sendall(encode_message({"type": "batch_rejected", "batch": command['batch'], "reason": "busy"}))
+                    sock.sendall(encode_message({"type": "batch_finished", "batch": "0", "failed": 0, "jobs": 0}))
+                    continue
+                sock.sendall(encode_message({"type": "batch_finished", "batch": command['batch'], "failed": 0, "jobs": 1}))
+
+    thread = threading.Thread(target=editor, daemon=True)
+    thread.start()
+    assert render_server.serve(port, manifests) == 0
+    thread.join(5)
+    assert [c.get('batch') for c in received] == [manifests[0], manifests[0], manifests[1], None]
@@ -0,0 +1,118 @@
+import os
+from collections import namedtuple
+
+import scratch_gc
+from preflight import check_disk_space
+from scratch_gc import ScratchRetention
+
+Usage = namedtuple("Usage", "total used free")
+
+
+def render(tmp_path, name, date, frames=4, size=1000, copied=True):
+    # Frames of one render plus its verified (or not) daily copy.
+    render_path = tmp_path / "scratch" / date
+    render_path.mkdir(parents=True, exist_ok=True)
+    for frame in range(1, frames + 1):
+        (render_path / f"{name}.{frame:04d}.png").write_bytes(b"x" * size)
+    movie = tmp_path / "scratch" / f"{name}.mp4"
+    movie.write_bytes(b"m" * size)
+    daily = tmp_path / "daily" / f"{name}.mp4"
+    daily.parent.mkdir(exist_ok=True)
+    if copied:
+        daily.write_bytes(b"m" * size)
+    return str(render_path), str(movie), str(daily)
+
+
+def ledger(tmp_path, budget, min_free=0, frames_keep_days=0, movies_keep_days=14):
+    return ScratchRetention(str(tmp_path / "scratch" / "ledger.json"), budget, min_free, frames_keep_days,
+                            movies_keep_days)
+
+
+def add(retention, tmp_path, name, date, copied=True):
+    render_path, movie, daily = render(tmp_path, name, date, copied=copied)
+    retention.add_frames(render_path, name, date)
+    retention.mark_copied(render_path, name, movie, daily, date)
+    return render_path, movie
+
+
+def frames_left(render_path, name):
+    return sorted(n for n in os.listdir(render_path) if n.startswith(name + ".")) if os.path.isdir(render_path) else []
+
+
+def test_over_budget_evicts_the_least_recently_used_frames(tmp_path):
+    retention = ledger(tmp_path, budget=10000)
+    old_path, _ = add(retention, tmp_path, "Old", "20260101")
+    new_path, _ = add(retention, tmp_path, "New", "20260102")
+    retention.entries[f"frames|{old_path}|Old"]['used'] -= 100
+    # 2 x (4000 frames + 1000 movie) + 2000 more is over 10000: the old frames go.
+    stats = retention.make_room(str(tmp_path / "scratch"), 2000, "20260103")
+    assert stats['evicted'] == 1 and stats['bytes'] == 4000 and not stats['short']
+    assert frames_left(old_path, "Old") == []
+    assert len(frames_left(new_path, "New")) == 4
+    # Movies are kept for movies_keep_days.
+    assert os.path.isfile(tmp_path / "scratch" / "Old.mp4")
+
+
+def test_low_space_evicts_even_within_budget(tmp_path, monkeypatch):
+    retention = ledger(tmp_path, budget=10 ** 12, min_free=5000)
+    old_path, _ = add(retention, tmp_path, "Old", "20260101")
+    monkeypatch.setattr(scratch_gc.shutil, "disk_usage", lambda root: Usage(10 ** 9, 0, 3000))
+    stats = retention.make_room(str(tmp_path / "scratch"), 1000, "20260102")
+    assert stats['evicted'] == 1
+    assert not stats['short']
+    assert frames_left(old_path, "Old") == []
+
+
+def test_unverified_copies_are_never_evicted(tmp_path):
+    retention = ledger(tmp_path, budget=0)
+    lost_path, movie = add(retention, tmp_path, "Lost", "20260101", copied=False)
+    # A copy that no longer has the verified size doesn't count either.
+    kept_path, _ = add(retention, tmp_path, "Changed", "20260101")
+    (tmp_path / "daily" / "Changed.mp4").write_bytes(b"short")
+    stats = retention.make_room(str(tmp_path / "scratch"), 0, "20260201")
+    assert stats['evicted'] == 0
+    assert stats['unverified'] == 4
+    assert stats['short']
+    assert len(frames_left(lost_path, "Lost")) == 4
+    assert len(frames_left(kept_path, "Changed")) == 4
+    assert os.path.isfile(movie)
+
+
+def test_keep_days(tmp_path):
+    retention = ledger(tmp_path, budget=0, frames_keep_days=2, movies_keep_days=7)
+    render_path, movie = add(retention, tmp_path, "Shot010", "20260101")
+    retention.make_room(str(tmp_path / "scratch"), 0, "20260102")
+    assert len(frames_left(render_path, "Shot010")) == 4
+    retention.make_room(str(tmp_path / "scratch"), 0, "20260103")
+    assert frames_left(render_path, "Shot010") == []
+    assert os.path.isfile(movie)
+    retention.make_room(str(tmp_path / "scratch"), 0, "20260108")
+    assert not os.path.exists(movie)
+    assert retention.entries == {}
+
+
+def test_ledger_round_trip(tmp_path):
+    retention = ledger(tmp_path, budget=10 ** 9)
+    render_path, movie = add(retention, tmp_path, "Shot010", "20260101")
+    reloaded = ledger(tmp_path, budget=10 ** 9)
+    assert reloaded.entries == retention.entries
+    assert reloaded.usage() == 5000
+    frames = reloaded.entries[f"frames|{render_path}|Shot010"]
+    assert frames['copied_to'].endswith("Shot010.mp4") and frames['copied_bytes'] == 1000
+    # A new render of the same frames is not copied yet.
+    reloaded.add_frames(render_path, "Shot010", "20260102")
+    assert ledger(tmp_path, 0).entries[f"frames|{render_path}|Shot010"]['copied_to'] is None
+
+
+def test_preflight_counts_what_gc_can_free(tmp_path, monkeypatch):
+    retention = ledger(tmp_path, budget=10 ** 12, min_free=1000)
+    add(retention, tmp_path, "Old", "20260101")
+    add(retention, tmp_path, "Unverified", "20260101", copied=False)
+    root = str(tmp_path / "scratch")
+    assert retention.evictable_bytes(root, "20260102") == 4000
+    monkeypatch.setattr("preflight.shutil.disk_usage", lambda root: Usage(10 ** 9, 0, 2000))
+    job = {'render_name': "New"}
+    estimate = lambda job: 3000
+    assert id(job) in check_disk_space([job], lambda job: root, estimate, 1000)
+    assert check_disk_space([job], lambda job: root, estimate, 1000,
+                            lambda root: retention.evictable_bytes(root, "20260102")) == {}
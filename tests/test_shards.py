@@ -0,0 +1,59 @@
+import os
+import time
+
+from conftest import JOB
+from shards import ShardTicketWorker, ShardTickets, plan_shards
+
+
+def test_plan_shards_splits_frames_over_hosts():
+    plan = plan_shards(10, 3, [1, 2])
+    assert [(s['start'], s['end'], s['host']) for s in plan] == [(0, 4, 1), (4, 7, 2), (7, 10, 1)]
+    assert len(plan_shards(2, 5, [1])) == 2
+
+
+def test_tickets_are_claimed_once_by_their_host(tmp_path):
+    tickets = ShardTickets(str(tmp_path))
+    for shard in plan_shards(10, 2, [1, 2]):
+        tickets.publish("Shot010_20260101", shard, JOB)
+    assert tickets.claim_next(3) is None
+    ticket = tickets.claim_next(2)
+    assert (ticket['index'], ticket['start'], ticket['end']) == (1, 5, 10)
+    assert ticket['job'] == JOB
+    assert tickets.claim_next(2) is None
+    assert not tickets.pending("Shot010_20260101", 1)
+    assert tickets.pending("Shot010_20260101", 0)
+    # A claimed ticket can't be taken back.
+    assert tickets.reclaim("Shot010_20260101", 1, 1) is None
+
+
+def test_unclaimed_ticket_is_reclaimed_after_timeout(tmp_path):
+    tickets = ShardTickets(str(tmp_path))
+    shard = plan_shards(10, 2, [1, 2])[1]
+    tickets.publish("Shot010_20260101", shard, JOB)
+    started = time.monotonic()
+    assert not tickets.wait_claimed("Shot010_20260101", [shard], 0.2, poll_interval=0.05)
+    assert time.monotonic() - started >= 0.2
+    ticket = tickets.reclaim("Shot010_20260101", 1, 1)
+    assert (ticket['start'], ticket['end']) == (5, 10)
+    assert tickets.claim_next(2) is None
+    assert tickets.wait_claimed("Shot010_20260101", [shard], 0)
+
+
+def test_worker_renders_its_tickets_until_stopped(tmp_path):
+    tickets = ShardTickets(str(tmp_path))
+    for shard in plan_shards(9, 3, [2]):
+        tickets.publish("Shot010_20260101", shard, JOB)
+    rendered = []
+
+    def render_ticket(ticket):
+        rendered.append(ticket['index'])
+        if ticket['index'] == 0:
+            raise RuntimeError("editor crashed")
+
+    worker = ShardTicketWorker(tickets, 2, render_ticket, poll_interval=0.05)
+    worker.start()
+    worker.stop()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert rendered == [0, 1, 2]
+    assert all(name.endswith(".json.2") for name in os.listdir(tmp_path))
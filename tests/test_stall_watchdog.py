@@ -0,0 +1,58 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+
+from stall_watchdog import Stalled, run_supervised, supervise
+
+
+def python(code):
+    return lambda: subprocess.Popen([sys.executable, "-c", code])
+
+
+SLEEP = python("import time; time.sleep(30)")
+QUICK = python("import sys; sys.exit(3)")
+
+
+def test_process_that_exits_is_not_killed():
+    assert run_supervised(QUICK, [lambda: 0], stall_timeout=5, poll_interval=0.05) == 3
+
+
+def test_stalled_process_is_killed():
+    started = time.monotonic()
+    result = asyncio.run(supervise(SLEEP, [lambda: 0], stall_timeout=0.3, poll_interval=0.05))
+    assert result['stalled']
+    assert result['returncode'] != 0
+    assert result['idle'] >= 0.3
+    assert time.monotonic() - started < 10
+
+
+def test_progress_keeps_it_alive():
+    ticks = iter(range(10 ** 6))
+    code = "import time; time.sleep(0.6)"
+    assert run_supervised(python(code), [lambda: next(ticks)], stall_timeout=0.2, poll_interval=0.05) == 0
+
+
+def test_retry_after_a_stall_can_succeed():
+    launches = [SLEEP, QUICK]
+    stalls = []
+    returncode = run_supervised(lambda: launches.pop(0)(), [lambda: 0], stall_timeout=0.3, retries=1,
+                                poll_interval=0.05, on_stall=lambda attempt, lost, idle: stalls.append(attempt))
+    assert returncode == 3
+    assert stalls == [1]
+
+
+def test_gives_up_after_the_retries():
+    stalls = []
+    with pytest.raises(Stalled) as info:
+        run_supervised(SLEEP, [lambda: 0], stall_timeout=0.2, retries=1, poll_interval=0.05,
+                       on_stall=lambda attempt, lost, idle: stalls.append(attempt), label="render Shot010")
+    assert stalls == [1, 2]
+    assert info.value.attempts == 2
+    assert info.value.label == "render Shot010"
+
+
+def test_no_timeout_means_no_watchdog():
+    assert run_supervised(QUICK, [lambda: 0], stall_timeout=0) == 3
@@ -0,0 +1,75 @@
+import time
+
+from ue_log import LogAnalyzer, LogTailer, normalize
+
+LOG = """\
+[2026.01.01-01.00.00:000][  0]LogInit: Display: Starting the editor
+[2026.01.01-01.00.01:000][  0]LogShaderCompilers: Warning: Missing cached shadermap for M_Rock
+[2026.01.01-01.00.02:000][  0]LogPython: Starting job 1/2: /Game/Seq/Shot010 -> Shot010_20260101
+[2026.01.01-01.00.02:500][  1]LogShaderCompilers: Display: Shaders left to compile 120
+[2026.01.01-01.00.04:500][  2]LogShaderCompilers: Display: Shaders left to compile 0
+[2026.01.01-01.00.05:000][  3]LogPython: CinemaMPR frame 1/2 40.0 ms
+[2026.01.01-01.00.05:100][  4]LogStreaming: Warning: Texture streaming took 250.5 ms
+[2026.01.01-01.00.05:200][  5]LogPython: CinemaMPR frame 2/2 60.0 ms
+[2026.01.01-01.00.05:300][  5]LogBlueprint: Error: Accessed None trying to read 'Actor_12'
+[2026.01.01-01.00.05:400][  5]LogBlueprint: Error: Accessed None trying to read 'Actor_13'
+[2026.01.01-01.00.06:000][  6]LogPython: Finished rendering movie! Success: True
+[2026.01.01-01.00.07:000][  7]LogPython: Starting job 2/2: /Game/Seq/Shot020 -> Shot020_20260101
+[2026.01.01-01.00.08:000][  8]LogPython: CinemaMPR frame 1/1 30.0 ms
+[2026.01.01-01.00.08:100][  8]LogRenderer: Warning: Frame hitch of 90 ms
+[2026.01.01-01.00.09:000][  9]LogPython: Finished rendering movie! Success: False
+"""
+
+
+def analyze(text):
+    analyzer = LogAnalyzer()
+    for line in text.splitlines(True):
+        analyzer.feed_line(line)
+    return analyzer.index()
+
+
+def test_normalize_groups_numbers_and_names():
+    assert normalize("Accessed None trying to read 'Actor_12' at 3.5") == "Accessed None trying to read '*' at #"
+
+
+def test_messages_are_classified_per_job():
+    index = analyze(LOG)
+    assert list(index) == ["session", "Shot010_20260101", "Shot020_20260101"]
+    assert index["session"]['warnings'] == 1 and index["session"]['errors'] == 0
+    assert index["session"]['shaders']['shadermap_misses'] == 1
+
+    first = index["Shot010_20260101"]
+    assert first['success'] is True
+    assert first['seconds'] == 4.0
+    assert (first['warnings'], first['errors']) == (1, 2)
+    assert first['top']['Error'] == [{'count': 2, 'example': "Accessed None trying to read 'Actor_12'"}]
+    assert first['frames']['count'] == 2 and first['frames']['max_ms'] == 60.0
+    assert first['shaders']['backlog_max'] == 120 and first['shaders']['compile_seconds'] == 2.0
+    assert first['stalls']['count'] == 1 and first['stalls']['ms'] == 250.5
+
+    second = index["Shot020_20260101"]
+    assert second['success'] is False
+    assert (second['warnings'], second['errors']) == (1, 0)
+    assert second['stalls']['count'] == 1 and second['stalls']['ms'] == 90.0
+
+
+def test_quiet_session_is_left_out():
+    index = analyze("\n".join(LOG.splitlines()[2:]))
+    assert list(index) == ["Shot010_20260101", "Shot020_20260101"]
+
+
+def test_tailer_reads_lines_written_after_start(tmp_path):
+    log = tmp_path / "editor.log"
+    log.write_bytes(b"[2026.01.01-01.00.00:000][  0]LogOld: Error: from an earlier batch\n")
+    analyzer = LogAnalyzer()
+    tailer = LogTailer(str(log), analyzer, poll_interval=0.01, start_offset=log.stat().st_size)
+    tailer.start()
+    with open(log, "ab") as f:
+        f.write(LOG.encode("utf-8"))
+        f.write(b"[2026.01.01-01.00.10:000][ 10]LogExit: Warning: no newline at the end")
+    time.sleep(0.05)
+    tailer.stop()
+    tailer.join(5)
+    index = analyzer.index()
+    assert index["session"]['errors'] == 0
+    assert index["Shot020_20260101"]['warnings'] == 2
@@ -0,0 +1,37 @@
+from warmup import WarmupHistory, settle_frame
+
+
+def test_settle_frame_counts_only_the_unsettled_start():
+    frames = [300.0] * 10 + [100.0] * 90
+    assert settle_frame(frames) == 10
+
+
+def test_settle_frame_ignores_a_shot_change_mid_sequence():
+    frames = [100.0] * 30 + [160.0] * 20 + [100.0] * 50
+    assert settle_frame(frames) == 0
+
+
+def test_settle_frame_ignores_stalls_after_it_settled():
+    frames = [300.0] * 10 + [100.0] * 90
+    assert settle_frame(frames, stall_frames=[12, 60]) == 13
+
+
+def test_settle_frame_is_capped():
+    frames = [300.0] * 70 + [100.0] * 30
+    assert settle_frame(frames) == 25
+
+
+def test_settle_frame_needs_enough_frames():
+    assert settle_frame([100.0] * 20) is None
+
+
+def test_choose_stays_near_what_the_run_needs(tmp_path):
+    # An engine that needs 40 frames: whatever is short of that shows up as settle.
+    history = WarmupHistory(str(tmp_path / "warmup.json"))
+    job = {'project_name': "Test", 'render_name': "Shot010"}
+    chosen = []
+    for day in range(30):
+        warmup = history.choose(job, "5.3", default=16, minimum=4, maximum=400)
+        history.record(job, "5.3", warmup, max(0, 40 - warmup), f"202601{day + 1:02d}")
+        chosen.append(warmup)
+    assert all(36 <= frames <= 50 for frames in chosen[5:])
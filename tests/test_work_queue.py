@@ -0,0 +1,122 @@
+import threading
+
+import work_queue
+from work_queue import WorkQueue
+
+
+def make_group(name, engine="5.3"):
+    return [{'project_name': "Test", 'render_name': name, 'engine': engine}]
+
+
+def open_queue(path, host, worker, **kwargs):
+    return WorkQueue(str(path), "20260101", host, ["5.3"], worker=worker, **kwargs)
+
+
+class Clock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_each_group_is_claimed_by_exactly_one_worker(tmp_path):
+    path = tmp_path / "work_queue.db"
+    seeder = open_queue(path, 1, "seeder")
+    seeder.seed([(make_group(f"Shot{i:03d}"), [1, 2], "5.3") for i in range(40)])
+    seeder.close()
+
+    claimed = {1: [], 2: []}
+
+    def drain(host):
+        queue = open_queue(path, host, f"worker{host}")
+        while True:
+            item = queue.claim()
+            if item is None:
+                break
+            claimed[host].append(item[0])
+            assert queue.finish(item[0], True)
+        queue.close()
+
+    threads = [threading.Thread(target=drain, args=(host,)) for host in claimed]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    keys = claimed[1] + claimed[2]
+    assert len(keys) == 40
+    assert len(set(keys)) == 40
+
+
+def test_heartbeat_keeps_the_lease(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue.time, "time", clock)
+    path = tmp_path / "work_queue.db"
+    first = open_queue(path, 1, "first", lease_seconds=60)
+    second = open_queue(path, 1, "second", lease_seconds=60)
+    first.seed([(make_group("Shot010"), [1], "5.3")])
+    key, _ = first.claim()
+    for _ in range(5):
+        clock.now += 50
+        assert first.heartbeat() == 1
+        assert second.claim() is None
+    assert first.finish(key, True)
+    first.close()
+    second.close()
+
+
+def test_expired_lease_is_reclaimed(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue.time, "time", clock)
+    path = tmp_path / "work_queue.db"
+    first = open_queue(path, 1, "first", lease_seconds=60, max_attempts=2)
+    second = open_queue(path, 1, "second", lease_seconds=60, max_attempts=2)
+    first.seed([(make_group("Shot010"), [1], "5.3")])
+    key, group = first.claim()
+    assert second.claim() is None
+
+    clock.now += 61
+    assert second.claim() == (key, group)
+    # The first worker lost the lease: its finish doesn't count.
+    assert not first.finish(key, True)
+    assert second.outstanding() == 0
+    assert first.outstanding() == 1
+
+    # Out of attempts: the second lease expiring fails the group.
+    clock.now += 61
+    assert first.claim() is None
+    state, detail = first.conn.execute("SELECT state, detail FROM work_item WHERE key = ?", (key,)).fetchone()
+    assert state == "failed"
+    assert "second" in detail
+    first.close()
+    second.close()
+
+
+def test_groups_for_other_hosts_wait_for_affinity(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue.time, "time", clock)
+    path = tmp_path / "work_queue.db"
+    host1 = open_queue(path, 1, "host1", affinity_wait=120)
+    host2 = open_queue(path, 2, "host2", affinity_wait=120)
+    host1.seed([(make_group("Shot010"), [1], "5.3"), (make_group("Shot020"), [2], "5.3")])
+
+    # host2 skips the first group, which prefers host1, and takes its own.
+    assert host2.claim()[0] == "Test/Shot020"
+    assert host2.claim() is None
+    clock.now += 119
+    assert host2.claim() is None
+    clock.now += 1
+    assert host2.claim()[0] == "Test/Shot010"
+    assert host1.claim() is None
+    host1.close()
+    host2.close()
+
+
+def test_groups_for_missing_engines_are_never_claimed(tmp_path):
+    path = tmp_path / "work_queue.db"
+    queue = open_queue(path, 1, "host1", affinity_wait=0)
+    queue.seed([(make_group("Shot010", "5.4"), [1], "5.4")])
+    assert queue.claim() is None
+    assert queue.outstanding() == 0
+    queue.close()
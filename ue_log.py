@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import statistics
+import threading
+import time
+
+# Streaming analysis of an Unreal editor log while the render is running.
+#
+# LogTailer follows the log file the editor was started with (-abslog=...) and
+# feeds every complete line to a LogAnalyzer, which splits the log per job
+# (CinemaMPRExecutor logs "Starting job i/N: <sequence> -> <output name>") and
+# keeps only compact statistics: per-frame render times, shader compile
+# backlog and time spent compiling, asset/texture streaming stalls, warning and
+# error counts with a few examples, and the final
+# "Finished rendering movie! Success:" line. The result is a small JSON index
+# per job next to the archived log, so a slow render can be looked into
+# without opening a multi-hundred-MB log.
+
+TIMESTAMP = re.compile(r"^\[(\d{4})\.(\d{2})\.(\d{2})-(\d{2})\.(\d{2})\.(\d{2}):(\d{3})\]\[\s*\d+\]")
+CATEGORY = re.compile(r"^(?:\[[^\]]*\]\[[^\]]*\])?(\w+): (?:(Warning|Error|Display|Verbose|Log): )?")
+
+JOB_START = re.compile(r"Starting job (\d+)/(\d+): (.+?) -> (.+)$")
+JOB_FINISHED = re.compile(r"Finished rendering movie! Success: (\w+)")
+FRAME = re.compile(r"CinemaMPR frame (\d+)/(\d+) ([\d.]+) ms")
+SHADERS_LEFT = re.compile(r"Shaders left to compile (\d+)")
+SHADERMAP_MISS = re.compile(r"Missing cached shadermap", re.IGNORECASE)
+FLUSH_LOADING = re.compile(r"FlushAsyncLoading")
+HITCH = re.compile(r"hitch.*?([\d.]+)\s*ms", re.IGNORECASE)
+TOOK_MS = re.compile(r"took ([\d.]+)\s*ms", re.IGNORECASE)
+
+STALL_CATEGORIES = ("LogStreaming", "LogTexture", "LogContentStreaming", "LogAssetRegistry")
+EXAMPLES = 5
+
+
+def line_time(line):
+    m = TIMESTAMP.match(line)
+    if not m:
+        return None
+    y, mo, d, h, mi, s, ms = (int(x) for x in m.groups())
+    return time.mktime((y, mo, d, h, mi, s, 0, 0, -1)) + ms / 1000.0
+
+
+def normalize(message):
+    # Groups messages that only differ by numbers or quoted names.
+    message = re.sub(r"'[^']*'|\"[^\"]*\"", "'*'", message)
+    return re.sub(r"\d+(\.\d+)?", "#", message)[:200]
+
+
+class JobLogStats:
+
+    def __init__(self, name):
+        self.name = name
+        self.started = None
+        self.finished = None
+        self.success = None
+        self.frame_ms = []
+        self.slowest = []
+        self.shader_backlog_max = 0
+        self.shader_compile_seconds = 0.0
+        self.shadermap_misses = 0
+        self._compiling_since = None
+        self.flush_loading = 0
+        self.stalls = 0
+        self.stall_ms = 0.0
+        # Output frame count at each stall, for the warm-up calibration.
+        self.stall_frames = []
+        self.counts = {'Warning': 0, 'Error': 0}
+        self.messages = {'Warning': {}, 'Error': {}}
+
+    def to_index(self):
+        frames = sorted(self.frame_ms)
+        frame_stats = None
+        if frames:
+            frame_stats = {
+                'count': len(frames),
+                'mean_ms': round(statistics.mean(frames), 1),
+                'p50_ms': round(frames[len(frames) // 2], 1),
+                'p95_ms': round(frames[min(len(frames) - 1, int(len(frames) * 0.95))], 1),
+                'max_ms': round(frames[-1], 1),
+                'slowest': sorted(self.slowest, reverse=True)[:EXAMPLES],
+            }
+        top = {}
+        for level, messages in self.messages.items():
+            ranked = sorted(messages.items(), key=lambda kv: -kv[1][0])[:EXAMPLES]
+            top[level] = [{'count': count, 'example': example} for _, (count, example) in ranked]
+        return {
+            'job': self.name,
+            'success': self.success,
+            'seconds': round(self.finished - self.started, 1) if self.started and self.finished else None,
+            'frames': frame_stats,
+            'shaders': {
+                'backlog_max': self.shader_backlog_max,
+                'compile_seconds': round(self.shader_compile_seconds, 1),
+                'shadermap_misses': self.shadermap_misses,
+            },
+            'stalls': {
+                'count': self.stalls,
+                'ms': round(self.stall_ms, 1),
+                'flush_async_loading': self.flush_loading,
+            },
+            'warnings': self.counts['Warning'],
+            'errors': self.counts['Error'],
+            'top': top,
+        }
+
+
+class LogAnalyzer:
+
+    def __init__(self, default_job="session"):
+        self.jobs = {}
+        self.order = []
+        self.current = self._job(default_job)
+        self.last_time = None
+
+    def _job(self, name):
+        if name not in self.jobs:
+            self.jobs[name] = JobLogStats(name)
+            self.order.append(name)
+        return self.jobs[name]
+
+    def feed_line(self, line):
+        line = line.rstrip("\r\n")
+        now = line_time(line)
+        if now is not None:
+            self.last_time = now
+        stats = self.current
+
+        m = JOB_START.search(line)
+        if m:
+            self._end_shader_compile(stats)
+            stats = self.current = self._job(m.group(4).strip())
+            stats.started = self.last_time
+            return
+
+        m = FRAME.search(line)
+        if m:
+            ms = float(m.group(3))
+            stats.frame_ms.append(ms)
+            stats.slowest.append((ms, int(m.group(1))))
+            if len(stats.slowest) > 4 * EXAMPLES:
+                stats.slowest = sorted(stats.slowest, reverse=True)[:EXAMPLES]
+            return
+
+        m = JOB_FINISHED.search(line)
+        if m:
+            stats.success = m.group(1) == "True"
+            stats.finished = self.last_time
+            self._end_shader_compile(stats)
+            return
+
+        m = SHADERS_LEFT.search(line)
+        if m:
+            left = int(m.group(1))
+            stats.shader_backlog_max = max(stats.shader_backlog_max, left)
+            if left and stats._compiling_since is None:
+                stats._compiling_since = self.last_time
+            elif not left:
+                self._end_shader_compile(stats)
+        if SHADERMAP_MISS.search(line):
+            stats.shadermap_misses += 1
+
+        c = CATEGORY.match(line)
+        category, level = (c.group(1), c.group(2)) if c else (None, None)
+
+        if FLUSH_LOADING.search(line):
+            stats.flush_loading += 1
+        if category in STALL_CATEGORIES or HITCH.search(line):
+            m = HITCH.search(line) or TOOK_MS.search(line)
+            if m:
+                stats.stalls += 1
+                stats.stall_ms += float(m.group(1))
+                stats.stall_frames.append(len(stats.frame_ms))
+
+        if level in ('Warning', 'Error'):
+            stats.counts[level] += 1
+            key = normalize(line[c.end():])
+            count, example = stats.messages[level].get(key, (0, line[c.end():][:300]))
+            stats.messages[level][key] = (count + 1, example)
+
+    def _end_shader_compile(self, stats):
+        if stats._compiling_since is not None and self.last_time is not None:
+            stats.shader_compile_seconds += self.last_time - stats._compiling_since
+        stats._compiling_since = None
+
+    def index(self):
+        # Per job index; the "session" bucket holds what happened before the
+        # first job started (editor start-up, map load) when there was any.
+        return {name: self.jobs[name].to_index() for name in self.order
+                if name != "session" or self.jobs[name].counts['Warning'] or self.jobs[name].counts['Error']
+                or self.jobs[name].shader_backlog_max}
+
+
+class LogTailer(threading.Thread):
+    # Follows `path` (which may not exist yet) and feeds complete lines to the
+    # analyzer until stop() is called and the rest of the file has been read.
+    # start_offset skips what is already in the file (a warm editor's log).
+
+    def __init__(self, path, analyzer, poll_interval=1.0, start_offset=0):
+        super().__init__(name=f"tail-{os.path.basename(path)}", daemon=True)
+        self.path = path
+        self.analyzer = analyzer
+        self.poll_interval = poll_interval
+        self.start_offset = start_offset
+        self.bytes_read = 0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        f = None
+        pending = b""
+        try:
+            while True:
+                stopping = self._stop_event.is_set()
+                if f is None:
+                    try:
+                        f = open(self.path, "rb")
+                        f.seek(self.start_offset)
+                    except OSError:
+                        if stopping:
+                            return
+                        self._stop_event.wait(self.poll_interval)
+                        continue
+                chunk = f.read(1024 * 1024)
+                if chunk:
+                    self.bytes_read += len(chunk)
+                    pending += chunk
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        self.analyzer.feed_line(line.decode("utf-8", errors="replace"))
+                    continue
+                if stopping:
+                    if pending:
+                        self.analyzer.feed_line(pending.decode("utf-8", errors="replace"))
+                    return
+                # A relaunched editor (watchdog retry) starts the log over.
+                try:
+                    if os.path.getsize(self.path) < f.tell():
+                        f.seek(0)
+                        pending = b""
+                except OSError:
+                    pass
+                self._stop_event.wait(self.poll_interval)
+        finally:
+            if f is not None:
+                f.close()
+
+
+def write_index(path, index):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
@@ -0,0 +1,97 @@
+import json
+import os
+import statistics
+import threading
+
+from render_cache import job_key
+
+# Adaptive warm-up frame count per job and engine version.
+#
+# After every render the log analyzer's per-frame times (ue_log.py) tell us
+# how many output frames it still took for the frame time to settle and for
+# streaming stalls to stop. warm-up used + those frames is what the job really
+# needed, plus a margin on the settle part. If a run settled right away we
+# only know it needed at most the warm-up it got, so the next run tries a
+# little less. A calibration run
+# renders the start of the sequence with no warm-up at all, which measures the
+# settling curve directly.
+#
+# History is a small JSON file:
+#   {"<job key>|<engine>": [{"date": "20240101", "warmup": 100, "settle": 12,
+#                            "calibration": false}, ...]}
+
+HISTORY_KEEP = 10
+HISTORY_USED = 5
+
+
+def settle_frame(frame_ms, stall_frames=(), window=8, tolerance=0.15, max_share=0.25):
+    # Number of output frames before the frame time is within `tolerance` of
+    # its steady state (median of the last quarter), or None when there are
+    # too few frames to tell. This is the first window that is in tolerance:
+    # frames that are off later on are a shot or content change, not warm-up.
+    # Streaming stalls count only while they follow on from the unsettled
+    # start, and the result is capped at max_share of the frames.
+    if len(frame_ms) < 4 * window:
+        return None
+    tail = len(frame_ms) - len(frame_ms) // 4
+    steady = statistics.median(frame_ms[tail:])
+    settle = tail - window + 1
+    for i in range(0, tail - window + 1):
+        if abs(statistics.median(frame_ms[i:i + window]) - steady) <= steady * tolerance:
+            # More than half of the window before was still off.
+            settle = i - 1 + (window + 1) // 2 if i else 0
+            break
+    for frame in sorted(stall_frames):
+        if frame >= settle + window:
+            break
+        settle = max(settle, frame + 1)
+    return min(settle, int(len(frame_ms) * max_share))
+
+
+class WarmupHistory:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"warm-up history ignored ({path}): {e}")
+                self.entries = {}
+
+    def key(self, job, engine):
+        return f"{job_key(job)}|{engine}"
+
+    def record(self, job, engine, warmup, settle, date, calibration=False):
+        with self._lock:
+            history = self.entries.setdefault(self.key(job, engine), [])
+            history.append({'date': date, 'warmup': warmup, 'settle': settle, 'calibration': calibration})
+            del history[:-HISTORY_KEEP]
+            self._save()
+
+    def choose(self, job, engine, default, minimum, maximum, margin=0.25, step_down=0.1):
+        with self._lock:
+            history = list(self.entries.get(self.key(job, engine), []))[-HISTORY_USED:]
+        if not history:
+            frames = default
+        else:
+            short = [e for e in history if e['settle'] > 0 or e.get('calibration')]
+            if short:
+                # warm-up + settle is what the run really needed; only the
+                # measured settle gets the margin, the warm-up already has
+                # the margin of the run that chose it.
+                frames = max(e['warmup'] + e['settle'] for e in short) + margin * max(e['settle'] for e in short)
+            else:
+                # Every recent run settled right away: try a bit less.
+                frames = history[-1]['warmup'] * (1 - step_down)
+        return max(minimum, min(maximum, int(round(frames))))
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Shared pull-based queue of render groups, one SQLite file on the shared data
+# drive.
+#
+# Every host seeds the queue from render_jobs.json (idempotent, keyed by run
+# date and the group's job keys) and then claims one group at a time: only
+# groups whose engine is installed here, preferring groups whose "host" list
+# names this host. A group for other hosts is taken once it has waited
+# affinity_wait seconds, so affinity is a preference, not a rule. A claim is a
+# lease that the worker renews with heartbeats; when a worker dies its lease
+# runs out and the next claim puts the group back in the queue (or marks it
+# failed after max_attempts).
+#
+# SQLite on an SMB share is fine for this little traffic as long as every
+# write is one short transaction (BEGIN IMMEDIATE) and the journal stays in
+# the default rollback mode; WAL does not work across machines. Leases use
+# wall clock time, so the hosts' clocks must agree to well within a lease.
+#
+#   python work_queue.py status Z:\9_Daily\data\work_queue.db --date 20240101
+#   python work_queue.py requeue Z:\9_Daily\data\work_queue.db --date 20240101 --failed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_item (
+    run_date TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    hosts TEXT NOT NULL,
+    jobs TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    queued REAL NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    finished REAL,
+    detail TEXT,
+    PRIMARY KEY (run_date, key)
+);
+CREATE INDEX IF NOT EXISTS work_item_state ON work_item (run_date, state);
+"""
+
+
+def worker_name(host):
+    return f"{socket.gethostname()}/{host}/{os.getpid()}"
+
+
+def group_key(group):
+    return "+".join(f"{job['project_name']}/{job['render_name']}" for job in group)
+
+
+class WorkQueue:
+
+    def __init__(self, path, run_date, host, engines, worker=None, lease_seconds=300, affinity_wait=120,
+                 max_attempts=3):
+        self.path = path
+        self.run_date = run_date
+        self.host = host
+        self.engines = sorted(engines)
+        self.worker = worker or worker_name(host)
+        self.lease_seconds = lease_seconds
+        self.affinity_wait = affinity_wait
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def seed(self, items):
+        # items: [(group of jobs, preferred hosts, engine)]. Groups already in
+        # today's queue are left as they are. Returns how many were added.
+        now = time.time()
+        added = 0
+        with self._transaction() as conn:
+            position = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM work_item WHERE run_date = ?",
+                                    (self.run_date,)).fetchone()[0]
+            for group, hosts, engine in items:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO work_item (run_date, key, position, engine, hosts, jobs, queued)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.run_date, group_key(group), position, engine, json.dumps(hosts), json.dumps(group), now),
+                )
+                if cursor.rowcount:
+                    added += 1
+                    position += 1
+        return added
+
+    def _expire_leases(self, conn, now):
+        conn.execute(
+            "UPDATE work_item SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " detail = 'lease of ' || worker || ' expired', worker = NULL, lease_until = NULL"
+            " WHERE run_date = ? AND state = 'leased' AND lease_until < ?",
+            (self.max_attempts, self.run_date, now),
+        )
+
+    def claim(self):
+        # Returns (key, group) leased to this worker, or None if nothing is
+        # claimable right now.
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            marks = ",".join("?" * len(self.engines)) or "NULL"
+            rows = conn.execute(
+                f"SELECT key, hosts, jobs, queued FROM work_item WHERE run_date = ? AND state = 'pending'"
+                f" AND engine IN ({marks}) ORDER BY position",
+                (self.run_date, *self.engines),
+            ).fetchall()
+            chosen = None
+            for key, hosts, jobs, queued in rows:
+                if self.host in json.loads(hosts):
+                    chosen = (key, jobs)
+                    break
+                if chosen is None and now - queued >= self.affinity_wait:
+                    chosen = (key, jobs)
+            if chosen is None:
+                return None
+            conn.execute(
+                "UPDATE work_item SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1"
+                " WHERE run_date = ? AND key = ?",
+                (self.worker, now + self.lease_seconds, self.run_date, chosen[0]),
+            )
+        return chosen[0], json.loads(chosen[1])
+
+    def heartbeat(self):
+        # Renews every lease this worker holds. Returns how many.
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE work_item SET lease_until = ? WHERE run_date = ? AND state = 'leased' AND worker = ?",
+                (time.time() + self.lease_seconds, self.run_date, self.worker),
+            )
+            return cursor.rowcount
+
+    def finish(self, key, ok, detail=None):
+        # False when the lease had already been lost to another worker.
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE work_item SET state = ?, finished = ?, detail = ?, lease_until = NULL"
+                " WHERE run_date = ? AND key = ? AND worker = ? AND state = 'leased'",
+                ("done" if ok else "failed", time.time(), detail, self.run_date, key, self.worker),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key):
+        # Gives a claimed group back without counting the attempt.
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE work_item SET state = 'pending', worker = NULL, lease_until = NULL, attempts = attempts - 1"
+                " WHERE run_date = ? AND key = ? AND worker = ? AND state = 'leased'",
+                (self.run_date, key, self.worker),
+            )
+
+    def outstanding(self):
+        # Groups this worker may still get: pending ones it can render, and
+        # ones leased by other workers (they come back if that worker dies).
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            marks = ",".join("?" * len(self.engines)) or "NULL"
+            return conn.execute(
+                f"SELECT COUNT(*) FROM work_item WHERE run_date = ? AND ((state = 'pending' AND engine IN ({marks}))"
+                f" OR (state = 'leased' AND worker != ?))",
+                (self.run_date, *self.engines, self.worker),
+            ).fetchone()[0]
+
+
+class LeaseKeeper(threading.Thread):
+    # Renews this worker's leases every `interval` seconds until stop().
+
+    def __init__(self, queue, interval):
+        super().__init__(name="queue-heartbeat", daemon=True)
+        self.queue = queue
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.queue.heartbeat()
+            except sqlite3.Error as e:
+                print(f"Work queue heartbeat failed: {e}")
+
+
+def status_rows(conn, run_date):
+    return conn.execute(
+        "SELECT key, engine, hosts, state, worker, attempts, queued, finished, detail FROM work_item"
+        " WHERE run_date = ? ORDER BY position",
+        (run_date,),
+    ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily render work queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    status = sub.add_parser("status", help="state of every group of one day")
+    status.add_argument("db")
+    status.add_argument("--date", default=time.strftime("%Y%m%d"))
+    requeue = sub.add_parser("requeue", help="put failed (or all unfinished) groups back in the queue")
+    requeue.add_argument("db")
+    requeue.add_argument("--date", default=time.strftime("%Y%m%d"))
+    requeue.add_argument("--failed", action="store_true", help="only failed groups")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, timeout=60)
+    try:
+        if args.command == "status":
+            counts = {}
+            for key, engine, hosts, state, worker, attempts, queued, finished, detail in status_rows(conn, args.date):
+                counts[state] = counts.get(state, 0) + 1
+                took = f"{finished - queued:.0f}s" if finished else "-"
+                print(f"{state:<8} {key:<50} {engine:<8} hosts {hosts:<8} {worker or '-':<30} x{attempts} {took}"
+                      + (f"  {detail}" if detail else ""))
+            print(", ".join(f"{state} {count}" for state, count in sorted(counts.items())) or "empty")
+        else:
+            states = ("failed",) if args.failed else ("failed", "leased")
+            cursor = conn.execute(
+                f"UPDATE work_item SET state = 'pending', worker = NULL, lease_until = NULL, attempts = 0"
+                f" WHERE run_date = ? AND state IN ({','.join('?' * len(states))})",
+                (args.date, *states),
+            )
+            conn.commit()
+            print(f"requeued {cursor.rowcount}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())